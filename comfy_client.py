@@ -0,0 +1,472 @@
+"""In-process client for the ComfyUI server running inside the container.
+
+Replaces shelling out to ``comfy run`` for every request: workflows are POSTed
+straight to ``/prompt`` over pooled keep-alive HTTP connections and completion is
+tracked through a single long-lived ``/ws`` listener.  When the websocket is not
+available (``websocket-client`` missing, socket dropped) we fall back to polling
+``/history/{prompt_id}`` so a request never hangs on a lost event.  Listeners
+added with ``add_listener`` see every prompt's websocket events, including
+decoded latent preview frames, for streaming progress to callers.
+"""
+import http.client
+import json
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+import urllib.parse
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# binary websocket frames: a big-endian uint32 event type, then its payload
+PREVIEW_IMAGE = 1  # uint32 image type (1 JPEG, 2 PNG), image bytes
+PREVIEW_IMAGE_WITH_METADATA = 4  # uint32 metadata length, JSON metadata, image bytes
+PREVIEW_FORMATS = {1: "jpeg", 2: "png"}
+
+
+class ComfyError(RuntimeError):
+    """Raised when the ComfyUI server rejects or fails to execute a prompt."""
+
+    def __init__(self, message: str, details: Optional[Dict] = None):
+        super().__init__(message)
+        self.details = details or {}
+
+
+def wait_until_ready(host: str = "127.0.0.1", port: int = 8188, timeout: float = 120,
+                     initial_delay: float = 0.05, max_delay: float = 0.5) -> float:
+    """Block until the server answers ``/system_stats`` and return the seconds waited.
+
+    Probing starts immediately and backs off exponentially from ``initial_delay``
+    to ``max_delay``, so a server that binds quickly is picked up within a
+    fraction of a second instead of after a fixed sleep.  Raises ``TimeoutError``
+    if the server is not ready within ``timeout`` seconds.
+    """
+    started = time.monotonic()
+    deadline = started + timeout
+    delay = initial_delay
+    last_error = None
+    while True:
+        conn = http.client.HTTPConnection(host, port, timeout=5)
+        try:
+            conn.request("GET", "/system_stats")
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status == 200:
+                return time.monotonic() - started
+            last_error = f"status {resp.status}"
+        except (OSError, http.client.HTTPException) as e:
+            last_error = e
+        finally:
+            conn.close()
+        if time.monotonic() + delay > deadline:
+            raise TimeoutError(f"ComfyUI server not ready after {timeout}s. Last error: {last_error}")
+        time.sleep(delay)
+        delay = min(delay * 2, max_delay)
+
+
+class ConnectionPool:
+    """A small LIFO pool of keep-alive ``http.client`` connections to one host.
+
+    Pass ``connection_class=http.client.HTTPSConnection`` for TLS hosts.
+    """
+
+    def __init__(self, host: str, port: int, size: int = 8, timeout: float = 30,
+                 connection_class=http.client.HTTPConnection):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.connection_class = connection_class
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            return self.connection_class(self.host, self.port, timeout=self.timeout), False
+
+    def _release(self, conn):
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def request(self, method: str, path: str, body: Optional[bytes] = None, headers: Optional[Dict] = None):
+        """Send a request and return ``(status, body_bytes)``.
+
+        A pooled connection may have been closed by the server while idle; in
+        that case the request is retried once on a fresh connection.
+        """
+        headers = headers or {}
+        while True:
+            conn, reused = self._acquire()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                resp = conn.getresponse()
+                data = resp.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if reused:
+                    continue
+                raise
+            except Exception:
+                conn.close()
+                raise
+            if resp.will_close:
+                conn.close()
+            else:
+                self._release(conn)
+            return resp.status, data
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class _PromptWaiter:
+    def __init__(self, done: "queue.Queue[str]"):
+        self.done = done
+        self.error: Optional[Dict] = None
+
+
+class ComfyClient:
+    """Submit workflows to a running ComfyUI server and wait for them to finish."""
+
+    # How many finished prompt ids to remember for waiters that register late.
+    FINISHED_CACHE_SIZE = 256
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8188, pool_size: int = 8,
+                 timeout: float = 30, use_websocket: bool = True, output_dir: Optional[str] = None):
+        self.host = host
+        self.port = port
+        # When the server shares our filesystem, outputs are read straight from
+        # disk instead of being copied through /view.
+        self.output_dir = output_dir
+        self.client_id = uuid.uuid4().hex
+        self._pool = ConnectionPool(host, port, size=pool_size, timeout=timeout)
+        self._lock = threading.Lock()
+        self._waiters: Dict[str, _PromptWaiter] = {}
+        self._finished: "OrderedDict[str, Optional[Dict]]" = OrderedDict()
+        self._errors: Dict[str, Dict] = {}
+        # per running prompt: nodes started or served from cache, and the current node's step progress
+        self._progress: Dict[str, Dict] = {}
+        # (prompt_id, node) currently executing, to attribute previews that carry no prompt id
+        self._executing: Optional[Tuple[str, str]] = None
+        self._listeners: List[Callable[[str, Dict], None]] = []
+        self._ws = None
+        self._ws_connected = threading.Event()
+        self._closed = threading.Event()
+        self._ws_thread = None
+        if use_websocket:
+            self._start_websocket()
+
+    # -- HTTP -----------------------------------------------------------------
+
+    def _get_json(self, path: str):
+        status, data = self._pool.request("GET", path)
+        if status != 200:
+            raise ComfyError(f"GET {path} returned {status}: {data[:200]!r}")
+        return json.loads(data)
+
+    def system_stats(self) -> Dict:
+        return self._get_json("/system_stats")
+
+    def object_info(self) -> Dict:
+        """Every registered node class with its input spec, from ``/object_info``."""
+        return self._get_json("/object_info")
+
+    def get_queue(self) -> Dict:
+        """Return ``{"queue_running": [...], "queue_pending": [...]}`` from ``/queue``."""
+        return self._get_json("/queue")
+
+    def queue_prompt(self, workflow: Dict) -> str:
+        """POST a workflow to ``/prompt`` and return the server's prompt id."""
+        body = json.dumps({"prompt": workflow, "client_id": self.client_id}).encode()
+        status, data = self._pool.request(
+            "POST", "/prompt", body=body, headers={"Content-Type": "application/json"}
+        )
+        try:
+            payload = json.loads(data) if data else {}
+        except ValueError:
+            payload = {"error": data.decode(errors="replace")}
+        if status != 200 or "prompt_id" not in payload:
+            raise ComfyError(f"ComfyUI rejected the prompt (status {status})", payload)
+        return payload["prompt_id"]
+
+    def get_history(self, prompt_id: str) -> Optional[Dict]:
+        """Return the history entry for ``prompt_id`` or ``None`` if it hasn't finished."""
+        history = self._get_json(f"/history/{prompt_id}")
+        return history.get(prompt_id)
+
+    def view(self, filename: str, subfolder: str = "", folder_type: str = "output") -> bytes:
+        """Fetch the bytes of an output file through ``/view``."""
+        query = urllib.parse.urlencode({"filename": filename, "subfolder": subfolder, "type": folder_type})
+        status, data = self._pool.request("GET", f"/view?{query}")
+        if status != 200:
+            raise ComfyError(f"GET /view for {filename} returned {status}")
+        return data
+
+    def fetch_output(self, image: Dict) -> bytes:
+        """Return the bytes of one ``{"filename", "subfolder", "type"}`` output entry."""
+        filename = image["filename"]
+        subfolder = image.get("subfolder", "")
+        folder_type = image.get("type", "output")
+        if self.output_dir and folder_type == "output":
+            path = os.path.join(self.output_dir, subfolder, filename)
+            try:
+                with open(path, "rb") as f:
+                    return f.read()
+            except FileNotFoundError:
+                pass
+        return self.view(filename, subfolder, folder_type)
+
+    # -- Websocket ------------------------------------------------------------
+
+    def _start_websocket(self):
+        try:
+            import websocket  # websocket-client
+        except ImportError:
+            logger.warning("websocket-client not installed; falling back to /history polling")
+            return
+        self._ws_thread = threading.Thread(
+            target=self._ws_loop, args=(websocket,), name="comfy-ws", daemon=True
+        )
+        self._ws_thread.start()
+
+    def _ws_loop(self, websocket):
+        url = f"ws://{self.host}:{self.port}/ws?clientId={self.client_id}"
+        while not self._closed.is_set():
+            try:
+                self._ws = websocket.create_connection(url, timeout=10)
+                self._ws.settimeout(None)
+                self._ws_connected.set()
+                logger.debug("Connected to ComfyUI websocket %s", url)
+                while not self._closed.is_set():
+                    message = self._ws.recv()
+                    if isinstance(message, str) and message:
+                        self._dispatch(json.loads(message))
+                    elif isinstance(message, bytes) and message:
+                        self._dispatch_binary(message)
+            except Exception as e:
+                if not self._closed.is_set():
+                    logger.debug("ComfyUI websocket dropped: %s", e)
+            finally:
+                self._ws_connected.clear()
+                if self._ws is not None:
+                    try:
+                        self._ws.close()
+                    except Exception:
+                        pass
+                    self._ws = None
+            self._closed.wait(1)
+
+    def add_listener(self, listener: Callable[[str, Dict], None]):
+        """Call ``listener(prompt_id, {"type", "data"})`` for every prompt event.
+
+        Events are the server's JSON messages plus ``{"type": "preview", "data":
+        {"node", "format", "image"}}`` for latent previews.  Listeners run on the
+        websocket thread and must not block.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[str, Dict], None]):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def _notify(self, prompt_id: str, event: Dict):
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(prompt_id, event)
+            except Exception as e:
+                logger.warning("Event listener failed: %s", e)
+
+    def _dispatch(self, message: Dict):
+        msg_type = message.get("type")
+        data = message.get("data") or {}
+        prompt_id = data.get("prompt_id")
+        if not prompt_id:
+            return
+        if msg_type in ("execution_error", "execution_interrupted"):
+            with self._lock:
+                self._errors[prompt_id] = data
+        elif msg_type == "executing" and data.get("node") is None:
+            # Sent after the history entry is written, so it is safe to read.
+            with self._lock:
+                self._executing = None
+            self._finish(prompt_id)
+        elif msg_type in ("executing", "execution_cached", "progress"):
+            with self._lock:
+                progress = self._progress.setdefault(prompt_id, {"nodes": set(), "value": 0, "max": 0})
+                if msg_type == "executing":
+                    progress["nodes"].add(data["node"])
+                    progress["value"] = progress["max"] = 0
+                    self._executing = (prompt_id, data["node"])
+                elif msg_type == "execution_cached":
+                    progress["nodes"].update(data.get("nodes") or [])
+                else:
+                    progress["value"], progress["max"] = data.get("value", 0), data.get("max", 0)
+        if self._listeners:
+            self._notify(prompt_id, {"type": msg_type, "data": data})
+
+    def _dispatch_binary(self, message: bytes):
+        """Decode a latent preview frame and pass it to the listeners."""
+        if len(message) < 8 or not self._listeners:
+            return
+        event_type, value = struct.unpack(">II", message[:8])
+        if event_type == PREVIEW_IMAGE:
+            with self._lock:
+                executing = self._executing
+            if executing is None:
+                return
+            prompt_id, node = executing
+            image_format, image = PREVIEW_FORMATS.get(value, "jpeg"), message[8:]
+        elif event_type == PREVIEW_IMAGE_WITH_METADATA:
+            metadata = json.loads(message[8:8 + value])
+            prompt_id, node = metadata.get("prompt_id"), metadata.get("node_id")
+            image_format = metadata.get("image_type", "image/jpeg").rpartition("/")[2]
+            image = message[8 + value:]
+            if not prompt_id:
+                return
+        else:
+            return
+        self._notify(prompt_id, {"type": "preview", "data": {"node": node, "format": image_format, "image": image}})
+
+    def _finish(self, prompt_id: str):
+        with self._lock:
+            self._progress.pop(prompt_id, None)
+            error = self._errors.pop(prompt_id, None)
+            waiter = self._waiters.get(prompt_id)
+            if waiter is None:
+                self._finished[prompt_id] = error
+                while len(self._finished) > self.FINISHED_CACHE_SIZE:
+                    self._finished.popitem(last=False)
+                return
+            waiter.error = error
+            waiter.done.put(prompt_id)
+
+    # -- Execution --------------------------------------------------------------
+
+    def progress(self, prompt_id: str, total_nodes: int) -> Dict:
+        """Where ``prompt_id`` is: ``{"state", "queue_position", "progress"}``.
+
+        ``state`` is ``"queued"``, ``"running"`` or ``"done"`` (from ``/queue``);
+        ``queue_position`` counts the prompts ahead of a queued one.  While
+        running, ``progress`` (0..1) is the share of the ``total_nodes`` nodes
+        started, with the sampler's step count filling in the current node; it
+        needs the websocket and otherwise stays at 0 until the prompt is done.
+        """
+        queue_state = self.get_queue()
+        running = [item[1] for item in queue_state.get("queue_running", [])]
+        pending = [item[1] for item in sorted(queue_state.get("queue_pending", []), key=lambda item: item[0])]
+        if prompt_id in pending:
+            return {"state": "queued", "queue_position": len(running) + pending.index(prompt_id), "progress": 0.0}
+        if prompt_id not in running:
+            return {"state": "done", "queue_position": None, "progress": 1.0}
+        with self._lock:
+            progress = self._progress.get(prompt_id)
+            if not progress or not progress["nodes"]:
+                return {"state": "running", "queue_position": 0, "progress": 0.0}
+            step = progress["value"] / progress["max"] if progress["max"] else 0.0
+            done = len(progress["nodes"]) - 1 + step
+        return {"state": "running", "queue_position": 0,
+                "progress": round(min(max(done / max(total_nodes, 1), 0.0), 0.99), 3)}
+
+    def wait(self, prompt_id: str, timeout: float = 1200, poll_interval: float = 1.0) -> Dict:
+        """Block until ``prompt_id`` finishes and return its history entry."""
+        for _, entry, error in self.iter_completed([prompt_id], timeout=timeout, poll_interval=poll_interval):
+            if error is not None:
+                raise error
+            return entry
+
+    def iter_completed(self, prompt_ids: List[str], timeout: float = 1200,
+                       poll_interval: float = 1.0) -> Iterator[Tuple[str, Optional[Dict], Optional[ComfyError]]]:
+        """Yield ``(prompt_id, history_entry, error)`` for each prompt as it finishes.
+
+        Results come back in completion order.  ``error`` is a ``ComfyError`` for
+        prompts that failed, so one bad prompt does not abort the rest.  Raises
+        ``TimeoutError`` if anything is still pending after ``timeout`` seconds.
+        """
+        done: "queue.Queue[str]" = queue.Queue()
+        pending = list(prompt_ids)  # submission order, which is also execution order
+        waiters = {}
+        with self._lock:
+            for prompt_id in pending:
+                waiter = waiters[prompt_id] = _PromptWaiter(done)
+                if prompt_id in self._finished:
+                    waiter.error = self._finished.pop(prompt_id)
+                    done.put(prompt_id)
+                else:
+                    self._waiters[prompt_id] = waiter
+
+        deadline = time.monotonic() + timeout
+        try:
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"{len(pending)} prompt(s) did not finish within {timeout}s")
+                # With a live websocket we hear about completions right away; the
+                # history poll only guards against missed events.
+                interval = poll_interval * 5 if self._ws_connected.is_set() else poll_interval
+                try:
+                    candidates, polling = [done.get(timeout=min(remaining, interval))], False
+                except queue.Empty:
+                    candidates, polling = list(pending), True
+                for prompt_id in candidates:
+                    if prompt_id not in pending:
+                        continue
+                    entry = self.get_history(prompt_id)
+                    if entry is None:
+                        if polling:
+                            # The server runs prompts in order, so later ones can't be done yet.
+                            break
+                        continue
+                    pending.remove(prompt_id)
+                    error = waiters[prompt_id].error
+                    status = entry.get("status", {})
+                    if error is not None or status.get("status_str") == "error":
+                        yield prompt_id, entry, ComfyError(f"Prompt {prompt_id} failed", error or status)
+                    else:
+                        yield prompt_id, entry, None
+        finally:
+            with self._lock:
+                for prompt_id in waiters:
+                    self._waiters.pop(prompt_id, None)
+
+    def run(self, workflow: Dict, timeout: float = 1200, poll_interval: float = 1.0) -> Tuple[str, Dict]:
+        """Queue ``workflow`` and wait for it; returns ``(prompt_id, history_entry)``."""
+        prompt_id = self.queue_prompt(workflow)
+        return prompt_id, self.wait(prompt_id, timeout=timeout, poll_interval=poll_interval)
+
+    def close(self):
+        self._closed.set()
+        if self._ws is not None:
+            try:
+                self._ws.close()
+            except Exception:
+                pass
+        self._pool.close()
+
+
+def output_images(history_entry: Dict) -> List[Tuple[str, Dict]]:
+    """List ``(node_id, image)`` pairs for every image a finished prompt saved.
+
+    Only ``type == "output"`` images are returned; ``PreviewImage`` nodes write to
+    the temp folder and are not part of the result.
+    """
+    images = []
+    for node_id, node_output in (history_entry.get("outputs") or {}).items():
+        for image in node_output.get("images", []):
+            if image.get("type", "output") == "output":
+                images.append((node_id, image))
+    return images
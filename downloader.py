@@ -0,0 +1,217 @@
+"""Parallel, resumable HTTP downloads for large model files.
+
+Files are fetched in fixed-size chunks over several HTTP ``Range`` requests at
+once and written in place into a pre-allocated temp file.  Per-chunk progress is
+kept in a ``<temp>.state`` sidecar, so a dropped connection only retries the
+bytes that are missing and a re-run picks up where the last one stopped.  A
+temp file without a sidecar (e.g. left behind by ``wget``) is treated as a
+sequentially written prefix and resumed from its current size.
+"""
+import http.client
+import json
+import logging
+import os
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024 * 1024
+BLOCK_SIZE = 1024 * 1024
+USER_AGENT = "comfy-model-downloader/1.0"
+
+ProgressCallback = Callable[[int, int, float], None]
+
+
+def _request(url: str, start: Optional[int] = None, end: Optional[int] = None, timeout: float = 60):
+    headers = {"User-Agent": USER_AGENT}
+    if start is not None:
+        headers["Range"] = f"bytes={start}-{'' if end is None else end}"
+    return urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=timeout)
+
+
+def probe(url: str, timeout: float = 60) -> Tuple[str, Optional[int], bool]:
+    """Resolve redirects and return ``(final_url, total_size, supports_ranges)``."""
+    with _request(url, 0, 0, timeout=timeout) as resp:
+        final_url = resp.geturl()
+        if resp.status == 206:
+            content_range = resp.headers.get("Content-Range", "")
+            total = content_range.rsplit("/", 1)[-1]
+            return final_url, int(total) if total.isdigit() else None, total.isdigit()
+        length = resp.headers.get("Content-Length")
+        return final_url, int(length) if length else None, False
+
+
+def print_progress(done: int, total: int, elapsed: float):
+    rate = done / elapsed / 1024**2 if elapsed > 0 else 0.0
+    print(f"  {done / 1024**2:,.1f}/{total / 1024**2:,.1f} MB ({rate:,.1f} MB/s)")
+
+
+class _ChunkedDownload:
+    def __init__(self, url: str, path: str, total: int, chunk_size: int, connections: int, retries: int,
+                 timeout: float, progress: Optional[ProgressCallback], progress_interval: float):
+        self.url = url
+        self.path = path
+        self.state_path = path + ".state"
+        self.total = total
+        self.chunk_size = chunk_size
+        self.chunks = [(start, min(start + chunk_size, total)) for start in range(0, total, chunk_size)]
+        self.connections = connections
+        self.retries = retries
+        self.timeout = timeout
+        self.progress = progress
+        self.progress_interval = progress_interval
+        self._lock = threading.Lock()
+        self.written = self._load_state()
+        self.resumed = self.done
+
+    @property
+    def done(self) -> int:
+        return sum(self.written)
+
+    def _load_state(self) -> List[int]:
+        written = [0] * len(self.chunks)
+        if not os.path.exists(self.state_path):
+            # No sidecar (e.g. a partial file left by ``wget``): trust the sequential prefix on disk.
+            try:
+                prefix = min(os.path.getsize(self.path), self.total)
+            except FileNotFoundError:
+                prefix = 0
+            for i, (start, end) in enumerate(self.chunks):
+                written[i] = max(0, min(prefix, end) - start)
+            return written
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+            if state.get("total") == self.total and state.get("chunk_size") == self.chunk_size:
+                return [min(w, end - start) for w, (start, end) in zip(state["written"], self.chunks)]
+        except (ValueError, KeyError, TypeError):
+            pass
+        # The sidecar is unreadable or describes another download (different size
+        # or chunk size).  The temp file was pre-allocated to full size, so its
+        # length says nothing about what was written: start over.
+        logger.info("Discarding partial download %s: its state does not match", self.path)
+        for stale in (self.path, self.state_path):
+            try:
+                os.remove(stale)
+            except FileNotFoundError:
+                pass
+        return written
+
+    def _save_state(self):
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"total": self.total, "chunk_size": self.chunk_size, "written": self.written}, f)
+        os.replace(tmp, self.state_path)
+
+    def _fetch_chunk(self, fd: int, index: int):
+        start, end = self.chunks[index]
+        attempt = 0
+        while self.written[index] < end - start:
+            offset = start + self.written[index]
+            try:
+                with _request(self.url, offset, end - 1, timeout=self.timeout) as resp:
+                    if resp.status != 206:
+                        raise IOError(f"Server ignored Range request (status {resp.status})")
+                    while offset < end:
+                        block = resp.read(min(BLOCK_SIZE, end - offset))
+                        if not block:
+                            raise IOError(f"Connection closed at byte {offset}")
+                        os.pwrite(fd, block, offset)
+                        offset += len(block)
+                        with self._lock:
+                            self.written[index] = offset - start
+                attempt = 0
+            except (OSError, http.client.HTTPException) as e:
+                attempt += 1
+                if attempt > self.retries:
+                    raise
+                logger.info("Chunk %d dropped at byte %d (%s); retry %d/%d", index, offset, e, attempt, self.retries)
+                time.sleep(min(2 ** attempt * 0.1, 5))
+
+    def run(self) -> Dict:
+        started = time.monotonic()
+        # Record progress before pre-allocating, so a full-size temp file is
+        # never mistaken for a finished sequential download.
+        self._save_state()
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(fd, self.total)
+            pending = [i for i, (start, end) in enumerate(self.chunks) if self.written[i] < end - start]
+            stop = threading.Event()
+
+            def checkpoint():
+                while not stop.wait(self.progress_interval):
+                    with self._lock:
+                        self._save_state()
+                    if self.progress:
+                        self.progress(self.done, self.total, time.monotonic() - started)
+
+            reporter = threading.Thread(target=checkpoint, daemon=True)
+            reporter.start()
+            try:
+                with ThreadPoolExecutor(max_workers=self.connections) as pool:
+                    futures = [pool.submit(self._fetch_chunk, fd, i) for i in pending]
+                    for future in as_completed(futures):
+                        future.result()
+            finally:
+                stop.set()
+                reporter.join()
+                with self._lock:
+                    self._save_state()
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.remove(self.state_path)
+        elapsed = time.monotonic() - started
+        fetched = self.total - self.resumed
+        return {
+            "bytes": self.total,
+            "resumed_bytes": self.resumed,
+            "seconds": round(elapsed, 3),
+            "mb_per_s": round(fetched / elapsed / 1024**2, 2) if elapsed > 0 else None,
+        }
+
+
+def _download_stream(url: str, path: str, timeout: float, progress: Optional[ProgressCallback],
+                     progress_interval: float, total: Optional[int]) -> Dict:
+    """Single-connection fallback for servers without Range support."""
+    started = time.monotonic()
+    last_report = started
+    done = 0
+    with _request(url, timeout=timeout) as resp, open(path, "wb") as f:
+        while True:
+            block = resp.read(BLOCK_SIZE)
+            if not block:
+                break
+            f.write(block)
+            done += len(block)
+            if progress and time.monotonic() - last_report >= progress_interval:
+                last_report = time.monotonic()
+                progress(done, total or done, last_report - started)
+    if total is not None and done != total:
+        raise IOError(f"Download of {url} truncated at {done}/{total} bytes")
+    elapsed = time.monotonic() - started
+    return {"bytes": done, "resumed_bytes": 0, "seconds": round(elapsed, 3),
+            "mb_per_s": round(done / elapsed / 1024**2, 2) if elapsed > 0 else None}
+
+
+def download(url: str, path: str, connections: int = 8, chunk_size: int = CHUNK_SIZE, retries: int = 5,
+             timeout: float = 60, progress: Optional[ProgressCallback] = print_progress,
+             progress_interval: float = 5) -> Dict:
+    """Download ``url`` into ``path``, resuming a previous partial download if present.
+
+    Returns ``{"bytes", "resumed_bytes", "seconds", "mb_per_s"}``.
+    """
+    final_url, total, ranges = probe(url, timeout=timeout)
+    if not ranges or not total:
+        logger.info("Server does not support Range requests; downloading %s in one stream", path)
+        return _download_stream(final_url, path, timeout, progress, progress_interval, total)
+    job = _ChunkedDownload(final_url, path, total, chunk_size, connections, retries, timeout,
+                           progress, progress_interval)
+    if job.resumed:
+        print(f"Resuming {os.path.basename(path)} from {job.resumed / 1024**2:,.1f} MB")
+    return job.run()
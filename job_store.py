@@ -0,0 +1,116 @@
+"""Job records for the asynchronous submit / status / result API.
+
+A job is created by ``submit``, run in the background by ``ComfyUI.run_job``
+(through ``JobStore.track``), and read back by ``status`` and ``result``,
+possibly on different containers.  Records therefore live in a shared mapping
+(a ``modal.Dict`` in production, a plain ``dict`` in tests).  Only the runner writes a job's record after it is
+created; the id of the Modal call holding the result is kept under its own key
+so ``submit`` never races the runner's progress updates.
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, MutableMapping, Optional
+
+logger = logging.getLogger(__name__)
+
+JOB_STATES = ("queued", "running", "completed", "failed")
+
+
+class JobStore:
+    def __init__(self, backend: Optional[MutableMapping] = None):
+        self.backend = {} if backend is None else backend
+
+    def create(self, job_id: str, **fields) -> Dict:
+        now = time.time()
+        record = {"job_id": job_id, "state": "queued", "progress": 0, "queue_position": None,
+                  "error": None, "created": now, "updated": now, **fields}
+        self.backend[f"job:{job_id}"] = record
+        return record
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        return self.backend.get(f"job:{job_id}")
+
+    def update(self, job_id: str, **fields) -> Dict:
+        record = dict(self.get(job_id) or {"job_id": job_id, "created": time.time()})
+        record.update(fields, updated=time.time())
+        self.backend[f"job:{job_id}"] = record
+        return record
+
+    def set_call(self, job_id: str, call_id: str):
+        self.backend[f"call:{job_id}"] = call_id
+
+    def call_id(self, job_id: str) -> Optional[str]:
+        return self.backend.get(f"call:{job_id}")
+
+    def track(self, job_id: str, run: Callable[[Callable[[str], None]], List[Any]],
+              poll: Callable[[str], Dict], interval: float) -> List[Any]:
+        """Run a job and keep its record up to date; returns ``run``'s outputs.
+
+        ``run(on_submitted)`` calls ``on_submitted(prompt_id)`` once the prompt
+        is queued; from then on ``poll(prompt_id)`` (``ComfyClient.progress``)
+        is written to the record every ``interval`` seconds.  The reporter is
+        stopped and joined before the terminal state is written, so a late tick
+        can never turn a completed or failed job back into a running one.
+        """
+        self.update(job_id, state="running")
+        reporter = None
+
+        def on_submitted(prompt_id: str):
+            nonlocal reporter
+            reporter = Periodic(interval, lambda: self.update(job_id, **progress_fields(poll(prompt_id)))).start()
+
+        def stop_reporting():
+            if reporter is not None:
+                reporter.stop()
+
+        try:
+            outputs = run(on_submitted)
+        except BaseException as e:
+            stop_reporting()
+            self.update(job_id, state="failed", error=str(e), queue_position=None)
+            raise
+        stop_reporting()
+        self.update(job_id, state="completed", progress=100, queue_position=None, images=len(outputs))
+        return outputs
+
+
+def progress_fields(progress: Dict) -> Dict:
+    """Job record fields from ``ComfyClient.progress()``: state, percentage and queue position.
+
+    A finished prompt only clears the queue position; the terminal state (and
+    100%) is the runner's to write once it has the outputs or the error.
+    """
+    if progress["state"] == "done":
+        return {"queue_position": None}
+    return {
+        "state": "queued" if progress["state"] == "queued" else "running",
+        "progress": int(progress["progress"] * 100),
+        "queue_position": progress["queue_position"],
+    }
+
+
+class Periodic:
+    """Call ``fn`` every ``interval`` seconds on a daemon thread until ``stop()``."""
+
+    def __init__(self, interval: float, fn: Callable[[], None]):
+        self.interval = interval
+        self.fn = fn
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> "Periodic":
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.fn()
+            except Exception as e:
+                # progress reporting must never take down the job it reports on
+                logger.debug("Periodic callback failed: %s", e)
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
@@ -1,15 +1,20 @@
+import base64
 import subprocess
 import json
+from collections import deque
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List
 import uuid
 import os
 import logging
 import time
 
+# monotonic origin for the cold-start timeline (module import ~= container boot)
+CONTAINER_BOOT = time.monotonic()
+
 # Set up logging with more detailed format
 logging.basicConfig(
-    level=logging.DEBUG,  # Change to DEBUG for more detailed logs
+    level=os.environ.get("LOG_LEVEL", "INFO"),  # LOG_LEVEL=DEBUG also logs every workflow body
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
@@ -19,6 +24,25 @@ logging.getLogger('hpack').setLevel(logging.WARNING)
 
 import modal
 
+from comfy_client import ComfyClient, wait_until_ready
+from output_reaper import OutputReaper
+from workflow_sweep import expand_sweep
+from timings import Timeline, prompt_timings
+from request_log import RequestLog
+from job_store import JobStore
+from webhook import DeliveryError, WebhookSender, check_destination
+from result_cache import ResultCache
+from single_flight import SingleFlight
+import output_archive
+from progress_stream import PromptEvents, image_chunks, progress_events, sse
+from workflow_normalize import normalize, workflow_hash
+from warmup import load_primers
+from model_manifest import MANIFEST_PATH, link_path, load_manifest
+from model_store import ModelStore
+from symlink_reconciler import reconcile
+from node_registry import NodeRegistry, image_key, load_registry
+from workflow_validation import WorkflowValidationError, check_workflow, model_files, validate_workflow
+
 import socket
 import urllib.request
 import urllib.error
@@ -27,6 +51,57 @@ import time
 
 vol = modal.Volume.from_name("comfy-cache", create_if_missing=True)
 
+# records of async jobs (submit / status / result), shared by every container
+job_records = modal.Dict.from_name("comfy-jobs", create_if_missing=True)
+
+# completed workflows write output images to this directory
+COMFY_OUTPUT_DIR = "/root/comfy/ComfyUI/output"
+
+# how long launch_comfy_background waits for the server to answer /system_stats
+SERVER_STARTUP_TIMEOUT = float(os.environ.get("SERVER_STARTUP_TIMEOUT", 120))  # seconds
+
+# caps for the output reaper on warm containers (files are also deleted as soon as infer returns them)
+OUTPUT_MAX_BYTES = int(os.environ.get("OUTPUT_MAX_BYTES", 2 * 1024**3))
+OUTPUT_MAX_FILES = int(os.environ.get("OUTPUT_MAX_FILES", 500))
+OUTPUT_MAX_AGE = float(os.environ.get("OUTPUT_MAX_AGE", 15 * 60))  # seconds
+OUTPUT_SWEEP_INTERVAL = float(os.environ.get("OUTPUT_SWEEP_INTERVAL", 60))  # seconds
+
+# deployed workflows are baked into the image; warm-up primers are built from them
+CONFIGS_DIR = "/root/configs"
+# comma-separated config names to run as primers at container start ("" disables warm-up)
+WARMUP_WORKFLOWS = [
+    name.strip()
+    for name in os.environ.get("WARMUP_WORKFLOWS", "2025-07-15_mago_v027_API.json").split(",")
+    if name.strip()
+]
+WARMUP_TIMEOUT = float(os.environ.get("WARMUP_TIMEOUT", 300))  # seconds per primer
+
+# how many per-request timing breakdowns ComfyUI.timings() keeps
+REQUEST_TIMINGS_KEPT = 100
+
+# how often run_job writes a running job's progress to its record
+JOB_PROGRESS_INTERVAL = float(os.environ.get("JOB_PROGRESS_INTERVAL", 2))  # seconds
+
+# delivery attempts after the first for webhook callbacks (exponential backoff, capped at 30s)
+WEBHOOK_RETRIES = int(os.environ.get("WEBHOOK_RETRIES", 5))
+
+# fraction of requests whose full workflow body is logged (debug=True always logs it)
+REQUEST_LOG_SAMPLE_RATE = float(os.environ.get("REQUEST_LOG_SAMPLE_RATE", 0.0))
+
+# opt-in cache of finished images for repeated identical workflows; a TTL of 0 disables it
+RESULT_CACHE_DIR = "/cache/result_cache"
+RESULT_CACHE_TTL = float(os.environ.get("RESULT_CACHE_TTL", 0))  # seconds
+RESULT_CACHE_MAX_BYTES = int(os.environ.get("RESULT_CACHE_MAX_BYTES", 5 * 1024**3))
+
+# latent previews for the stream endpoint's ``preview`` events.  ComfyUI applies the
+# method server-wide, so every prompt (infer, api, batch and job runs too) pays for
+# encoding and sending a preview on each sampler step; off unless opted in
+# (e.g. PREVIEW_METHOD=latent2rgb)
+PREVIEW_METHOD = os.environ.get("PREVIEW_METHOD", "none")
+
+# /object_info responses cached per image id on the volume (custom nodes only change with the image)
+NODE_REGISTRY_DIR = "/cache/node_registry"
+
 # Use a community ComfyUI image (ComfyUI pre-installed, no models)
 image = (  # build up a Modal Image to run ComfyUI, step by step
     modal.Image.debian_slim(  # start from basic Linux with Python
@@ -35,6 +110,7 @@ image = (  # build up a Modal Image to run ComfyUI, step by step
     .apt_install("git", "libgl1-mesa-glx", "libglib2.0-0")  # git for cloning & libs for OpenCV
     .pip_install("fastapi[standard]==0.115.4")  # install web dependencies
     .pip_install("comfy-cli==1.4.1")  # install latest comfy-cli
+    .pip_install("websocket-client")  # for the in-process ComfyUI client (comfy_client.py)
     # -- Extra runtime deps for Impact Pack / Subpack nodes --
     .pip_install(
         "ultralytics>=8.1.0",
@@ -66,100 +142,33 @@ image = (  # build up a Modal Image to run ComfyUI, step by step
 
 def create_all_symlinks():
     """Create symlinks for all models in the cache at image build time."""
-    import os
-    from pathlib import Path
-
-    model_paths = {
-        "checkpoint": [
-            "/root/comfy/ComfyUI/models/checkpoints/untitled_pony.safetensors",
-            "/root/comfy/ComfyUI/models/checkpoints/lucentxlPonyByKlaabu_b20.safetensors"
-        ],
-        "upscaler": "/root/comfy/ComfyUI/models/upscale_models/4x_foolhardy_Remacri.pth",
-        "loras": [
-            "/root/comfy/ComfyUI/models/loras/dramatic_lightning.safetensors",
-            "/root/comfy/ComfyUI/models/loras/RealSkin_xxXL_v1.safetensors",
-            "/root/comfy/ComfyUI/models/loras/amateur_slider.safetensors",
-            "/root/comfy/ComfyUI/models/loras/LUT_color_grading.safetensors",
-            "/root/comfy/ComfyUI/models/loras/mayafoxx_SDXL-000002-e750.safetensors",
-            "/root/comfy/ComfyUI/models/loras/hand_pony_v1.safetensors",
-            "/root/comfy/ComfyUI/models/loras/add_brightness_XL.safetensors",
-            "/root/comfy/ComfyUI/models/loras/leaked_nudes_style_v1_fixed.safetensors",
-            "/root/comfy/ComfyUI/models/loras/puffytits_PONY_v1.safetensors",
-            "/root/comfy/ComfyUI/models/loras/body_weight_slider_v1.safetensors",
-            "/root/comfy/ComfyUI/models/loras/hand_pony_style_v1.safetensors",
-            # NEW_LORAS_BATCH
-            "/root/comfy/ComfyUI/models/loras/Add_Details_v1.2.safetensors",
-            "/root/comfy/ComfyUI/models/loras/StS_PonyXL_Detail_Slider_v1.4_iteration_3.safetensors",
-            "/root/comfy/ComfyUI/models/loras/Age Slider V2_alpha1.0_rank4_noxattn_last.safetensors",
-            "/root/comfy/ComfyUI/models/loras/Curve slider PonyV2_alpha16.0rank32_full_last.safetensors",
-            "/root/comfy/ComfyUI/models/loras/Eye size Slider - PNY_alpha1.0_rank4_noxattn_last.safetensors",
-            "/root/comfy/ComfyUI/models/loras/Tan slider_alpha1.0_rank4_full_last.safetensors",
-            "/root/comfy/ComfyUI/models/loras/mature_female_slider_pony_v2.safetensors",
-            "/root/comfy/ComfyUI/models/loras/Toned_XL_v1.safetensors",
-            "/root/comfy/ComfyUI/models/loras/hair_length_v1.safetensors",
-            "/root/comfy/ComfyUI/models/loras/ThiccPonyXL_V1.safetensors",
-            "/root/comfy/ComfyUI/models/loras/Bimbo Makeup By Stable Yogi Pony.safetensors",
-            "/root/comfy/ComfyUI/models/loras/makeda-000011ta.safetensors",
-            "/root/comfy/ComfyUI/models/loras/sexygeisha-000012.TA_trained.safetensors",
-            "/root/comfy/ComfyUI/models/loras/flora.safetensors",
-            "/root/comfy/ComfyUI/models/loras/cindy-000021XLci.safetensors",
-            "/root/comfy/ComfyUI/models/loras/tatiana-000010.TA_trained.safetensors",
-            "/root/comfy/ComfyUI/models/loras/Blondie-000010SDXLta.safetensors",
-            "/root/comfy/ComfyUI/models/loras/Woman549.safetensors",
-            "/root/comfy/ComfyUI/models/loras/Woman037.safetensors",
-            "/root/comfy/ComfyUI/models/loras/Woman033.safetensors",
-            "/root/comfy/ComfyUI/models/loras/2013091.safetensors"
-        ],
-        "segm": "/root/comfy/ComfyUI/custom_nodes/ComfyUI-Impact-Pack/models/segm/person_yolov8m-seg.pt",
-        "bbox": "/root/comfy/ComfyUI/custom_nodes/ComfyUI-Impact-Pack/models/bbox/face_yolov8m.pt",
-        "sam": "/root/comfy/ComfyUI/custom_nodes/ComfyUI-Impact-Pack/models/sam/sam_vit_b_01ec64.pth",
-    }
+    from model_manifest import load_manifest
+    from model_store import ModelStore
+    from symlink_reconciler import reconcile
 
-    # Create directories first
-    for path in model_paths.values():
-        if isinstance(path, list):
-            for p in path:
-                Path(p).parent.mkdir(parents=True, exist_ok=True)
-        else:
-            Path(path).parent.mkdir(parents=True, exist_ok=True)
-
-    # Create symlinks during build time when volume is mounted
-    for path in model_paths.values():
-        if isinstance(path, list):
-            for p in path:
-                filename = Path(p).name
-                cache_path = f"/cache/{filename}"
-                if Path(cache_path).exists():
-                    # Remove existing file/symlink if it exists
-                    if Path(p).exists():
-                        Path(p).unlink()
-                    # Create symlink
-                    Path(p).symlink_to(cache_path)
-                    logger.info(f"Created symlink: {p} -> {cache_path}")
-                else:
-                    logger.warning(f"Model file not found in cache: {cache_path}")
-        else:
-            filename = Path(path).name
-            cache_path = f"/cache/{filename}"
-            if Path(cache_path).exists():
-                # Remove existing file/symlink if it exists
-                if Path(path).exists():
-                    Path(path).unlink()
-                # Create symlink
-                Path(path).symlink_to(cache_path)
-                logger.info(f"Created symlink: {path} -> {cache_path}")
-            else:
-                logger.warning(f"Model file not found in cache: {cache_path}")
+    # only creates, retargets or removes the links that differ from the manifest
+    reconcile(load_manifest(), ModelStore("/cache"))
 
 # Update the image build to run create_all_symlinks at build time with volume mounted
 image = (
     image.run_commands(
         "mkdir -p /cache",
     )
+    # the manifest is copied in before run_function so editing it re-runs the symlink step
+    .add_local_file(MANIFEST_PATH, "/root/model_manifest.json", copy=True)
+    # run_function imports this file, so every local module it imports at the top must be in the image first
+    .add_local_python_source(
+        "model_manifest", "model_store", "symlink_reconciler",
+        "comfy_client", "output_reaper", "workflow_sweep", "timings", "warmup", "node_registry", "workflow_validation",
+        "request_log", "job_store", "webhook", "result_cache", "workflow_normalize",
+        "single_flight", "output_archive", "progress_stream",
+        copy=True,
+    )
     .run_function(
         create_all_symlinks,
         volumes={"/cache": vol},  # Mount the volume during build time
     )
+    .add_local_dir("configs", remote_path=CONFIGS_DIR)
 )
 
 app = modal.App(
@@ -172,47 +181,7 @@ def check_symlinks():
     """Check if symlinks exist in the volume and print their status."""
     # No need to create runtime symlinks anymore since they're created at build time
     
-    model_paths = [
-        "/root/comfy/ComfyUI/models/checkpoints/untitled_pony.safetensors",
-        "/root/comfy/ComfyUI/models/checkpoints/lucentxlPonyByKlaabu_b20.safetensors",
-        "/root/comfy/ComfyUI/models/upscale_models/4x_foolhardy_Remacri.pth",
-        "/root/comfy/ComfyUI/models/loras/dramatic_lightning.safetensors",
-        "/root/comfy/ComfyUI/models/loras/RealSkin_xxXL_v1.safetensors",
-        "/root/comfy/ComfyUI/models/loras/amateur_slider.safetensors",
-        "/root/comfy/ComfyUI/models/loras/LUT_color_grading.safetensors",
-        "/root/comfy/ComfyUI/models/loras/mayafoxx_SDXL-000002-e750.safetensors",
-        "/root/comfy/ComfyUI/models/loras/hand_pony_v1.safetensors",
-        "/root/comfy/ComfyUI/models/loras/add_brightness_XL.safetensors",
-        "/root/comfy/ComfyUI/models/loras/leaked_nudes_style_v1_fixed.safetensors",
-        "/root/comfy/ComfyUI/models/loras/puffytits_PONY_v1.safetensors",
-        "/root/comfy/ComfyUI/models/loras/body_weight_slider_v1.safetensors",
-        "/root/comfy/ComfyUI/models/loras/hand_pony_style_v1.safetensors",
-        # NEW_LORAS_BATCH
-        "/root/comfy/ComfyUI/models/loras/Add_Details_v1.2.safetensors",
-        "/root/comfy/ComfyUI/models/loras/StS_PonyXL_Detail_Slider_v1.4_iteration_3.safetensors",
-        "/root/comfy/ComfyUI/models/loras/Age Slider V2_alpha1.0_rank4_noxattn_last.safetensors",
-        "/root/comfy/ComfyUI/models/loras/Curve slider PonyV2_alpha16.0rank32_full_last.safetensors",
-        "/root/comfy/ComfyUI/models/loras/Eye size Slider - PNY_alpha1.0_rank4_noxattn_last.safetensors",
-        "/root/comfy/ComfyUI/models/loras/Tan slider_alpha1.0_rank4_full_last.safetensors",
-        "/root/comfy/ComfyUI/models/loras/mature_female_slider_pony_v2.safetensors",
-        "/root/comfy/ComfyUI/models/loras/Toned_XL_v1.safetensors",
-        "/root/comfy/ComfyUI/models/loras/hair_length_v1.safetensors",
-        "/root/comfy/ComfyUI/models/loras/ThiccPonyXL_V1.safetensors",
-        "/root/comfy/ComfyUI/models/loras/Bimbo Makeup By Stable Yogi Pony.safetensors",
-        "/root/comfy/ComfyUI/models/loras/makeda-000011ta.safetensors",
-        "/root/comfy/ComfyUI/models/loras/sexygeisha-000012.TA_trained.safetensors",
-        "/root/comfy/ComfyUI/models/loras/flora.safetensors",
-        "/root/comfy/ComfyUI/models/loras/cindy-000021XLci.safetensors",
-        "/root/comfy/ComfyUI/models/loras/tatiana-000010.TA_trained.safetensors",
-        "/root/comfy/ComfyUI/models/loras/Blondie-000010SDXLta.safetensors",
-        "/root/comfy/ComfyUI/models/loras/Woman549.safetensors",
-        "/root/comfy/ComfyUI/models/loras/Woman037.safetensors",
-        "/root/comfy/ComfyUI/models/loras/Woman033.safetensors",
-        "/root/comfy/ComfyUI/models/loras/2013091.safetensors",
-        "/root/comfy/ComfyUI/custom_nodes/ComfyUI-Impact-Pack/models/segm/person_yolov8m-seg.pt",
-        "/root/comfy/ComfyUI/custom_nodes/ComfyUI-Impact-Pack/models/bbox/face_yolov8m.pt",
-        "/root/comfy/ComfyUI/custom_nodes/ComfyUI-Impact-Pack/models/sam/sam_vit_b_01ec64.pth",
-    ]
+    model_paths = [link_path(model) for model in load_manifest()]
     
     logger.info("Checking symlinks in volume:")
     for path in model_paths:
@@ -234,9 +203,8 @@ def check_symlinks():
             logger.info(f"- {item.name}")
 
 @app.function(volumes={"/cache": vol})
-def check_available_nodes():
+def check_available_nodes(nodes_to_check: List[str] = None):
     """Check what custom nodes are available in the installed ComfyUI."""
-    import os
     from pathlib import Path
     
     logger.info("Checking available custom nodes:")
@@ -251,8 +219,7 @@ def check_available_nodes():
     else:
         logger.warning("Custom nodes directory does not exist")
     
-    # Check if specific nodes are available by looking for their Python files
-    nodes_to_check = [
+    nodes_to_check = nodes_to_check or [
         "CLIPSetLastLayer",
         "ImageUpscaleWithModel", 
         "ImageScaleBy",
@@ -260,36 +227,22 @@ def check_available_nodes():
         "UltralyticsDetectorProvider"
     ]
     
-    logger.info("\nChecking for specific nodes:")
+    # registered node classes come from /object_info, cached per image by the first ComfyUI container
+    key = image_key()
+    registry = NodeRegistry.load(os.path.join(NODE_REGISTRY_DIR, f"{key}.json"), key)
+    if registry is None:
+        logger.info("No node registry cached for this image yet; asking a ComfyUI container")
+        result = ComfyUI().available_nodes.remote(nodes_to_check)
+    else:
+        result = {"registered": len(registry), "missing": registry.missing(nodes_to_check)}
+    
+    logger.info(f"\nChecking for specific nodes ({result['registered']} registered):")
     for node_name in nodes_to_check:
-        # Look for Python files that might contain this node
-        found = False
-        for root, dirs, files in os.walk("/root/comfy/ComfyUI"):
-            for file in files:
-                if file.endswith('.py'):
-                    try:
-                        with open(os.path.join(root, file), 'r', encoding='utf-8', errors='ignore') as f:
-                            content = f.read()
-                            if node_name in content:
-                                logger.info(f"✓ {node_name} found in {os.path.join(root, file)}")
-                                found = True
-                                break
-                    except:
-                        continue
-            if found:
-                break
-        
-        if not found:
+        if node_name in result["missing"]:
             logger.warning(f"✗ {node_name} not found")
-    
-    # Also check what's in the ComfyUI nodes directory
-    nodes_dir = Path("/root/comfy/ComfyUI/nodes")
-    if nodes_dir.exists():
-        logger.info(f"\nBuilt-in nodes directory: {nodes_dir}")
-        node_files = list(nodes_dir.glob("*.py"))
-        logger.info(f"Found {len(node_files)} built-in node files")
-    else:
-        logger.warning("Built-in nodes directory does not exist")
+        else:
+            logger.info(f"✓ {node_name} registered")
+    return result
 
 @app.function()
 def dummy_test():
@@ -323,6 +276,11 @@ def ui():
     subprocess.Popen("comfy launch -- --listen 0.0.0.0 --port 8000", shell=True)
 '''
 
+def has_save_image(workflow: Dict) -> bool:
+    """Whether ``workflow`` has a SaveImage node for us to read the result from."""
+    return any(isinstance(node, dict) and node.get("class_type") == "SaveImage" for node in workflow.values())
+
+
 @app.cls(
     scaledown_window=5,  # seconds
     gpu="L40S",
@@ -334,277 +292,525 @@ class ComfyUI:
 
     @modal.enter()
     def launch_comfy_background(self):
+        # structured cold-start timeline, exposed through the timings() method
+        self.boot_timeline = Timeline(origin=CONTAINER_BOOT)
+        self.boot_timeline.extra["enter_at"] = round(time.monotonic() - CONTAINER_BOOT, 4)
+        self.request_timings = deque(maxlen=REQUEST_TIMINGS_KEPT)
+        self.request_log = RequestLog(sample_rate=REQUEST_LOG_SAMPLE_RATE)
+        self.jobs = JobStore(job_records)
+        # pooled, retrying sender for webhook callbacks (bodies are signed when WEBHOOK_SECRET is set)
+        self.webhooks = WebhookSender(secret=os.environ.get("WEBHOOK_SECRET"), retries=WEBHOOK_RETRIES)
+        self.result_cache = (
+            ResultCache(RESULT_CACHE_DIR, ttl=RESULT_CACHE_TTL, max_bytes=RESULT_CACHE_MAX_BYTES)
+            if RESULT_CACHE_TTL > 0 else None
+        )
+        # concurrent identical workflows on this container share one execution
+        self.inflight = SingleFlight()
+
+        # evict returned and stale output images so warm containers don't grow without bound
+        with self.boot_timeline.phase("reaper_start"):
+            self.reaper = OutputReaper(
+                COMFY_OUTPUT_DIR,
+                max_bytes=OUTPUT_MAX_BYTES,
+                max_files=OUTPUT_MAX_FILES,
+                max_age=OUTPUT_MAX_AGE,
+                interval=OUTPUT_SWEEP_INTERVAL,
+            ).start()
+
+        # pick up models added to the volume since the image build; a no-op diff when nothing changed
+        with self.boot_timeline.phase("model_links"):
+            reconcile(load_manifest(), ModelStore("/cache"))
+            # linked model files, checked by pre-flight validation of every request
+            self.model_files = model_files()
+
         # launch the ComfyUI server exactly once when the container starts
+        # (comfy launch --background returns once the process has imported its custom nodes)
         print("🚀 Starting ComfyUI server...")
-        cmd = f"comfy launch --background -- --port {self.port}"
-        subprocess.run(cmd, shell=True, check=True)
+        cmd = f"comfy launch --background -- --port {self.port} --preview-method {PREVIEW_METHOD}"
+        with self.boot_timeline.phase("comfy_launch"):
+            subprocess.run(cmd, shell=True, check=True)
         
-        # Wait for ComfyUI server to be fully ready
+        # Wait for ComfyUI server to be fully ready, probing right away with a short adaptive backoff
         print("⏳ Waiting for ComfyUI server to start up...")
-        
-        # Extended initial sleep to ensure server has time to initialize properly
-        print("💤 Initial 15-second wait for server initialization...")
-        time.sleep(10)
-        
-        # Poll the server until it's ready (with extended timeout)
-        max_attempts = 20  # 30 attempts * 2 seconds = 60 seconds max
-        for attempt in range(max_attempts):
+        try:
+            with self.boot_timeline.phase("server_ready"):
+                ready_after = wait_until_ready(port=self.port, timeout=SERVER_STARTUP_TIMEOUT)
+        except TimeoutError as e:
+            print(f"❌ Server failed to start: {e}")
+            raise Exception(f"ComfyUI server failed to start within timeout period. {e}")
+        print(f"✅ ComfyUI server is ready after {ready_after:.2f}s")
+
+        # persistent client reused by every request on this container
+        with self.boot_timeline.phase("client_connect"):
+            self.client = ComfyClient(port=self.port, output_dir=COMFY_OUTPUT_DIR)
+
+        # Additional validation: try to get queue info
+        try:
+            self.client.get_queue()
+            print("✅ Queue endpoint also responding correctly")
+        except Exception as queue_err:
+            print(f"⚠️  Queue endpoint check failed: {queue_err}")
+
+        # registered node classes, so checking a workflow's class_types is a set lookup
+        with self.boot_timeline.phase("node_registry"):
+            self.registry = load_registry(self.client, NODE_REGISTRY_DIR)
+        print(f"✅ {len(self.registry)} node classes registered")
+
+        # load checkpoints, LoRAs and detector models before the container accepts inputs
+        if WARMUP_WORKFLOWS:
+            with self.boot_timeline.phase("model_warmup"):
+                self.warm_up()
+
+        print(f"⏱️  Cold start: {self.boot_timeline.summary()}")
+
+    def warm_up(self):
+        """Run a tiny primer of each WARMUP_WORKFLOWS config so its models are resident.
+
+        Failures are logged but never stop the container; the first real request
+        just pays the load instead.
+        """
+        try:
+            primers = load_primers(CONFIGS_DIR, WARMUP_WORKFLOWS)
+        except Exception as e:
+            print(f"⚠️  Could not build warm-up primers: {e}")
+            return
+        for name, primer in zip(WARMUP_WORKFLOWS, primers):
+            started = time.monotonic()
             try:
-                # Check if the server is responding
-                req = urllib.request.Request(f"http://127.0.0.1:{self.port}/system_stats")
-                response = urllib.request.urlopen(req, timeout=10)
-                
-                # Also verify we can get a proper response
-                if response.getcode() == 200:
-                    print(f"✅ ComfyUI server is ready after {attempt + 1} attempts (total time: {15 + (attempt + 1) * 2}s)")
-                    
-                    # Additional validation: try to get queue info
-                    try:
-                        queue_req = urllib.request.Request(f"http://127.0.0.1:{self.port}/queue")
-                        queue_response = urllib.request.urlopen(queue_req, timeout=5)
-                        if queue_response.getcode() == 200:
-                            print("✅ Queue endpoint also responding correctly")
-                        else:
-                            print("⚠️  Queue endpoint returned non-200 status")
-                    except Exception as queue_err:
-                        print(f"⚠️  Queue endpoint check failed: {queue_err}")
-                    
-                    return
-                else:
-                    print(f"❌ Server responded with status {response.getcode()}")
-                    
-            except (socket.timeout, urllib.error.URLError) as e:
-                if attempt < max_attempts - 1:
-                    print(f"⏳ Server not ready yet (attempt {attempt + 1}/{max_attempts}), waiting 2 seconds... Error: {e}")
-                    time.sleep(2)
-                else:
-                    print(f"❌ Server failed to start after {max_attempts} attempts (total time: {15 + max_attempts * 2}s)")
-                    raise Exception(f"ComfyUI server failed to start within timeout period. Last error: {e}")
+                self.client.run(primer, timeout=WARMUP_TIMEOUT)
+                print(f"🔥 Warmed up {name} in {time.monotonic() - started:.2f}s")
+            except Exception as e:
+                print(f"⚠️  Warm-up with {name} failed: {e}")
+
+    @modal.method()
+    def available_nodes(self, class_types: List[str]) -> Dict:
+        """Which of ``class_types`` this image's ComfyUI has registered."""
+        return {"registered": len(self.registry), "missing": self.registry.missing(class_types)}
 
     @modal.method()
-    def infer(self, workflow: Dict):
+    def timings(self) -> Dict:
+        """Cold-start timeline of this container plus the most recent per-request breakdowns."""
+        return {
+            "cold_start": self.boot_timeline.as_dict(),
+            "requests": list(self.request_timings),
+            "result_cache": self.result_cache.stats() if self.result_cache is not None else None,
+            "coalescing": {"executions": self.inflight.executions, "coalesced": self.inflight.coalesced},
+        }
+
+    @modal.method()
+    def infer(self, workflow: Dict, debug: bool = False, all_outputs: bool = False):
+        """The first SaveImage image, or with ``all_outputs`` every output image as
+        ``{"node_id", "batch_index", "filename", "image"}`` dicts."""
+        outputs = self._infer(workflow, debug=debug)
+        return outputs if all_outputs else outputs[0]["image"]
+
+    def _infer(self, workflow: Dict, debug: bool = False, on_submitted=None) -> List[Dict]:
+        """Validate, submit and wait for one workflow; returns all of its output images.
+
+        Outputs are ordered by node (the first SaveImage node first) and batch
+        index, as produced by ``output_archive.ordered_outputs``.
+        ``on_submitted(prompt_id)`` is called once the server has queued the prompt.
+        Identical workflows already running on this container are not queued
+        again: the caller waits for that run and shares its images.
+        """
+        timer = Timeline()
+        request_id = uuid.uuid4().hex
+        # canonical copy: fixed link shapes, no _meta; the caller's dict is left untouched
+        workflow = normalize(workflow)
+        key = workflow_hash(workflow, normalized=True)
+        # one compact record per request; the full body only when sampled or debug is set
+        self.request_log.received(request_id, workflow, key, debug=debug)
+
+        # identical deterministic workflows render identical images; answer repeats from the cache
+        if self.result_cache is not None:
+            with timer.phase("cache_lookup"):
+                cached = self.result_cache.get(key)
+            if cached is not None:
+                self.request_log.completed(request_id, "cached", timer.durations(), bytes=len(cached))
+                return output_archive.unpack(cached)
+
+        try:
+            # reject unknown nodes, broken links and missing models before using the GPU
+            with timer.phase("validate"):
+                check_workflow(workflow, self.registry, self.model_files)
+
+            # retries and double clicks: join an identical run that is already in flight
+            (prompt_id, history, outputs, submitted_at), shared = self.inflight.do(
+                key, lambda emit: self._execute(workflow, timer, emit), on_event=on_submitted
+            )
+        except Exception as e:
+            self.request_log.completed(request_id, "error", timer.durations(), error=str(e))
+            raise
+
+        total_bytes = sum(len(output["image"]) for output in outputs)
+        if shared:
+            self.request_log.completed(request_id, "coalesced", timer.durations(),
+                                       prompt_id=prompt_id, images=len(outputs), bytes=total_bytes)
+            return outputs
+
+        # server-side split of the wait into queue time and execution time
+        timer.extra.update(prompt_timings(history, submitted_at))
+        if self.result_cache is not None:
+            self.result_cache.put(key, output_archive.pack(outputs))
+        self.request_timings.append({"prompt_id": prompt_id, **timer.as_dict()})
+        self.request_log.completed(request_id, "ok", timer.durations(), prompt_id=prompt_id,
+                                   images=len(outputs), bytes=total_bytes)
+        return outputs
+
+    def _execute(self, workflow: Dict, timer: Timeline, on_submitted):
+        """Run a validated, normalized workflow on the server.
+
+        Returns ``(prompt_id, history, outputs, submitted_at)``.
+        """
         # sometimes the ComfyUI server stops responding (we think because of memory leaks), so this makes sure it's still up
-        self.poll_server_health()
+        with timer.phase("health_check"):
+            self.poll_server_health()
 
-        # save the workflow to a file
-        # Use the provided workflow
-        workflow_data = workflow
-        print(f"Received workflow with {len(workflow_data)} nodes")
-        
-        # Show all node IDs and their class types
-        print("Workflow nodes:")
-        for node_id, node in workflow_data.items():
-            class_type = node.get("class_type", "unknown")
-            print(f"  Node {node_id}: {class_type}")
-        
-        # Show all connections
-        print("Workflow connections:")
-        for node_id, node in workflow_data.items():
-            if "inputs" in node:
-                for input_name, input_value in node["inputs"].items():
-                    if isinstance(input_value, list) and len(input_value) == 2:
-                        referenced_node = input_value[0]
-                        output_index = input_value[1]
-                        print(f"  Node {node_id}.{input_name} -> Node {referenced_node}[{output_index}]")
-        
-        print(f"Full workflow data: {json.dumps(workflow_data, indent=2)}")
+        # tag the SaveImage nodes in memory; the dict is submitted as-is, no temp files
+        _, save_node_id = self._tag_save_image(workflow)
 
-        # give the output image a unique id per client request
-        client_id = uuid.uuid4().hex
-        print(f"Generated client ID: {client_id}")
-        
-        # Find the first SaveImage node and update its filename prefix
-        save_image_found = False
-        for node_id, node in workflow_data.items():
-            if node.get("class_type") == "SaveImage":
-                workflow_data[node_id]["inputs"]["filename_prefix"] = client_id
-                print(f"Updated SaveImage node {node_id} with prefix {client_id}")
-                
-                # Fix the image input format if it's malformed
-                if "images" in node["inputs"]:
-                    images_input = node["inputs"]["images"]
-                    print(f"Original images input: {images_input}")
-                    
-                    # Handle different malformed formats
-                    if isinstance(images_input, list):
-                        if len(images_input) == 1 and isinstance(images_input[0], list):
-                            # Case: [["8", 0]] -> ["8", 0]
-                            workflow_data[node_id]["inputs"]["images"] = images_input[0]
-                            print(f"Fixed nested list format: {workflow_data[node_id]['inputs']['images']}")
-                        elif len(images_input) == 2 and all(isinstance(x, (str, int)) for x in images_input):
-                            # Case: ["8", 0] - this is already correct
-                            print(f"Images input format is already correct: {images_input}")
-                        else:
-                            # Try to extract the first valid image reference
-                            for item in images_input:
-                                if isinstance(item, list) and len(item) == 2:
-                                    workflow_data[node_id]["inputs"]["images"] = item
-                                    print(f"Extracted image reference: {item}")
-                                    break
-                            else:
-                                print(f"Warning: Could not fix images input format: {images_input}")
-                    else:
-                        print(f"Warning: Unexpected images input type: {type(images_input)}")
-                
-                save_image_found = True
-                break
-        
-        if not save_image_found:
-            print("No SaveImage node found in workflow!")
+        # submit the workflow straight to the running server and wait for it to finish
+        with timer.phase("submit"):
+            submitted_at = time.time()
+            prompt_id = self.client.queue_prompt(workflow)
+        on_submitted(prompt_id)
+        with timer.phase("wait"):
+            history = self.client.wait(prompt_id, timeout=1200)
 
-        # save this updated workflow to a new file
-        workflow_path = f"/root/{client_id}.json"
-        with Path(workflow_path).open("w") as f:
-            json.dump(workflow_data, f, indent=2)
-        print(f"Saved workflow to {workflow_path}")
+        with timer.phase("fetch_images"):
+            outputs = self._collect_outputs(prompt_id, history, save_node_id)
+        return prompt_id, history, outputs, submitted_at
 
-        # Check if workflow file exists and show its contents
-        if not Path(workflow_path).exists():
-            raise FileNotFoundError(f"Workflow file not found: {workflow_path}")
-        
-        workflow_content = Path(workflow_path).read_text()
-        print(f"Workflow file contents: {workflow_content}")
+    @modal.method()
+    def run_job(self, job_id: str, workflow: Dict) -> List[Dict]:
+        """Run a job created by ``submit``, keeping its job record up to date.
+
+        The returned output images are held by Modal as this call's result,
+        which is what ``result`` fetches, so re-fetching never re-runs inference.
+        """
+        return self._run_job(job_id, workflow)
 
-        # runs the comfy run --workflow command as a subprocess
-        cmd = f"comfy run --workflow {workflow_path} --wait --timeout 1200 --verbose"
+    @modal.method()
+    def run_webhook(self, job_id: str, workflow: Dict, webhook_url: str, metadata: Dict) -> List[Dict]:
+        """Run a job created by ``webhook`` and POST the outcome to ``webhook_url``.
+
+        The callback carries ``request_id``, ``status`` and the client's
+        ``metadata``, plus the base64 images (``image`` is the first one,
+        ``images`` all of them by node and batch index) or the error.  The
+        images also stay fetchable from ``result?job_id=<request_id>``.
+        """
+        payload = {"request_id": job_id, **metadata}
+        outputs, error = None, None
         try:
-            result = subprocess.run(cmd, shell=True, check=True, capture_output=True, text=True)
-            print(f"Comfy run stdout: {result.stdout}")
-            if result.stderr:
-                print(f"Comfy run stderr: {result.stderr}")
-        except subprocess.CalledProcessError as e:
-            print(f"Comfy run failed with exit code {e.returncode}")
-            print(f"Command stdout: {e.stdout}")
-            print(f"Command stderr: {e.stderr}")
-            raise
+            outputs = self._run_job(job_id, workflow)
+            images = [
+                {"node_id": output["node_id"], "batch_index": output["batch_index"],
+                 "image": base64.b64encode(output["image"]).decode()}
+                for output in outputs
+            ]
+            payload.update(status="completed", content_type="image/png", image=images[0]["image"], images=images)
+        except Exception as e:
+            error = e
+            payload.update(status="failed", error=str(e))
 
-        # completed workflows write output images to this directory
-        output_dir = "/root/comfy/ComfyUI/output"
-        
-        # Check if output directory exists
-        if not Path(output_dir).exists():
-            print(f"Output directory does not exist: {output_dir}")
-            raise FileNotFoundError(f"Output directory not found: {output_dir}")
-        
-        print(f"Output directory contents: {list(Path(output_dir).iterdir())}")
+        try:
+            delivery = self.webhooks.deliver(webhook_url, payload)
+            print(f"Delivered job {job_id} to webhook in {delivery['attempts']} attempt(s)")
+        except DeliveryError as e:
+            print(f"❌ Webhook delivery for job {job_id} failed: {e}")
+            delivery = {"status": e.status, "attempts": e.attempts, "error": str(e)}
+        self.jobs.update(job_id, webhook=delivery)
+
+        if error is not None:
+            raise error
+        return outputs
+
+    def _run_job(self, job_id: str, workflow: Dict) -> List[Dict]:
+        total_nodes = len(workflow)
+        return self.jobs.track(
+            job_id,
+            lambda on_submitted: self._infer(workflow, on_submitted=on_submitted),
+            lambda prompt_id: self.client.progress(prompt_id, total_nodes),
+            JOB_PROGRESS_INTERVAL,
+        )
+
+    @modal.method()
+    def infer_batch(self, workflows: List[Dict]):
+        """Queue every workflow up front and yield results in completion order.
 
-        # looks up the name of the output image file based on the workflow
-        workflow = json.loads(workflow_content)
-        file_prefix = [
-            node.get("inputs")
-            for node in workflow.values()
-            if node.get("class_type") == "SaveImage"
-        ][0]["filename_prefix"]
+        Keeps the server queue full so the GPU never idles between prompts.
+        Yields ``{"index": i, "image": bytes}`` per workflow, or
+        ``{"index": i, "error": str}`` if that workflow failed; call it with
+        ``ComfyUI().infer_batch.remote_gen(workflows)``.
+        """
+        self.poll_server_health()
+        for index, prompt_id, history, save_node_id, error in self._run_batch(workflows):
+            if error is None:
+                try:
+                    yield {"index": index, "image": self._collect_image(prompt_id, history, save_node_id)}
+                    continue
+                except Exception as e:
+                    error = e
+            yield {"index": index, "error": str(error)}
 
-        print(f"Looking for files with prefix: {file_prefix}")
+    @modal.method()
+    def infer_sweep(self, template: Dict, variants: List[Dict], max_batch_size: int = 8):
+        """Run seed / override variants of one template, batching repeats of the same seed.
+
+        ``variants`` are ``{"seed": int, "overrides": {node_id: {input: value}}}``
+        dicts (see ``workflow_sweep``).  Variants sharing the same seed and
+        overrides run as one prompt with ``batch_size > 1``.  Yields
+        ``{"variant": i, "seed": s, "batch_index": b, "image": bytes}``, where
+        ``seed`` and ``batch_index`` reproduce that image, or ``{"variant": i,
+        "error": str}`` in completion order.
+        """
+        self.poll_server_health()
+        prompts = expand_sweep(template, variants, max_batch_size=max_batch_size)
+        print(f"Expanded {len(variants)} variants into {len(prompts)} prompts")
+        workflows = [workflow for workflow, _ in prompts]
+        for index, prompt_id, history, save_node_id, error in self._run_batch(workflows):
+            variant_indices = prompts[index][1]
+            seed = variants[variant_indices[0]].get("seed")
+            images = []
+            if error is None:
+                try:
+                    images = self._collect_images(prompt_id, history, save_node_id)
+                except Exception as e:
+                    error = e
+            for position, variant in enumerate(variant_indices):
+                if position < len(images):
+                    yield {"variant": variant, "seed": seed, "batch_index": position, "image": images[position]}
+                else:
+                    yield {"variant": variant, "error": str(error or "missing image in batch output")}
+
+    def _run_batch(self, workflows: List[Dict]):
+        """Queue all workflows, then yield ``(index, prompt_id, history, save_node_id, error)``
+        as each one finishes."""
+        prompts = {}
+        for index, workflow in enumerate(workflows):
+            workflow = normalize(workflow)
+            errors = validate_workflow(workflow, self.registry, self.model_files)
+            if errors:
+                print(f"Workflow {index} failed validation: {errors}")
+                yield index, None, None, None, WorkflowValidationError(errors)
+                continue
+            _, save_node_id = self._tag_save_image(workflow)
+            try:
+                prompt_id = self.client.queue_prompt(workflow)
+            except Exception as e:
+                print(f"Failed to queue workflow {index}: {e}")
+                yield index, None, None, save_node_id, e
+                continue
+            prompts[prompt_id] = (index, save_node_id)
+        print(f"Queued {len(prompts)}/{len(workflows)} workflows")
+
+        # each prompt gets the same budget as a single infer call
+        timeout = 1200 * max(len(prompts), 1)
+        for prompt_id, history, error in self.client.iter_completed(list(prompts), timeout=timeout):
+            index, save_node_id = prompts[prompt_id]
+            if error is not None:
+                print(f"Workflow {index} (prompt {prompt_id}) failed: {error}")
+            yield index, prompt_id, history, save_node_id, error
+
+    def _tag_save_image(self, workflow_data: Dict):
+        """Give every SaveImage node a unique filename prefix.
+
+        ``workflow_data`` should come from ``normalize`` so the nodes' image
+        links are already in canonical shape.  Returns ``(client_id,
+        save_node_id)`` where ``save_node_id`` is the first SaveImage node, or
+        ``None`` when the workflow has none.
+        """
+        # give the output images a unique id per client request
+        client_id = uuid.uuid4().hex
+        logger.debug(f"Generated client ID: {client_id}")
+
+        save_node_id = None
+        for node_id, node in workflow_data.items():
+            if node.get("class_type") == "SaveImage":
+                node["inputs"]["filename_prefix"] = client_id
+                logger.debug(f"Updated SaveImage node {node_id} with prefix {client_id}")
+                if save_node_id is None:
+                    save_node_id = node_id
 
-        # Clean up the temporary workflow file
+        if save_node_id is None:
+            print("No SaveImage node found in workflow!")
+        return client_id, save_node_id
+
+    def _collect_image(self, prompt_id: str, history: Dict, save_node_id) -> bytes:
+        """Read the first image a finished prompt saved."""
+        return self._collect_images(prompt_id, history, save_node_id)[0]
+
+    def _collect_images(self, prompt_id: str, history: Dict, save_node_id) -> List[bytes]:
+        """Read every image (one per batch entry) of the SaveImage node we tagged."""
+        outputs = self._collect_outputs(prompt_id, history, save_node_id)
+        # the tagged node's images come first when it saved any, otherwise the first output node's
+        node_id = outputs[0]["node_id"]
+        return [output["image"] for output in outputs if output["node_id"] == node_id]
+
+    def _collect_outputs(self, prompt_id: str, history: Dict, save_node_id) -> List[Dict]:
+        """Read every output image of a finished prompt, ``save_node_id``'s first,
+        and hand all of the prompt's output files to the reaper."""
+        # the history entry names the exact files each output node wrote
+        images = output_archive.ordered_outputs(history, first_node=save_node_id)
+        if not images:
+            print(f"Prompt {prompt_id} produced no output images")
+            raise FileNotFoundError(f"No output images for prompt {prompt_id}")
+
+        logger.debug(f"Returning {len(images)} output image(s) for prompt {prompt_id}")
         try:
-            Path(workflow_path).unlink()
-            print(f"Cleaned up temporary workflow file: {workflow_path}")
-        except:
-            pass
-
-        # returns the image as bytes
-        for f in Path(output_dir).iterdir():
-            if f.name.startswith(file_prefix):
-                print(f"Found matching file: {f.name}")
-                return f.read_bytes()
-        
-        print(f"No files found with prefix {file_prefix}")
-        raise FileNotFoundError(f"No output file found with prefix {file_prefix}")
+            return [
+                {"node_id": node_id, "batch_index": batch_index, "filename": image["filename"],
+                 "image": self.client.fetch_output(image)}
+                for node_id, batch_index, image in images
+            ]
+        finally:
+            for _, _, returned in images:
+                self.reaper.release(returned["filename"], returned.get("subfolder", ""))
 
     @modal.fastapi_endpoint(method="POST")
-    def api(self, item: Dict):
+    def api(self, item: Dict, debug: bool = False, all_outputs: bool = False):
+        """Run a workflow and return its first image, or with ``all_outputs=true``
+        a zip of every output image (``<node_id>/<batch_index>_<filename>``)."""
         from fastapi import Response
 
-        # Use the provided workflow
+        # the request body goes straight through validation and SaveImage tagging to the server
         workflow_data = item
-        print(f"Received workflow with {len(workflow_data)} nodes")
-        
-        # Show all node IDs and their class types
-        print("Workflow nodes:")
-        for node_id, node in workflow_data.items():
-            class_type = node.get("class_type", "unknown")
-            print(f"  Node {node_id}: {class_type}")
-        
-        # Show all connections
-        print("Workflow connections:")
-        for node_id, node in workflow_data.items():
-            if "inputs" in node:
-                for input_name, input_value in node["inputs"].items():
-                    if isinstance(input_value, list) and len(input_value) == 2:
-                        referenced_node = input_value[0]
-                        output_index = input_value[1]
-                        print(f"  Node {node_id}.{input_name} -> Node {referenced_node}[{output_index}]")
-        
-        print(f"Full workflow data: {json.dumps(workflow_data, indent=2)}")
-
-        # give the output image a unique id per client request
-        client_id = uuid.uuid4().hex
-        print(f"Generated client ID: {client_id}")
-        
-        # Find the first SaveImage node and update its filename prefix
-        save_image_found = False
-        for node_id, node in workflow_data.items():
-            if node.get("class_type") == "SaveImage":
-                workflow_data[node_id]["inputs"]["filename_prefix"] = client_id
-                print(f"Updated SaveImage node {node_id} with prefix {client_id}")
-                
-                # Fix the image input format if it's malformed
-                if "images" in node["inputs"]:
-                    images_input = node["inputs"]["images"]
-                    print(f"Original images input: {images_input}")
-                    
-                    # Handle different malformed formats
-                    if isinstance(images_input, list):
-                        if len(images_input) == 1 and isinstance(images_input[0], list):
-                            # Case: [["8", 0]] -> ["8", 0]
-                            workflow_data[node_id]["inputs"]["images"] = images_input[0]
-                            print(f"Fixed nested list format: {workflow_data[node_id]['inputs']['images']}")
-                        elif len(images_input) == 2 and all(isinstance(x, (str, int)) for x in images_input):
-                            # Case: ["8", 0] - this is already correct
-                            print(f"Images input format is already correct: {images_input}")
-                        else:
-                            # Try to extract the first valid image reference
-                            for item in images_input:
-                                if isinstance(item, list) and len(item) == 2:
-                                    workflow_data[node_id]["inputs"]["images"] = item
-                                    print(f"Extracted image reference: {item}")
-                                    break
-                            else:
-                                print(f"Warning: Could not fix images input format: {images_input}")
-                    else:
-                        print(f"Warning: Unexpected images input type: {type(images_input)}")
-                
-                save_image_found = True
-                break
-        
-        if not save_image_found:
+        if not has_save_image(workflow_data):
             print("No SaveImage node found in workflow!")
             return Response(content="No SaveImage node found in workflow", status_code=400)
 
-        # save this updated workflow to a new file
-        new_workflow_file = f"/root/{client_id}.json"
-        with Path(new_workflow_file).open("w") as f:
-            json.dump(workflow_data, f, indent=2)
-        print(f"Saved workflow to {new_workflow_file}")
-
         try:
             # run inference on the currently running container
-            img_bytes = self.infer.local(new_workflow_file)
-            print(f"Inference completed, got {len(img_bytes)} bytes")
-            return Response(img_bytes, media_type="image/jpeg")
+            result = self.infer.local(workflow_data, debug=debug, all_outputs=all_outputs)
+            if all_outputs:
+                return Response(output_archive.pack(result), media_type=output_archive.MEDIA_TYPE,
+                                headers={"Content-Disposition": 'attachment; filename="outputs.zip"'})
+            return Response(result, media_type="image/jpeg")
+        except WorkflowValidationError as e:
+            # reject invalid workflows with a structured error
+            print(f"Rejected workflow: {e.errors}")
+            return Response(content=json.dumps(e.as_dict()), status_code=400, media_type="application/json")
         except Exception as e:
             print(f"Error during inference: {str(e)}")
             return Response(content=f"Error during inference: {str(e)}", status_code=500)
-        finally:
-            # Clean up the temporary workflow file
+
+    @modal.fastapi_endpoint(method="POST")
+    def stream(self, item: Dict):
+        """Run a workflow and stream it back as Server-Sent Events.
+
+        Events: ``queued`` (prompt id), ``progress`` (and ``preview`` when
+        ``PREVIEW_METHOD`` is set) while it runs, the output images as base64
+        ``image`` chunks, then ``done``; or ``error`` if anything fails after
+        the stream has started.
+        """
+        from fastapi.responses import JSONResponse, StreamingResponse
+
+        workflow = normalize(item)
+        errors = validate_workflow(workflow, self.registry, self.model_files)
+        if errors:
+            return JSONResponse(WorkflowValidationError(errors).as_dict(), status_code=400)
+        return StreamingResponse(
+            self._stream(workflow),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    def _stream(self, workflow: Dict):
+        """Event-stream frames for one validated, normalized workflow."""
+        timer = Timeline()
+        request_id = uuid.uuid4().hex
+        key = workflow_hash(workflow, normalized=True)
+        self.request_log.received(request_id, workflow, key, stream=True)
+
+        outputs = self.result_cache.get(key) if self.result_cache is not None else None
+        if outputs is not None:
+            outputs = output_archive.unpack(outputs)
+            self.request_log.completed(request_id, "cached", timer.durations(), images=len(outputs))
+        else:
             try:
-                Path(new_workflow_file).unlink()
-                print(f"Cleaned up temporary workflow file: {new_workflow_file}")
-            except:
-                pass
+                with timer.phase("health_check"):
+                    self.poll_server_health()
+                _, save_node_id = self._tag_save_image(workflow)
+
+                # listen before queueing so the first steps' events are not missed
+                with PromptEvents(self.client) as events:
+                    with timer.phase("submit"):
+                        prompt_id = self.client.queue_prompt(workflow)
+                    yield sse("queued", {"prompt_id": prompt_id})
+                    with timer.phase("wait"):
+                        is_done = lambda: self.client.get_history(prompt_id) is not None
+                        for event, data in progress_events(events, prompt_id, len(workflow), is_done):
+                            yield sse(event, data)
+
+                with timer.phase("fetch_images"):
+                    history = self.client.wait(prompt_id, timeout=60)
+                    outputs = self._collect_outputs(prompt_id, history, save_node_id)
+            except Exception as e:
+                print(f"Error during streamed inference: {str(e)}")
+                self.request_log.completed(request_id, "error", timer.durations(), error=str(e))
+                yield sse("error", {"error": str(e)})
+                return
+            if self.result_cache is not None:
+                self.result_cache.put(key, output_archive.pack(outputs))
+            self.request_log.completed(request_id, "ok", timer.durations(), prompt_id=prompt_id, images=len(outputs))
+
+        for event, data in image_chunks(outputs):
+            yield sse(event, data)
+        yield sse("done", {"images": len(outputs), "seconds": timer.durations()["total"]})
+
+    @modal.fastapi_endpoint(method="POST")
+    def submit(self, item: Dict):
+        """Queue a workflow and return ``{"job_id", "state"}`` right away (202)."""
+        from fastapi.responses import JSONResponse
+
+        workflow = normalize(item)
+        if not has_save_image(workflow):
+            return JSONResponse({"error": "No SaveImage node found in workflow"}, status_code=400)
+        errors = validate_workflow(workflow, self.registry, self.model_files)
+        if errors:
+            return JSONResponse(WorkflowValidationError(errors).as_dict(), status_code=400)
+
+        job_id = uuid.uuid4().hex
+        record = self.jobs.create(job_id)
+        call = ComfyUI().run_job.spawn(job_id, workflow)
+        self.jobs.set_call(job_id, call.object_id)
+        print(f"Submitted job {job_id} as call {call.object_id}")
+        return JSONResponse({"job_id": job_id, "state": record["state"]}, status_code=202)
+
+    @modal.fastapi_endpoint(method="POST")
+    def webhook(self, item: Dict):
+        """Accept ``{"workflow", "webhook_url", "user_id", "session_key", "callback_data"}`` with a 202.
+
+        The generation runs in the background and its result is POSTed to
+        ``webhook_url`` (see ``run_webhook``).
+        """
+        from fastapi.responses import JSONResponse
+
+        workflow, webhook_url = item.get("workflow"), item.get("webhook_url")
+        if not isinstance(workflow, dict) or not isinstance(webhook_url, str):
+            return JSONResponse({"error": "Body needs a workflow object and an http(s) webhook_url"}, status_code=400)
+        # never let a caller point us at our own ComfyUI server or another private address
+        try:
+            check_destination(webhook_url)
+        except (DeliveryError, OSError) as e:
+            return JSONResponse({"error": f"Invalid webhook_url: {e}"}, status_code=400)
+        workflow = normalize(workflow)
+        if not has_save_image(workflow):
+            return JSONResponse({"error": "No SaveImage node found in workflow"}, status_code=400)
+        errors = validate_workflow(workflow, self.registry, self.model_files)
+        if errors:
+            return JSONResponse(WorkflowValidationError(errors).as_dict(), status_code=400)
+
+        request_id = uuid.uuid4().hex
+        metadata = {key: item.get(key) for key in ("user_id", "session_key", "callback_data")}
+        self.jobs.create(request_id, webhook_url=webhook_url)
+        call = ComfyUI().run_webhook.spawn(request_id, workflow, webhook_url, metadata)
+        self.jobs.set_call(request_id, call.object_id)
+        print(f"Accepted webhook job {request_id} for user {metadata['user_id']}")
+        return JSONResponse(
+            {"request_id": request_id, "message": "Accepted; the result will be POSTed to webhook_url"},
+            status_code=202,
+        )
 
     def poll_server_health(self) -> Dict:
         """Check server health with multiple retries before giving up.
@@ -624,7 +830,7 @@ class ComfyUI:
             try:
                 req = urllib.request.Request(f"http://127.0.0.1:{self.port}/system_stats")
                 urllib.request.urlopen(req, timeout=5)
-                print("ComfyUI server is healthy")
+                logger.debug("ComfyUI server is healthy")
                 return
             except (socket.timeout, urllib.error.URLError) as e:
                 print(
@@ -639,3 +845,41 @@ class ComfyUI:
         modal.experimental.stop_fetching_inputs()
         raise Exception("ComfyUI server is not healthy after retries, stopping container")
 
+
+# job status and results only read the job records and the spawned call, so they
+# are served by CPU containers instead of waking (or queueing behind) a GPU one
+@app.function()
+@modal.fastapi_endpoint(method="GET")
+def status(job_id: str):
+    """Job record: state, progress percentage, queue position and error."""
+    from fastapi.responses import JSONResponse
+
+    record = JobStore(job_records).get(job_id)
+    if record is None:
+        return JSONResponse({"error": f"Unknown job {job_id}"}, status_code=404)
+    return JSONResponse(record)
+
+
+@app.function()
+@modal.fastapi_endpoint(method="GET")
+def result(job_id: str, all_outputs: bool = False):
+    """The finished image (a zip of all of them with ``all_outputs=true``);
+    202 with the job record while it is still running."""
+    from fastapi import Response
+    from fastapi.responses import JSONResponse
+
+    jobs = JobStore(job_records)
+    record = jobs.get(job_id)
+    call_id = jobs.call_id(job_id)
+    if record is None or call_id is None:
+        return JSONResponse({"error": f"Unknown job {job_id}"}, status_code=404)
+    try:
+        outputs = modal.FunctionCall.from_id(call_id).get(timeout=0)
+    except TimeoutError:
+        return JSONResponse(record, status_code=202)
+    except Exception as e:
+        return JSONResponse({**record, "state": "failed", "error": str(e)}, status_code=500)
+    if all_outputs:
+        return Response(output_archive.pack(outputs), media_type=output_archive.MEDIA_TYPE,
+                        headers={"Content-Disposition": f'attachment; filename="{job_id}.zip"'})
+    return Response(outputs[0]["image"], media_type="image/jpeg")
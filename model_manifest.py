@@ -0,0 +1,71 @@
+"""Loader for ``model_manifest.json``, the single list of models we deploy.
+
+Each entry has ``name`` (file name on the ``comfy-cache`` volume and in ComfyUI),
+``type`` (one of ``COMFY_PATHS``), ``source`` (``"civitai"`` or ``"local"`` for
+files uploaded by hand), ``id`` (Civitai model version id), ``size`` and
+``sha256`` (``null`` until known) and ``batch`` (the download batch it was added
+in).  The downloader, symlinkers, volume checkers and image build all read it, so
+adding a model is a one-line change to the JSON file.
+"""
+import json
+import os
+from typing import Dict, List, Optional
+
+MANIFEST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model_manifest.json")
+
+COMFY_ROOT = "/root/comfy/ComfyUI"
+
+# Mapping of model types to ComfyUI subdirectories
+COMFY_PATHS = {
+    "checkpoint": f"{COMFY_ROOT}/models/checkpoints",
+    "lora":       f"{COMFY_ROOT}/models/loras",
+    "upscaler":   f"{COMFY_ROOT}/models/upscale_models",
+    "segm":       f"{COMFY_ROOT}/custom_nodes/ComfyUI-Impact-Pack/models/segm",
+    "bbox":       f"{COMFY_ROOT}/custom_nodes/ComfyUI-Impact-Pack/models/bbox",
+    "sam":        f"{COMFY_ROOT}/custom_nodes/ComfyUI-Impact-Pack/models/sam",
+}
+
+SOURCES = ("civitai", "local")
+
+
+def load_manifest(path: str = MANIFEST_PATH) -> List[Dict]:
+    """Read and validate the manifest; raises ``ValueError`` on bad entries."""
+    with open(path) as f:
+        models = json.load(f)["models"]
+
+    seen = set()
+    for model in models:
+        name = model.get("name")
+        if not name:
+            raise ValueError(f"Manifest entry without a name: {model}")
+        if name in seen:
+            raise ValueError(f"Duplicate manifest entry: {name}")
+        seen.add(name)
+        if model.get("type") not in COMFY_PATHS:
+            raise ValueError(f"Unknown model_type for {name}: {model.get('type')}")
+        if model.get("source") not in SOURCES:
+            raise ValueError(f"Unknown source for {name}: {model.get('source')}")
+        if model["source"] == "civitai" and not model.get("id"):
+            raise ValueError(f"Civitai model {name} has no id")
+        model.setdefault("size", None)
+        model.setdefault("sha256", None)
+        model.setdefault("batch", None)
+    return models
+
+
+def by_name(models: List[Dict]) -> Dict[str, Dict]:
+    """Index manifest entries by file name."""
+    return {model["name"]: model for model in models}
+
+
+def select(models: List[Dict], batch: Optional[str] = None, source: Optional[str] = None) -> List[Dict]:
+    """Filter manifest entries by ``batch`` and/or ``source``."""
+    return [
+        model for model in models
+        if (batch is None or model["batch"] == batch) and (source is None or model["source"] == source)
+    ]
+
+
+def link_path(model: Dict) -> str:
+    """Where ComfyUI expects to find ``model``."""
+    return os.path.join(COMFY_PATHS[model["type"]], model["name"])
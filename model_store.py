@@ -0,0 +1,198 @@
+"""Content-addressed model storage on the ``comfy-cache`` volume.
+
+Layout under the volume root::
+
+    blobs/sha256/<hex>       one file per distinct content
+    index/<name>.json        {"sha256", "size", "source_id"} for each model name
+    index/.combined          every entry above in one file, for whole-index reads
+
+Several names (or several Civitai ids) that resolve to the same bytes share one
+blob, and a model whose index entry and blob are present is never downloaded
+again.  Index entries are one small file per name, so concurrent downloader
+containers never overwrite each other's updates.  Each write also folds the
+entry into ``.combined``, so ``index()`` (and the boot-time reconcile through
+``locations()``) reads one file plus a directory listing instead of every
+entry; names a lost ``.combined`` update missed are read from their own file
+and folded back in.  Files from the old flat
+layout (``<root>/<name>``) are still resolved until ``import_legacy`` hashes
+them and moves them into ``blobs/``.
+"""
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+HASH_BLOCK_SIZE = 8 * 1024 * 1024
+
+# all index entries in one file; no ".json" suffix, so it is never taken for a model name
+COMBINED_INDEX = ".combined"
+
+
+class ChecksumMismatch(ValueError):
+    """Raised when a file's sha256 differs from the expected digest."""
+
+
+def sha256_file(path: str, block_size: int = HASH_BLOCK_SIZE) -> str:
+    """Hash a file in fixed-size blocks without reading it into memory."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                return digest.hexdigest()
+            digest.update(block)
+
+
+def _file_names(directory: str) -> List[str]:
+    try:
+        with os.scandir(directory) as it:
+            return [item.name for item in it if item.is_file()]
+    except FileNotFoundError:
+        return []
+
+
+class ModelStore:
+    def __init__(self, root: str):
+        self.root = root
+        self.blob_dir = os.path.join(root, "blobs", "sha256")
+        self.index_dir = os.path.join(root, "index")
+
+    def blob_path(self, sha256: str) -> str:
+        return os.path.join(self.blob_dir, sha256)
+
+    def _entry_path(self, name: str) -> str:
+        return os.path.join(self.index_dir, name + ".json")
+
+    def entry(self, name: str) -> Optional[Dict]:
+        try:
+            with open(self._entry_path(name)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _read_combined(self) -> Dict[str, Dict]:
+        try:
+            with open(os.path.join(self.index_dir, COMBINED_INDEX)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _write_combined(self, entries: Dict[str, Dict]):
+        path = os.path.join(self.index_dir, COMBINED_INDEX)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(entries, f)
+        os.replace(tmp, path)
+
+    def index(self) -> Dict[str, Dict]:
+        """All index entries keyed by model name, from ``.combined`` and one directory scan."""
+        names = [item[:-len(".json")] for item in _file_names(self.index_dir) if item.endswith(".json")]
+        combined = self._read_combined()
+        missed = [name for name in names if name not in combined]
+        for name in missed:
+            entry = self.entry(name)
+            if entry is not None:
+                combined[name] = entry
+        if missed:
+            self._write_combined(combined)
+        # names whose entry file was removed drop out with it
+        return {name: combined[name] for name in names if name in combined}
+
+    def _write_entry(self, name: str, sha256: str, size: int, source_id: Optional[str]):
+        os.makedirs(self.index_dir, exist_ok=True)
+        entry = {"sha256": sha256, "size": size, "source_id": source_id}
+        path = self._entry_path(name)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+        combined = self._read_combined()
+        combined[name] = entry
+        self._write_combined(combined)
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Path holding ``name``'s bytes: its blob, else a legacy flat file, else ``None``."""
+        entry = self.entry(name)
+        if entry and os.path.isfile(self.blob_path(entry["sha256"])):
+            return self.blob_path(entry["sha256"])
+        legacy = os.path.join(self.root, name)
+        return legacy if os.path.isfile(legacy) else None
+
+    def locations(self) -> Dict[str, str]:
+        """``resolve()`` for every stored name at once: one scan each of the index, blobs and root."""
+        blobs = set(_file_names(self.blob_dir))
+        found = {name: os.path.join(self.root, name) for name in _file_names(self.root)}
+        for name, entry in self.index().items():
+            if entry.get("sha256") in blobs:
+                found[name] = self.blob_path(entry["sha256"])
+        return found
+
+    def has(self, name: str, sha256: Optional[str] = None, size: Optional[int] = None) -> bool:
+        """Whether ``name`` is stored (and matches ``sha256``/``size`` when given)."""
+        entry = self.entry(name)
+        if not entry or not os.path.isfile(self.blob_path(entry["sha256"])):
+            return False
+        if sha256 and entry["sha256"] != sha256:
+            return False
+        return size is None or entry["size"] == size
+
+    def find_by_source(self, source_id: str) -> Optional[str]:
+        """sha256 of an already stored download of ``source_id``, if any."""
+        for entry in self.index().values():
+            if entry.get("source_id") == str(source_id) and os.path.isfile(self.blob_path(entry["sha256"])):
+                return entry["sha256"]
+        return None
+
+    def alias(self, name: str, sha256: str, source_id: Optional[str] = None):
+        """Point ``name`` at an existing blob without copying any bytes."""
+        path = self.blob_path(sha256)
+        self._write_entry(name, sha256, os.path.getsize(path), source_id)
+
+    def add_file(self, path: str, name: str, source_id: Optional[str] = None,
+                 expected_sha256: Optional[str] = None, expected_size: Optional[int] = None) -> str:
+        """Verify ``path``, move it into the blob store as ``name`` and return its sha256.
+
+        The source file is consumed: it becomes the blob, or is deleted when an
+        identical blob already exists.  On a size or checksum mismatch the file
+        is deleted and ``ChecksumMismatch`` is raised, so a truncated download
+        is never linked.
+        """
+        size = os.path.getsize(path)
+        if expected_size is not None and size != expected_size:
+            os.remove(path)
+            raise ChecksumMismatch(f"{name}: expected {expected_size} bytes, got {size}")
+        sha256 = sha256_file(path)
+        if expected_sha256 and sha256 != expected_sha256.lower():
+            os.remove(path)
+            raise ChecksumMismatch(f"{name}: expected sha256 {expected_sha256}, got {sha256}")
+
+        os.makedirs(self.blob_dir, exist_ok=True)
+        blob = self.blob_path(sha256)
+        if os.path.isfile(blob):
+            os.remove(path)
+        else:
+            os.replace(path, blob)
+        self._write_entry(name, sha256, size, source_id)
+        return sha256
+
+    def import_legacy(self, name: str, source_id: Optional[str] = None,
+                      expected_sha256: Optional[str] = None, expected_size: Optional[int] = None) -> Optional[str]:
+        """Move an old flat-layout ``<root>/<name>`` file into the blob store.
+
+        Returns its sha256, or ``None`` when there is no such file.  A file that
+        does not match ``expected_sha256``/``expected_size`` is deleted like a
+        bad download (``ChecksumMismatch``), so it gets downloaded again.
+        """
+        legacy = os.path.join(self.root, name)
+        if os.path.islink(legacy) or not os.path.isfile(legacy):
+            return None
+        return self.add_file(legacy, name, source_id=source_id,
+                             expected_sha256=expected_sha256, expected_size=expected_size)
+
+    def verify(self, name: str) -> bool:
+        """Re-hash ``name``'s blob and compare it with the index."""
+        entry = self.entry(name)
+        if not entry:
+            return False
+        blob = self.blob_path(entry["sha256"])
+        return os.path.isfile(blob) and sha256_file(blob) == entry["sha256"]
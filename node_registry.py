@@ -0,0 +1,81 @@
+"""Which node classes a ComfyUI install provides, from the server's ``/object_info``.
+
+``/object_info`` lists every registered ``NODE_CLASS_MAPPINGS`` entry (built-in
+and custom nodes) with its input spec and outputs, so checking the
+``class_type`` of every node in a workflow becomes a set lookup.  The response
+only changes when the image changes (custom nodes are installed at build time),
+so it is cached as ``<cache_dir>/<image id>.json`` and later containers of the
+same image skip the request.
+"""
+import json
+import logging
+import os
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def image_key() -> str:
+    """Cache key for the current image (Modal sets ``MODAL_IMAGE_ID`` in containers)."""
+    return os.environ.get("MODAL_IMAGE_ID", "local")
+
+
+class NodeRegistry:
+    def __init__(self, object_info: Dict):
+        self.object_info = object_info
+        self.class_types = frozenset(object_info)
+
+    def __contains__(self, class_type: str) -> bool:
+        return class_type in self.class_types
+
+    def __len__(self) -> int:
+        return len(self.class_types)
+
+    def missing(self, class_types: Iterable[str]) -> List[str]:
+        """The ``class_types`` this server does not know, sorted."""
+        return sorted(set(class_types) - self.class_types)
+
+    def inputs(self, class_type: str) -> Dict[str, list]:
+        """``{input_name: spec}`` for the required and optional inputs of ``class_type``."""
+        spec = self.object_info.get(class_type, {}).get("input", {})
+        return {**spec.get("required", {}), **spec.get("optional", {})}
+
+    def required_inputs(self, class_type: str) -> List[str]:
+        return list(self.object_info.get(class_type, {}).get("input", {}).get("required", {}))
+
+    def output_count(self, class_type: str) -> int:
+        return len(self.object_info.get(class_type, {}).get("output", []))
+
+    def save(self, path: str, key: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"key": key, "object_info": self.object_info}, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, key: str) -> Optional["NodeRegistry"]:
+        """The cached registry at ``path`` if it was built for ``key``, else ``None``."""
+        try:
+            with open(path) as f:
+                cached = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if cached.get("key") != key:
+            return None
+        return cls(cached["object_info"])
+
+
+def load_registry(client, cache_dir: str, key: Optional[str] = None) -> NodeRegistry:
+    """Cached registry for this image, fetching ``/object_info`` through ``client`` on a miss."""
+    key = key or image_key()
+    path = os.path.join(cache_dir, f"{key}.json")
+    registry = NodeRegistry.load(path, key)
+    if registry is not None:
+        return registry
+    registry = NodeRegistry(client.object_info())
+    try:
+        registry.save(path, key)
+    except OSError as e:
+        logger.warning("Could not cache node registry at %s: %s", path, e)
+    return registry
@@ -0,0 +1,47 @@
+"""Every image a finished prompt produced, grouped by output node and batch index.
+
+``ordered_outputs`` turns a history entry into ``(node_id, batch_index, image)``
+triples: the requested node first, then the other output nodes in node-id
+order, each node's images in batch order.  Fetched results are lists of
+``{"node_id", "batch_index", "filename", "image"}`` dicts, which ``pack``
+stores as a zip (``<node_id>/<batch_index>_<filename>``, uncompressed since the
+PNGs already are) for HTTP responses and the result cache, and ``unpack``
+reads back.
+"""
+import io
+import zipfile
+from typing import Dict, List, Optional, Tuple
+
+from comfy_client import output_images
+from workflow_normalize import _node_sort_key
+
+MEDIA_TYPE = "application/zip"
+
+
+def ordered_outputs(history_entry: Dict, first_node: Optional[str] = None) -> List[Tuple[str, int, Dict]]:
+    """``(node_id, batch_index, image)`` for every output image, ``first_node``'s first."""
+    by_node: Dict[str, List[Dict]] = {}
+    for node_id, image in output_images(history_entry):
+        by_node.setdefault(str(node_id), []).append(image)
+    order = sorted(by_node, key=lambda node_id: (node_id != first_node, _node_sort_key(node_id)))
+    return [(node_id, index, image) for node_id in order for index, image in enumerate(by_node[node_id])]
+
+
+def pack(outputs: List[Dict]) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as archive:
+        for output in outputs:
+            name = f"{output['node_id']}/{output['batch_index']:03d}_{output['filename']}"
+            archive.writestr(name, output["image"])
+    return buffer.getvalue()
+
+
+def unpack(data: bytes) -> List[Dict]:
+    outputs = []
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        for info in archive.infolist():
+            node_id, _, rest = info.filename.partition("/")
+            batch_index, _, filename = rest.partition("_")
+            outputs.append({"node_id": node_id, "batch_index": int(batch_index), "filename": filename,
+                            "image": archive.read(info)})
+    return outputs
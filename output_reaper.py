@@ -0,0 +1,122 @@
+"""Background eviction of ComfyUI output files on warm containers.
+
+ComfyUI never deletes anything from its output directory, so a container that
+stays warm for hours keeps accumulating images.  ``OutputReaper`` deletes files
+as soon as ``infer`` has handed them back to the caller and periodically sweeps
+the directory, evicting the oldest files first until it is under the configured
+age, byte and file-count caps.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class OutputReaper:
+    def __init__(self, directory: str, max_bytes: Optional[int] = None, max_files: Optional[int] = None,
+                 max_age: Optional[float] = None, interval: float = 60):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.max_age = max_age
+        self.interval = interval
+        self._released: "queue.Queue[str]" = queue.Queue()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="output-reaper", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._released.put("")  # wake the loop
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def release(self, filename: str, subfolder: str = ""):
+        """Mark an output file as returned to the caller so it can be deleted."""
+        self._released.put(os.path.join(self.directory, subfolder, filename))
+
+    def _loop(self):
+        next_sweep = time.monotonic() + self.interval
+        while not self._stop.is_set():
+            timeout = max(0.0, next_sweep - time.monotonic())
+            try:
+                path = self._released.get(timeout=timeout)
+                if path:
+                    self._remove(path)
+            except queue.Empty:
+                pass
+            if time.monotonic() >= next_sweep:
+                try:
+                    self.sweep()
+                except Exception as e:
+                    logger.warning("Output sweep failed: %s", e)
+                next_sweep = time.monotonic() + self.interval
+
+    def drain(self) -> int:
+        """Delete every released file right now; returns how many were removed."""
+        removed = 0
+        while True:
+            try:
+                path = self._released.get_nowait()
+            except queue.Empty:
+                return removed
+            if path and self._remove(path):
+                removed += 1
+
+    def _remove(self, path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            logger.warning("Could not remove output %s: %s", path, e)
+            return False
+
+    def _scan(self) -> List[Tuple[float, int, str]]:
+        entries = []
+        stack = [self.directory]
+        while stack:
+            try:
+                it = os.scandir(stack.pop())
+            except FileNotFoundError:
+                continue
+            with it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        st = entry.stat(follow_symlinks=False)
+                        entries.append((st.st_mtime, st.st_size, entry.path))
+        return entries
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Evict expired files, then the oldest ones until under the caps."""
+        now = time.time() if now is None else now
+        entries = sorted(self._scan())
+        total_bytes = sum(size for _, size, _ in entries)
+        total_files = len(entries)
+        removed = 0
+        for mtime, size, path in entries:
+            expired = self.max_age is not None and now - mtime > self.max_age
+            over_bytes = self.max_bytes is not None and total_bytes > self.max_bytes
+            over_files = self.max_files is not None and total_files > self.max_files
+            if not (expired or over_bytes or over_files):
+                break
+            if self._remove(path):
+                removed += 1
+            total_bytes -= size
+            total_files -= 1
+        if removed:
+            logger.info("Evicted %d output files (%d bytes, %d files left)", removed, total_bytes, total_files)
+        return removed
@@ -0,0 +1,123 @@
+"""Server-Sent Events for a running prompt: progress, latent previews, then the images.
+
+``PromptEvents`` subscribes to a ``ComfyClient``'s websocket events before the
+prompt is queued (so nothing is missed between ``/prompt`` returning and the
+first step) and ``progress_events`` turns the events of one prompt into
+``(event, data)`` pairs until it finishes:
+
+* ``progress``: ``{"node", "value", "max", "progress"}``, ``progress`` being the
+  same 0..1 estimate as ``ComfyClient.progress`` (nodes started, plus the
+  sampler's steps within the current node).
+* ``preview``: ``{"node", "format", "data"}`` with a base64 latent preview
+  (only when the server runs with a ``--preview-method`` other than ``none``).
+
+``image_chunks`` then splits the finished images into base64 ``image`` events
+of ``CHUNK_SIZE`` bytes, and ``sse`` formats any pair as an event-stream frame.
+"""
+import base64
+import json
+import queue
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from comfy_client import ComfyClient, ComfyError
+
+CHUNK_SIZE = 64 * 1024  # image bytes per ``image`` event
+HEARTBEAT_INTERVAL = 15  # seconds between keep-alive comments while nothing happens
+
+
+def sse(event: Optional[str], data=None) -> str:
+    """One event-stream frame; ``event=None`` gives a keep-alive comment."""
+    if event is None:
+        return ": keep-alive\n\n"
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class PromptEvents:
+    """Buffer a client's websocket events while in use as a context manager."""
+
+    def __init__(self, client: ComfyClient):
+        self.client = client
+        self._queue: "queue.Queue[Tuple[str, Dict]]" = queue.Queue()
+
+    def _on_event(self, prompt_id: str, event: Dict):
+        self._queue.put((prompt_id, event))
+
+    def __enter__(self) -> "PromptEvents":
+        self.client.add_listener(self._on_event)
+        return self
+
+    def __exit__(self, *exc):
+        self.client.remove_listener(self._on_event)
+
+    def get(self, timeout: float) -> Optional[Tuple[str, Dict]]:
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+def progress_events(events: PromptEvents, prompt_id: str, total_nodes: int, is_done: Callable[[], bool],
+                    heartbeat: float = HEARTBEAT_INTERVAL, timeout: float = 1200) -> Iterator[Tuple[Optional[str], Dict]]:
+    """Yield ``(event, data)`` for ``prompt_id`` until it finishes.
+
+    ``(None, {})`` is yielded after ``heartbeat`` quiet seconds, when
+    ``is_done()`` is also checked in case the completion event was missed.
+    Raises ``ComfyError`` if the prompt fails and ``TimeoutError`` after
+    ``timeout`` seconds.
+    """
+    nodes = set()
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"Prompt {prompt_id} did not finish within {timeout}s")
+        received = events.get(min(heartbeat, remaining))
+        if received is None:
+            if is_done():
+                return
+            yield None, {}
+            continue
+        event_prompt, event = received
+        if event_prompt != prompt_id:
+            continue
+        msg_type, data = event["type"], event["data"]
+
+        if msg_type in ("execution_error", "execution_interrupted"):
+            raise ComfyError(f"Prompt {prompt_id} failed", data)
+        if msg_type == "executing" and data.get("node") is None:
+            return
+        if msg_type == "preview":
+            yield "preview", {"node": data["node"], "format": data["format"],
+                              "data": base64.b64encode(data["image"]).decode()}
+            continue
+        if msg_type not in ("executing", "execution_cached", "progress"):
+            continue
+
+        value = maximum = 0
+        if msg_type == "executing":
+            nodes.add(data["node"])
+        elif msg_type == "execution_cached":
+            nodes.update(data.get("nodes") or [])
+        else:
+            value, maximum = data.get("value", 0), data.get("max", 0)
+        step = value / maximum if maximum else 0.0
+        done = max(len(nodes) - 1, 0) + step
+        yield "progress", {"node": data.get("node"), "value": value, "max": maximum,
+                           "progress": round(min(done / max(total_nodes, 1), 0.99), 3)}
+
+
+def image_chunks(outputs: List[Dict], chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[str, Dict]]:
+    """``image`` events carrying each output in base64 chunks; ``last`` marks an image's final chunk."""
+    for output in outputs:
+        image = output["image"]
+        count = max(1, -(-len(image) // chunk_size))
+        for index in range(count):
+            yield "image", {
+                "node_id": output["node_id"],
+                "batch_index": output["batch_index"],
+                "filename": output["filename"],
+                "chunk": index,
+                "last": index == count - 1,
+                "data": base64.b64encode(image[index * chunk_size:(index + 1) * chunk_size]).decode(),
+            }
@@ -0,0 +1,51 @@
+"""Compact, level-gated per-request logging for the inference endpoints.
+
+Each request produces two single-line JSON records on the ``requests`` logger:
+``request_received`` (request id, workflow hash, node count) and
+``request_completed`` (status, prompt id, timings).  The hash is the one the
+caller already computed for the result cache (``workflow_normalize.workflow_hash``),
+so log lines can be matched against cache keys.  The full workflow body is only
+serialised when that request is sampled (``REQUEST_LOG_SAMPLE_RATE``) or asked
+for debug output, so under load a request costs no extra serialisation at all.
+"""
+import json
+import logging
+import random
+from typing import Callable, Dict, Optional
+
+
+class RequestLog:
+    def __init__(self, logger: Optional[logging.Logger] = None, sample_rate: float = 0.0,
+                 rng: Callable[[], float] = random.random):
+        self.logger = logger or logging.getLogger("requests")
+        self.sample_rate = sample_rate
+        self.rng = rng
+
+    def _emit(self, level: int, record: Dict):
+        self.logger.log(level, json.dumps(record, separators=(",", ":"), default=str))
+
+    def received(self, request_id: str, workflow: Dict, workflow_hash: str, debug: bool = False, **fields) -> bool:
+        """Log a received workflow under its ``workflow_hash``; returns whether it is sampled for full dumps."""
+        sampled = debug or (self.sample_rate > 0 and self.rng() < self.sample_rate)
+        if self.logger.isEnabledFor(logging.INFO):
+            self._emit(logging.INFO, {
+                "event": "request_received",
+                "request_id": request_id,
+                "workflow_hash": workflow_hash,
+                "nodes": len(workflow) if isinstance(workflow, dict) else None,
+                **fields,
+            })
+        if sampled or self.logger.isEnabledFor(logging.DEBUG):
+            self._emit(logging.INFO if sampled else logging.DEBUG,
+                       {"event": "request_body", "request_id": request_id, "workflow": workflow})
+        return sampled
+
+    def completed(self, request_id: str, status: str, timings: Optional[Dict] = None, **fields):
+        if self.logger.isEnabledFor(logging.INFO):
+            self._emit(logging.INFO, {
+                "event": "request_completed",
+                "request_id": request_id,
+                "status": status,
+                **fields,
+                "timings": timings or {},
+            })
@@ -0,0 +1,133 @@
+"""Content-addressed cache of finished generations.
+
+A workflow with fixed seeds, prompts and LoRAs always renders the same image,
+so ``infer`` can answer a repeat from disk instead of the GPU.  Entries are
+keyed by the caller's ``workflow_normalize.workflow_hash``, which leaves out the
+parts that differ between otherwise identical requests (``_meta`` titles, link
+shapes and the ``filename_prefix`` rewritten per request).  Each
+entry is one file under ``directory`` (a volume path in production, a temp dir
+in tests); entries older than ``ttl`` are misses, and the least recently used ones
+are evicted once the cache holds more than ``max_bytes`` or ``max_entries``.
+"""
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SUFFIX = ".bin"
+
+
+class ResultCache:
+    def __init__(self, directory: str, ttl: float = 24 * 3600, max_bytes: int = 2 * 1024**3,
+                 max_entries: Optional[int] = None, clock=time.time):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> (size, written_at), least recently used first
+        self._entries: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self._bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def _load(self):
+        """Index entries already on disk (e.g. written by an earlier container), oldest first."""
+        found = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(SUFFIX) and entry.is_file():
+                    st = entry.stat()
+                    found.append((st.st_mtime, entry.name[:-len(SUFFIX)], st.st_size))
+        for written_at, key, size in sorted(found):
+            self._entries[key] = (size, written_at)
+            self._bytes += size
+        self._evict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Cached result for ``key``, or ``None`` when absent or expired."""
+        with self._lock:
+            known = self._entries.get(key)
+        path = self._path(key)
+        try:
+            if known is None:
+                # another container may have written it since we indexed the directory
+                st = os.stat(path)
+                known = (st.st_size, st.st_mtime)
+            if self.clock() - known[1] > self.ttl:
+                self._discard(key)
+                self.misses += 1
+                return None
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            self._discard(key)
+            self.misses += 1
+            return None
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = known
+                self._bytes += known[0]
+            self._entries.move_to_end(key)
+        self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes):
+        """Store ``data`` under ``key`` atomically, then evict down to the caps."""
+        if len(data) > self.max_bytes:
+            return
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except FileNotFoundError:
+                pass
+            raise
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[0]
+            self._entries[key] = (len(data), self.clock())
+            self._bytes += len(data)
+        self._evict()
+
+    def _discard(self, key: str):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[0]
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        while True:
+            with self._lock:
+                over_bytes = self._bytes > self.max_bytes
+                over_entries = self.max_entries is not None and len(self._entries) > self.max_entries
+                if not (over_bytes or over_entries) or not self._entries:
+                    return
+                key = next(iter(self._entries))
+            logger.debug("Evicting cached result %s", key)
+            self._discard(key)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,94 @@
+"""Coalesce concurrent identical calls into one execution.
+
+Retries and double clicks make several callers submit the same workflow at the
+same moment.  ``SingleFlight.do(key, fn)`` runs ``fn`` for the first caller of
+``key`` (the leader); callers that arrive while it is running wait for the
+leader's outcome instead of starting their own, and all of them get the same
+result or exception.  Once the leader finishes the key is forgotten, so later
+calls run again (repeats of finished work are the result cache's job).
+
+``fn`` receives an ``emit(*args)`` callback; every caller's ``on_event`` sees
+each emitted event, including those emitted before it joined, so followers can
+e.g. learn the leader's prompt id for progress reporting.
+"""
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.events: List[Tuple] = []
+        self.listeners: List[Callable] = []
+        self.followers = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights)
+
+    def do(self, key: Hashable, fn: Callable[[Callable], Any],
+           on_event: Optional[Callable] = None) -> Tuple[Any, bool]:
+        """Return ``(result, shared)``; ``shared`` is True when another caller's run was reused."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.executions += 1
+            else:
+                flight.followers += 1
+                self.coalesced += 1
+            if on_event is not None:
+                flight.listeners.append(on_event)
+                # events emitted before we joined; later ones reach us through listeners
+                missed = list(flight.events)
+
+        if not leader:
+            if on_event is not None:
+                for args in missed:
+                    self._notify(on_event, args)
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        def emit(*args):
+            with self._lock:
+                flight.events.append(args)
+                listeners = list(flight.listeners)
+            for listener in listeners:
+                self._notify(listener, args)
+
+        try:
+            flight.result = fn(emit)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            if flight.followers:
+                logger.info("Shared one execution of %s with %d coalesced caller(s)", key, flight.followers)
+            flight.done.set()
+        return flight.result, False
+
+    @staticmethod
+    def _notify(listener: Callable, args: Tuple):
+        try:
+            listener(*args)
+        except Exception as e:
+            # a caller's callback must not fail the shared execution or the other callers
+            logger.warning("Single-flight event listener failed: %s", e)
@@ -0,0 +1,117 @@
+"""Keep ComfyUI's model folders in sync with the manifest using symlinks.
+
+The desired set of links (``<ComfyUI folder>/<name> -> <file on the volume>``) is
+computed from the manifest and the model store, the current state is read with
+one ``scandir`` per folder, and only the difference is applied: missing links
+are created, links pointing at the wrong file are retargeted and links into the
+cache for models no longer in the manifest are removed.  When nothing changed
+this costs a handful of directory scans instead of a stat, unlink and symlink per
+model.  Regular files and links that point outside the cache are never touched.
+"""
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+from model_manifest import COMFY_PATHS
+from model_store import ModelStore
+
+logger = logging.getLogger(__name__)
+
+
+def desired_links(models: List[Dict], store: ModelStore,
+                  comfy_paths: Dict[str, str] = COMFY_PATHS) -> Tuple[Dict[str, str], List[str]]:
+    """Return ``({link_path: target}, missing_names)`` for the manifest ``models``."""
+    locations = store.locations()
+    links, missing = {}, []
+    for model in models:
+        target = locations.get(model["name"])
+        if target is None:
+            missing.append(model["name"])
+            continue
+        links[os.path.join(comfy_paths[model["type"]], model["name"])] = target
+    return links, missing
+
+
+def scan_links(directories: List[str]) -> Dict[str, Optional[str]]:
+    """Current entries of ``directories``: ``{path: symlink target}``, ``None`` for non-links."""
+    current = {}
+    for directory in set(directories):
+        try:
+            it = os.scandir(directory)
+        except FileNotFoundError:
+            continue
+        with it:
+            for item in it:
+                current[item.path] = os.readlink(item.path) if item.is_symlink() else None
+    return current
+
+
+def plan(desired: Dict[str, str], current: Dict[str, Optional[str]], cache_root: str) -> Dict[str, List]:
+    """Diff the desired links against ``current``.
+
+    Returns ``{"create": [(link, target)], "retarget": [(link, target)],
+    "remove": [link], "conflicts": [link], "unchanged": [link]}``.
+    """
+    cache_prefix = os.path.join(cache_root, "")
+    actions = {"create": [], "retarget": [], "remove": [], "conflicts": [], "unchanged": []}
+    for link, target in sorted(desired.items()):
+        if link not in current:
+            actions["create"].append((link, target))
+        elif current[link] is None:
+            actions["conflicts"].append(link)
+        elif current[link] != target:
+            actions["retarget"].append((link, target))
+        else:
+            actions["unchanged"].append(link)
+    for link, target in sorted(current.items()):
+        if link not in desired and target is not None and target.startswith(cache_prefix):
+            actions["remove"].append(link)
+    return actions
+
+
+def apply(actions: Dict[str, List]):
+    """Carry out a ``plan()``; retargets swap the link atomically."""
+    made_dirs = set()
+    for link, target in actions["create"]:
+        parent = os.path.dirname(link)
+        if parent not in made_dirs:
+            os.makedirs(parent, exist_ok=True)
+            made_dirs.add(parent)
+        os.symlink(target, link)
+    for link, target in actions["retarget"]:
+        tmp = f"{link}.{os.getpid()}.tmp"
+        os.symlink(target, tmp)
+        os.replace(tmp, link)
+    for link in actions["remove"]:
+        os.remove(link)
+
+
+def summary(actions: Dict[str, List], missing: List[str]) -> str:
+    counts = ", ".join(f"{len(actions[key])} {key}" for key in ("create", "retarget", "remove", "unchanged"))
+    text = f"{counts}, {len(missing)} missing from cache"
+    if actions["conflicts"]:
+        text += f", {len(actions['conflicts'])} blocked by regular files"
+    return text
+
+
+def reconcile(models: List[Dict], store: ModelStore, comfy_paths: Dict[str, str] = COMFY_PATHS,
+              dry_run: bool = False) -> Dict[str, List]:
+    """Bring the ComfyUI model folders in line with ``models``; returns the plan with ``missing`` added."""
+    desired, missing = desired_links(models, store, comfy_paths)
+    actions = plan(desired, scan_links(list(comfy_paths.values())), store.root)
+    print(f"Symlink plan: {summary(actions, missing)}")
+    for link, target in actions["create"]:
+        print(f"  + {link} -> {target}")
+    for link, target in actions["retarget"]:
+        print(f"  ~ {link} -> {target}")
+    for link in actions["remove"]:
+        print(f"  - {link}")
+    for link in actions["conflicts"]:
+        logger.warning("Not replacing regular file %s with a symlink", link)
+    for name in missing:
+        logger.warning("Model file not found in cache: %s", name)
+    if not dry_run:
+        apply(actions)
+        print("Symlinks applied")
+    actions["missing"] = missing
+    return actions
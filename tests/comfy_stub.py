@@ -0,0 +1,259 @@
+"""Minimal stand-in for a ComfyUI server, used by the local client tests.
+
+Speaks just enough of the ``/prompt``, ``/history``, ``/view``, ``/queue``,
+``/object_info`` and ``/system_stats`` protocol for ``comfy_client.ComfyClient``.
+Queued prompts "execute" one at a time on a worker thread, each taking ``delay``
+seconds and producing one tiny PNG per ``SaveImage`` node.  ``/ws`` accepts
+websocket clients and sends them ``execution_start``, ``executing`` per node and
+the final ``executing`` with ``node: null`` once the history entry is written.
+"""
+import base64
+import hashlib
+import json
+import struct
+import queue
+import socket
+import threading
+import time
+import urllib.parse
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PNG_BYTES = b"\x89PNG\r\n\x1a\n" + b"stub-image"
+
+# RFC 6455 handshake GUID
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OBJECT_INFO = {
+    "CheckpointLoaderSimple": {
+        "input": {"required": {"ckpt_name": [["base.safetensors"]]}},
+        "output": ["MODEL", "CLIP", "VAE"],
+    },
+    "EmptyLatentImage": {
+        "input": {"required": {"width": ["INT", {}], "height": ["INT", {}], "batch_size": ["INT", {}]}},
+        "output": ["LATENT"],
+    },
+    "SaveImage": {"input": {"required": {"images": ["IMAGE"], "filename_prefix": ["STRING", {}]}}, "output": []},
+    "FailNode": {"input": {"required": {}}, "output": []},
+}
+
+
+class StubComfyServer:
+    def __init__(self, delay: float = 0.05, port: int = 0):
+        self.delay = delay
+        self.prompts = {}
+        self.history = {}
+        self.files = {}
+        self.connections = 0
+        self.object_info = OBJECT_INFO
+        self.object_info_requests = 0
+        self.ws_clients = []
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        # Like ComfyUI, prompts execute one at a time in submission order.
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._work, daemon=True)
+        self._worker.start()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        with self._lock:
+            clients, self.ws_clients = self.ws_clients, []
+        for client in clients:
+            client.close()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _broadcast(self, msg_type, data):
+        with self._lock:
+            clients = list(self.ws_clients)
+        for client in clients:
+            try:
+                client.send_text(json.dumps({"type": msg_type, "data": data}))
+            except OSError:
+                with self._lock:
+                    if client in self.ws_clients:
+                        self.ws_clients.remove(client)
+
+    def _work(self):
+        while True:
+            prompt_id, workflow = self._queue.get()
+            self._execute(prompt_id, workflow)
+
+    def _execute(self, prompt_id, workflow):
+        started = int(time.time() * 1000)
+        self._broadcast("execution_start", {"prompt_id": prompt_id, "timestamp": started})
+        for node_id in workflow:
+            self._broadcast("executing", {"node": node_id, "prompt_id": prompt_id})
+        time.sleep(self.delay)
+        outputs = {}
+        status = {"status_str": "success", "completed": True, "messages": [
+            ["execution_start", {"prompt_id": prompt_id, "timestamp": started}],
+            ["execution_success", {"prompt_id": prompt_id, "timestamp": int(time.time() * 1000)}],
+        ]}
+        for node_id, node in workflow.items():
+            if node.get("class_type") == "FailNode":
+                status = {"status_str": "error", "completed": False, "messages": [["execution_error", {"node_id": node_id}]]}
+                outputs = {}
+                break
+            if node.get("class_type") == "SaveImage":
+                filename = f"{node['inputs'].get('filename_prefix', 'ComfyUI')}_00001_.png"
+                self.files[filename] = PNG_BYTES + filename.encode()
+                outputs[node_id] = {"images": [{"filename": filename, "subfolder": "", "type": "output"}]}
+        with self._lock:
+            self.history[prompt_id] = {"prompt": [0, prompt_id, workflow, {}, []], "outputs": outputs, "status": status}
+        if status["status_str"] == "error":
+            self._broadcast("execution_error", {"prompt_id": prompt_id, **status["messages"][0][1]})
+        self._broadcast("executing", {"node": None, "prompt_id": prompt_id})
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, content_type="application/json"):
+                if not isinstance(body, bytes):
+                    body = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urllib.parse.urlparse(self.path)
+                if url.path == "/ws":
+                    self._websocket()
+                elif url.path == "/system_stats":
+                    self._send(200, {"system": {}, "devices": []})
+                elif url.path == "/object_info":
+                    with server._lock:
+                        server.object_info_requests += 1
+                    self._send(200, server.object_info)
+                elif url.path == "/queue":
+                    with server._lock:
+                        pending = [[0, pid] for pid in server.prompts if pid not in server.history]
+                    self._send(200, {"queue_running": pending[:1], "queue_pending": pending[1:]})
+                elif url.path.startswith("/history/"):
+                    prompt_id = url.path.rsplit("/", 1)[1]
+                    with server._lock:
+                        entry = server.history.get(prompt_id)
+                    self._send(200, {prompt_id: entry} if entry else {})
+                elif url.path == "/view":
+                    filename = urllib.parse.parse_qs(url.query).get("filename", [""])[0]
+                    if filename in server.files:
+                        self._send(200, server.files[filename], "image/png")
+                    else:
+                        self._send(404, {"error": "not found"})
+                else:
+                    self._send(404, {"error": "not found"})
+
+            def _websocket(self):
+                key = self.headers.get("Sec-WebSocket-Key")
+                if self.headers.get("Upgrade", "").lower() != "websocket" or not key:
+                    self._send(400, {"error": "expected a websocket upgrade"})
+                    return
+                accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+                self.send_response(101)
+                self.send_header("Upgrade", "websocket")
+                self.send_header("Connection", "Upgrade")
+                self.send_header("Sec-WebSocket-Accept", accept)
+                self.end_headers()
+                self.wfile.flush()
+                self.close_connection = True
+
+                client = _WebSocket(self.connection)
+                with server._lock:
+                    server.ws_clients.append(client)
+                try:
+                    client.send_text(json.dumps({"type": "status", "data": {"sid": "stub"}}))
+                    # Hold the connection until the client closes it; we ignore what it sends.
+                    while client.read_frame() not in (None, 0x8):
+                        pass
+                finally:
+                    with server._lock:
+                        if client in server.ws_clients:
+                            server.ws_clients.remove(client)
+                    client.close()
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                if self.path != "/prompt":
+                    self._send(404, {"error": "not found"})
+                    return
+                workflow = payload.get("prompt")
+                if not isinstance(workflow, dict) or not workflow:
+                    self._send(400, {"error": {"type": "invalid_prompt"}, "node_errors": {}})
+                    return
+                prompt_id = str(uuid.uuid4())
+                with server._lock:
+                    server.prompts[prompt_id] = workflow
+                server._queue.put((prompt_id, workflow))
+                self._send(200, {"prompt_id": prompt_id, "number": len(server.prompts), "node_errors": {}})
+
+        return Handler
+
+
+class _WebSocket:
+    """Server side of one websocket: unmasked text frames out, masked frames in."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self._send_lock = threading.Lock()
+
+    def send_text(self, text: str):
+        payload = text.encode()
+        if len(payload) < 126:
+            header = struct.pack(">BB", 0x81, len(payload))
+        elif len(payload) < 1 << 16:
+            header = struct.pack(">BBH", 0x81, 126, len(payload))
+        else:
+            header = struct.pack(">BBQ", 0x81, 127, len(payload))
+        with self._send_lock:
+            self.sock.sendall(header + payload)
+
+    def _read(self, size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+            if not chunk:
+                raise EOFError
+            data += chunk
+        return data
+
+    def read_frame(self):
+        """Opcode of the next client frame, or ``None`` once the socket is gone."""
+        try:
+            first, second = self._read(2)
+            length = second & 0x7F
+            if length == 126:
+                length = struct.unpack(">H", self._read(2))[0]
+            elif length == 127:
+                length = struct.unpack(">Q", self._read(8))[0]
+            # payloads are masked and skipped unread; only the opcode matters here
+            self._read(length + (4 if second & 0x80 else 0))
+        except (EOFError, OSError, ValueError):
+            return None
+        return first & 0x0F
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
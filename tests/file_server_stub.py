@@ -0,0 +1,68 @@
+"""Local HTTP server that serves one large file and can drop connections.
+
+Used by the downloader tests: supports ``Range`` requests (unless
+``ranges=False``) and, with ``drop_rate > 0``, randomly closes the connection
+part-way through a response body.
+"""
+import random
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FileServer:
+    def __init__(self, data: bytes, ranges: bool = True, drop_rate: float = 0.0, seed: int = 0):
+        self.data = data
+        self.ranges = ranges
+        self.drop_rate = drop_rate
+        self.random = random.Random(seed)
+        self.requests = []
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/model.safetensors"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _should_drop(self):
+        with self._lock:
+            return self.random.random() < self.drop_rate
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                data = server.data
+                match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+                with server._lock:
+                    server.requests.append(self.headers.get("Range"))
+                if match and server.ranges:
+                    start = int(match.group(1))
+                    end = int(match.group(2)) if match.group(2) else len(data) - 1
+                    body = data[start:end + 1]
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+                else:
+                    body = data
+                    self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if len(body) > 1 and server._should_drop():
+                    self.wfile.write(body[:server.random.randrange(1, len(body))])
+                    self.wfile.flush()
+                    self.close_connection = True
+                    return
+                self.wfile.write(body)
+
+        return Handler
@@ -5,10 +5,15 @@ This script tests the symlink logic locally without requiring Modal access.
 """
 
 import os
+import sys
 import tempfile
 import shutil
 from pathlib import Path
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model_manifest import load_manifest
+
 def test_symlink_logic():
     """Test the symlink creation logic that your Modal app uses"""
     print("🚀 Testing Modal Symlink Logic Locally")
@@ -40,20 +45,8 @@ def test_symlink_logic():
         path.mkdir(parents=True, exist_ok=True)
         print(f"📂 Created: {path}")
     
-    # Define your models (same as in your Modal app)
-    all_models = {
-        "untitled_pony.safetensors": "checkpoint",
-        "4x_foolhardy_Remacri.pth": "upscaler",
-        "dramatic_lightning.safetensors": "lora",
-        "RealSkin_xxXL_v1.safetensors": "lora",
-        "amateur_slider.safetensors": "lora",
-        "LUT_color_grading.safetensors": "lora",
-        "mayafoxx_SDXL-000002-e750.safetensors": "lora",
-        "add_brightness_XL.safetensors": "lora",
-        "person_yolov8m-seg.pt": "segm",
-        "face_yolov8m.pt": "bbox",
-        "sam_vit_b_01ec64.pth": "sam"
-    }
+    # Models from the shared manifest (model_manifest.json), as the Modal app uses
+    all_models = {model["name"]: model["type"] for model in load_manifest()}
     
     # Create dummy model files
     print("\n📄 Creating test model files...")
@@ -0,0 +1,160 @@
+"""Tests for comfy_client.ComfyClient against a local stub ComfyUI server."""
+import os
+import random
+import socket
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from comfy_client import ComfyClient, ComfyError, output_images, wait_until_ready
+from comfy_stub import StubComfyServer
+
+WORKFLOW = {
+    "1": {"class_type": "EmptyLatentImage", "inputs": {"width": 64, "height": 64, "batch_size": 1}},
+    "2": {"class_type": "SaveImage", "inputs": {"images": ["1", 0], "filename_prefix": "abc"}},
+}
+
+
+def test_run_returns_history_entry():
+    with StubComfyServer() as server:
+        client = ComfyClient(port=server.port, use_websocket=False)
+        prompt_id, entry = client.run(WORKFLOW, timeout=5, poll_interval=0.02)
+        assert prompt_id in server.history
+        assert entry["outputs"]["2"]["images"][0]["filename"] == "abc_00001_.png"
+        client.close()
+
+
+def test_connections_are_reused():
+    with StubComfyServer(delay=0) as server:
+        client = ComfyClient(port=server.port, use_websocket=False)
+        for _ in range(5):
+            client.run(WORKFLOW, timeout=5, poll_interval=0.02)
+        assert server.connections == 1
+        client.close()
+
+
+def test_rejected_prompt_raises():
+    with StubComfyServer() as server:
+        client = ComfyClient(port=server.port, use_websocket=False)
+        with pytest.raises(ComfyError) as exc:
+            client.queue_prompt({})
+        assert exc.value.details["error"]["type"] == "invalid_prompt"
+        client.close()
+
+
+def test_execution_error_raises():
+    with StubComfyServer() as server:
+        client = ComfyClient(port=server.port, use_websocket=False)
+        with pytest.raises(ComfyError):
+            client.run({"1": {"class_type": "FailNode", "inputs": {}}}, timeout=5, poll_interval=0.02)
+        client.close()
+
+
+def test_event_before_wait_is_remembered():
+    with StubComfyServer(delay=0) as server:
+        client = ComfyClient(port=server.port, use_websocket=False)
+        prompt_id = client.queue_prompt(WORKFLOW)
+        while prompt_id not in server.history:
+            time.sleep(0.01)
+        client._dispatch({"type": "executing", "data": {"node": None, "prompt_id": prompt_id}})
+        started = time.monotonic()
+        entry = client.wait(prompt_id, timeout=5, poll_interval=10)
+        assert time.monotonic() - started < 1
+        assert entry["status"]["status_str"] == "success"
+        client.close()
+
+
+def test_wait_times_out():
+    with StubComfyServer(delay=5) as server:
+        client = ComfyClient(port=server.port, use_websocket=False)
+        prompt_id = client.queue_prompt(WORKFLOW)
+        with pytest.raises(TimeoutError):
+            client.wait(prompt_id, timeout=0.2, poll_interval=0.05)
+        client.close()
+
+
+def test_output_images_skips_temp_previews():
+    entry = {"outputs": {
+        "2": {"images": [{"filename": "a.png", "subfolder": "", "type": "output"}]},
+        "3": {"images": [{"filename": "p.png", "subfolder": "", "type": "temp"}]},
+    }}
+    assert output_images(entry) == [("2", {"filename": "a.png", "subfolder": "", "type": "output"})]
+
+
+def test_fetch_output_via_view_and_direct_path(tmp_path):
+    with StubComfyServer(delay=0) as server:
+        client = ComfyClient(port=server.port, use_websocket=False)
+        _, entry = client.run(WORKFLOW, timeout=5, poll_interval=0.02)
+        [(node_id, image)] = output_images(entry)
+        assert client.fetch_output(image) == server.files[image["filename"]]
+
+        (tmp_path / image["filename"]).write_bytes(b"from-disk")
+        direct = ComfyClient(port=server.port, use_websocket=False, output_dir=str(tmp_path))
+        assert direct.fetch_output(image) == b"from-disk"
+        client.close()
+        direct.close()
+
+
+def test_iter_completed_streams_every_prompt_and_reports_failures():
+    with StubComfyServer(delay=0.01) as server:
+        client = ComfyClient(port=server.port, use_websocket=False)
+        workflows = [
+            {"2": {"class_type": "SaveImage", "inputs": {"filename_prefix": f"p{i}"}}} for i in range(5)
+        ]
+        workflows[2] = {"1": {"class_type": "FailNode", "inputs": {}}}
+        prompt_ids = [client.queue_prompt(w) for w in workflows]
+        results = list(client.iter_completed(prompt_ids, timeout=5, poll_interval=0.02))
+        assert [r[0] for r in results] == prompt_ids
+        assert [r[2] is None for r in results] == [True, True, False, True, True]
+        assert isinstance(results[2][2], ComfyError)
+        client.close()
+
+
+def test_websocket_reports_completion_and_errors():
+    pytest.importorskip("websocket")
+    with StubComfyServer(delay=0.01) as server:
+        client = ComfyClient(port=server.port)
+        assert client._ws_connected.wait(5)
+        events = []
+        client.add_listener(lambda prompt_id, event: events.append((prompt_id, event["type"], event["data"].get("node"))))
+        # with the websocket up, history is only polled every 5 * poll_interval,
+        # so finishing well within the timeout means the completion came over /ws
+        prompt_id, entry = client.run(WORKFLOW, timeout=5, poll_interval=30)
+        assert entry["outputs"]["2"]["images"][0]["filename"] == "abc_00001_.png"
+        assert events == [(prompt_id, "execution_start", None), (prompt_id, "executing", "1"),
+                          (prompt_id, "executing", "2"), (prompt_id, "executing", None)]
+
+        failing = client.queue_prompt({"1": {"class_type": "FailNode", "inputs": {}}})
+        with pytest.raises(ComfyError):
+            client.wait(failing, timeout=5, poll_interval=30)
+        client.close()
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_wait_until_ready_detects_late_bind():
+    port = _free_port()
+    bind_delay = random.uniform(0.2, 0.6)
+    servers = []
+
+    def start_later():
+        time.sleep(bind_delay)
+        servers.append(StubComfyServer(port=port).__enter__())
+
+    threading.Thread(target=start_later, daemon=True).start()
+    ready_after = wait_until_ready(port=port, timeout=5)
+    assert bind_delay <= ready_after < bind_delay + 0.75
+    servers[0].__exit__(None, None, None)
+
+
+def test_wait_until_ready_times_out():
+    with pytest.raises(TimeoutError):
+        wait_until_ready(port=_free_port(), timeout=0.3)
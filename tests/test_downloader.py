@@ -0,0 +1,76 @@
+"""Tests for downloader against a local server that drops connections."""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from downloader import download
+from file_server_stub import FileServer
+
+DATA = os.urandom(3 * 1024 * 1024 + 123)
+CHUNK = 256 * 1024
+
+
+def test_parallel_download_survives_dropped_connections(tmp_path):
+    path = str(tmp_path / "temp_1")
+    with FileServer(DATA, drop_rate=0.3) as server:
+        result = download(server.url, path, connections=4, chunk_size=CHUNK, retries=20, progress=None)
+    assert open(path, "rb").read() == DATA
+    assert result["bytes"] == len(DATA)
+    assert not os.path.exists(path + ".state")
+
+
+def test_resume_from_state_only_fetches_missing_chunks(tmp_path):
+    path = tmp_path / "temp_2"
+    # first two chunks are already on disk
+    written = [CHUNK, CHUNK] + [0] * (len(range(0, len(DATA), CHUNK)) - 2)
+    path.write_bytes(DATA[:2 * CHUNK] + b"\0" * (len(DATA) - 2 * CHUNK))
+    (tmp_path / "temp_2.state").write_text(json.dumps({"total": len(DATA), "chunk_size": CHUNK, "written": written}))
+    with FileServer(DATA) as server:
+        result = download(server.url, str(path), chunk_size=CHUNK, progress=None)
+        starts = sorted(int(r.split("=")[1].split("-")[0]) for r in server.requests[1:])
+    assert path.read_bytes() == DATA
+    assert result["resumed_bytes"] == 2 * CHUNK
+    assert starts[0] == 2 * CHUNK
+
+
+def test_resume_from_legacy_partial_prefix(tmp_path):
+    path = tmp_path / "temp_3"
+    path.write_bytes(DATA[:CHUNK + 1000])
+    with FileServer(DATA) as server:
+        result = download(server.url, str(path), chunk_size=CHUNK, progress=None)
+    assert path.read_bytes() == DATA
+    assert result["resumed_bytes"] == CHUNK + 1000
+
+
+def test_mismatched_state_restarts_from_scratch(tmp_path):
+    # a full-size, zero-filled temp file whose sidecar was written with another chunk size
+    path = tmp_path / "temp_5"
+    path.write_bytes(b"\0" * len(DATA))
+    small = CHUNK // 2
+    (tmp_path / "temp_5.state").write_text(json.dumps(
+        {"total": len(DATA), "chunk_size": small, "written": [0] * len(range(0, len(DATA), small))}))
+    with FileServer(DATA) as server:
+        result = download(server.url, str(path), chunk_size=CHUNK, progress=None)
+    assert path.read_bytes() == DATA
+    assert result["resumed_bytes"] == 0
+    assert not os.path.exists(str(path) + ".state")
+
+
+def test_unreadable_state_restarts_from_scratch(tmp_path):
+    path = tmp_path / "temp_6"
+    path.write_bytes(b"\0" * len(DATA))
+    (tmp_path / "temp_6.state").write_text("{not json")
+    with FileServer(DATA) as server:
+        result = download(server.url, str(path), chunk_size=CHUNK, progress=None)
+    assert path.read_bytes() == DATA
+    assert result["resumed_bytes"] == 0
+
+
+def test_falls_back_to_single_stream_without_ranges(tmp_path):
+    path = str(tmp_path / "temp_4")
+    with FileServer(DATA, ranges=False) as server:
+        result = download(server.url, path, chunk_size=CHUNK, progress=None)
+    assert open(path, "rb").read() == DATA
+    assert result["resumed_bytes"] == 0
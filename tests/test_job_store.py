@@ -0,0 +1,131 @@
+"""Tests for job_store and ComfyClient.progress used by the async job API."""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from comfy_client import ComfyClient, ComfyError
+from comfy_stub import StubComfyServer
+from job_store import JobStore, Periodic, progress_fields
+
+WORKFLOW = {
+    "1": {"class_type": "EmptyLatentImage", "inputs": {"width": 64, "height": 64, "batch_size": 1}},
+    "2": {"class_type": "SaveImage", "inputs": {"images": ["1", 0], "filename_prefix": "job"}},
+}
+
+
+def test_job_lifecycle_in_shared_mapping():
+    backend = {}
+    submitter, runner = JobStore(backend), JobStore(backend)
+
+    created = submitter.create("j1")
+    submitter.set_call("j1", "fc-123")
+    runner.update("j1", state="running", progress=40, queue_position=0)
+
+    record = submitter.get("j1")
+    assert created["state"] == "queued"
+    assert record["state"] == "running" and record["progress"] == 40
+    assert record["updated"] >= record["created"]
+    assert submitter.call_id("j1") == "fc-123"
+    assert submitter.get("missing") is None and submitter.call_id("missing") is None
+
+
+def test_progress_fields():
+    assert progress_fields({"state": "queued", "queue_position": 2, "progress": 0.0}) == {
+        "state": "queued", "progress": 0, "queue_position": 2}
+    assert progress_fields({"state": "running", "queue_position": 0, "progress": 0.456})["progress"] == 45
+    # a finished prompt never sets a state: completed / failed is the runner's call
+    assert progress_fields({"state": "done", "queue_position": None, "progress": 1.0}) == {"queue_position": None}
+
+
+def test_periodic_runs_until_stopped_and_survives_errors():
+    calls = []
+
+    def tick():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("transient")
+
+    ticker = Periodic(0.01, tick).start()
+    time.sleep(0.1)
+    ticker.stop()
+    count = len(calls)
+    time.sleep(0.03)
+    assert count >= 2 and len(calls) == count
+
+
+def test_progress_reports_queue_position_then_done():
+    with StubComfyServer(delay=0.2) as server:
+        client = ComfyClient(port=server.port, use_websocket=False)
+        ids = [client.queue_prompt(dict(WORKFLOW)) for _ in range(3)]
+
+        assert client.progress(ids[0], 2)["state"] == "running"
+        last = client.progress(ids[2], 2)
+        assert last == {"state": "queued", "queue_position": 2, "progress": 0.0}
+
+        for prompt_id in ids:
+            client.wait(prompt_id, timeout=5, poll_interval=0.02)
+        assert client.progress(ids[2], 2) == {"state": "done", "queue_position": None, "progress": 1.0}
+        client.close()
+
+
+def test_progress_uses_websocket_node_and_step_events():
+    with StubComfyServer(delay=1) as server:
+        client = ComfyClient(port=server.port, use_websocket=False)
+        prompt_id = client.queue_prompt(dict(WORKFLOW))
+        total_nodes = 4
+
+        client._dispatch({"type": "execution_cached", "data": {"prompt_id": prompt_id, "nodes": ["1"]}})
+        client._dispatch({"type": "executing", "data": {"prompt_id": prompt_id, "node": "2"}})
+        client._dispatch({"type": "progress", "data": {"prompt_id": prompt_id, "value": 5, "max": 10}})
+        assert client.progress(prompt_id, total_nodes)["progress"] == 0.375  # (1 cached + 0.5 of node 2) / 4
+
+        client._dispatch({"type": "executing", "data": {"prompt_id": prompt_id, "node": None}})
+        assert prompt_id not in client._progress
+        client.close()
+
+
+def test_failed_job_stays_failed_with_a_fast_reporter():
+    failing = {"1": {"class_type": "FailNode", "inputs": {}}}
+    jobs = JobStore()
+    jobs.create("j2")
+    with StubComfyServer(delay=0.05) as server:
+        client = ComfyClient(port=server.port, use_websocket=False)
+
+        def run(on_submitted):
+            prompt_id = client.queue_prompt(failing)
+            on_submitted(prompt_id)
+            client.wait(prompt_id, timeout=5, poll_interval=0.01)
+            # keep the reporter ticking against the finished prompt before failing
+            time.sleep(0.05)
+
+        with pytest.raises(ComfyError):
+            jobs.track("j2", run, lambda prompt_id: client.progress(prompt_id, 1), interval=0.001)
+        time.sleep(0.05)
+        client.close()
+
+    record = jobs.get("j2")
+    assert record["state"] == "failed" and "failed" in record["error"]
+    assert record["queue_position"] is None
+
+
+def test_completed_job_records_outputs():
+    jobs = JobStore()
+    jobs.create("j3")
+    polls = []
+
+    def run(on_submitted):
+        on_submitted("p1")
+        time.sleep(0.05)
+        return ["a", "b"]
+
+    outputs = jobs.track("j3", run, lambda prompt_id: polls.append(prompt_id) or
+                         {"state": "running", "queue_position": 0, "progress": 0.5}, interval=0.001)
+    count = len(polls)
+    time.sleep(0.02)
+    record = jobs.get("j3")
+    assert outputs == ["a", "b"] and polls and len(polls) == count
+    assert record["state"] == "completed" and record["progress"] == 100 and record["images"] == 2
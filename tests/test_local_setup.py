@@ -9,9 +9,14 @@ import os
 import shutil
 import tempfile
 import subprocess
+import sys
 from pathlib import Path
 import json
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model_manifest import load_manifest
+
 # Simulate the Modal volume structure locally
 class LocalModalSimulator:
     def __init__(self, base_dir=None):
@@ -50,21 +55,10 @@ class LocalModalSimulator:
     
     def create_test_files(self):
         """Create dummy test files to simulate the models"""
-        test_models = {
-            "checkpoint": ["untitled_pony.safetensors"],
-            "upscaler": ["4x_foolhardy_Remacri.pth"],
-            "lora": [
-                "dramatic_lightning.safetensors",
-                "RealSkin_xxXL_v1.safetensors", 
-                "amateur_slider.safetensors",
-                "LUT_color_grading.safetensors",
-                "mayafoxx_SDXL-000002-e750.safetensors",
-                "add_brightness_XL.safetensors"
-            ],
-            "segm": ["person_yolov8m-seg.pt"],
-            "bbox": ["face_yolov8m.pt"],
-            "sam": ["sam_vit_b_01ec64.pth"]
-        }
+        # one dummy file per model in the shared manifest, grouped by type
+        test_models = {}
+        for model in load_manifest():
+            test_models.setdefault(model["type"], []).append(model["name"])
         
         for model_type, files in test_models.items():
             for filename in files:
@@ -86,19 +80,7 @@ class LocalModalSimulator:
             "sam": self.comfy_root / "custom_nodes" / "ComfyUI-Impact-Pack" / "models" / "sam",
         }
         
-        all_models = {
-            "untitled_pony.safetensors": "checkpoint",
-            "4x_foolhardy_Remacri.pth": "upscaler",
-            "dramatic_lightning.safetensors": "lora",
-            "RealSkin_xxXL_v1.safetensors": "lora",
-            "amateur_slider.safetensors": "lora",
-            "LUT_color_grading.safetensors": "lora",
-            "mayafoxx_SDXL-000002-e750.safetensors": "lora",
-            "add_brightness_XL.safetensors": "lora",
-            "person_yolov8m-seg.pt": "segm",
-            "face_yolov8m.pt": "bbox",
-            "sam_vit_b_01ec64.pth": "sam"
-        }
+        all_models = {model["name"]: model["type"] for model in load_manifest()}
         
         created_links = []
         failed_links = []
@@ -145,19 +127,7 @@ class LocalModalSimulator:
             "sam": self.comfy_root / "custom_nodes" / "ComfyUI-Impact-Pack" / "models" / "sam",
         }
         
-        all_models = {
-            "untitled_pony.safetensors": "checkpoint",
-            "4x_foolhardy_Remacri.pth": "upscaler",
-            "dramatic_lightning.safetensors": "lora",
-            "RealSkin_xxXL_v1.safetensors": "lora",
-            "amateur_slider.safetensors": "lora",
-            "LUT_color_grading.safetensors": "lora",
-            "mayafoxx_SDXL-000002-e750.safetensors": "lora",
-            "add_brightness_XL.safetensors": "lora",
-            "person_yolov8m-seg.pt": "segm",
-            "face_yolov8m.pt": "bbox",
-            "sam_vit_b_01ec64.pth": "sam"
-        }
+        all_models = {model["name"]: model["type"] for model in load_manifest()}
         
         working_links = []
         broken_links = []
@@ -0,0 +1,49 @@
+"""Tests for model_manifest and the shipped model_manifest.json."""
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from model_manifest import COMFY_PATHS, by_name, link_path, load_manifest, select
+
+
+def test_shipped_manifest_is_valid_and_covers_deployed_configs():
+    models = by_name(load_manifest())
+    for config in ("2025-07-15_mago_v027_API.json", "2025-06-23_mago_v017_mara_api.json"):
+        with open(os.path.join(ROOT, "configs", config)) as f:
+            workflow = json.load(f)
+        for node in workflow.values():
+            for key in ("ckpt_name", "lora_name"):
+                if key in node["inputs"]:
+                    assert node["inputs"][key] in models
+
+
+def test_select_and_link_path():
+    models = load_manifest()
+    loras = select(models, batch="new_loras", source="civitai")
+    assert loras and all(m["type"] == "lora" for m in loras)
+    sam = by_name(models)["sam_vit_b_01ec64.pth"]
+    assert link_path(sam) == os.path.join(COMFY_PATHS["sam"], "sam_vit_b_01ec64.pth")
+
+
+@pytest.mark.parametrize("entry, message", [
+    ({"name": "a", "type": "vae", "source": "local"}, "Unknown model_type"),
+    ({"name": "a", "type": "lora", "source": "civitai"}, "has no id"),
+])
+def test_invalid_entries_are_rejected(tmp_path, entry, message):
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps({"models": [entry]}))
+    with pytest.raises(ValueError, match=message):
+        load_manifest(str(path))
+
+
+def test_duplicate_names_are_rejected(tmp_path):
+    entry = {"name": "a", "type": "lora", "source": "local"}
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps({"models": [entry, entry]}))
+    with pytest.raises(ValueError, match="Duplicate"):
+        load_manifest(str(path))
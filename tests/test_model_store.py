@@ -0,0 +1,151 @@
+"""Tests for model_store's content-addressed layout on a temp directory."""
+import hashlib
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model_store import ChecksumMismatch, ModelStore, sha256_file
+
+
+def _write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def test_add_file_moves_into_blob_and_indexes(tmp_path):
+    store = ModelStore(str(tmp_path))
+    data = b"weights" * 1000
+    src = _write(tmp_path / "temp_1", data)
+
+    sha = store.add_file(str(src), "a.safetensors", source_id="1",
+                         expected_sha256=hashlib.sha256(data).hexdigest(), expected_size=len(data))
+
+    assert sha == hashlib.sha256(data).hexdigest()
+    assert not src.exists()
+    assert store.resolve("a.safetensors") == store.blob_path(sha)
+    assert store.has("a.safetensors", sha256=sha, size=len(data))
+    assert not store.has("a.safetensors", sha256="0" * 64)
+    assert store.entry("a.safetensors") == {"sha256": sha, "size": len(data), "source_id": "1"}
+    assert store.verify("a.safetensors")
+
+
+def test_identical_content_is_stored_once(tmp_path):
+    store = ModelStore(str(tmp_path))
+    sha_a = store.add_file(str(_write(tmp_path / "t1", b"same")), "a.safetensors")
+    sha_b = store.add_file(str(_write(tmp_path / "t2", b"same")), "b.safetensors")
+
+    assert sha_a == sha_b
+    assert os.listdir(store.blob_dir) == [sha_a]
+    assert set(store.index()) == {"a.safetensors", "b.safetensors"}
+
+
+def test_checksum_mismatch_deletes_download(tmp_path):
+    store = ModelStore(str(tmp_path))
+    src = _write(tmp_path / "temp_2", b"truncated")
+
+    with pytest.raises(ChecksumMismatch):
+        store.add_file(str(src), "a.safetensors", expected_sha256="0" * 64)
+
+    assert not src.exists()
+    assert store.resolve("a.safetensors") is None
+    assert not store.has("a.safetensors")
+
+
+def test_size_mismatch_is_rejected_before_hashing(tmp_path):
+    store = ModelStore(str(tmp_path))
+    src = _write(tmp_path / "temp_3", b"short")
+
+    with pytest.raises(ChecksumMismatch):
+        store.add_file(str(src), "a.safetensors", expected_size=100)
+    assert not src.exists()
+
+
+def test_find_by_source_and_alias(tmp_path):
+    store = ModelStore(str(tmp_path))
+    sha = store.add_file(str(_write(tmp_path / "t", b"lora")), "a.safetensors", source_id="2043984")
+
+    assert store.find_by_source(2043984) == sha
+    assert store.find_by_source("999") is None
+
+    store.alias("b.safetensors", sha, source_id="2043984")
+    assert store.resolve("b.safetensors") == store.blob_path(sha)
+    assert store.entry("b.safetensors")["size"] == 4
+
+
+def test_legacy_flat_files_still_resolve(tmp_path):
+    store = ModelStore(str(tmp_path))
+    _write(tmp_path / "old.safetensors", b"legacy")
+
+    assert store.resolve("old.safetensors") == str(tmp_path / "old.safetensors")
+    assert not store.has("old.safetensors")
+    assert store.resolve("missing.safetensors") is None
+
+
+def test_verify_detects_corrupted_blob(tmp_path):
+    store = ModelStore(str(tmp_path))
+    sha = store.add_file(str(_write(tmp_path / "t", b"good")), "a.safetensors")
+    _write(store.blob_path(sha), b"bad!")
+
+    assert sha256_file(store.blob_path(sha)) != sha
+    assert not store.verify("a.safetensors")
+    assert not store.verify("missing.safetensors")
+
+
+def test_import_legacy_moves_flat_file_into_store(tmp_path):
+    store = ModelStore(str(tmp_path))
+    data = b"old layout"
+    legacy = _write(tmp_path / "x.safetensors", data)
+    assert not store.has("x.safetensors") and store.resolve("x.safetensors") == str(legacy)
+
+    sha = store.import_legacy("x.safetensors", source_id="7", expected_size=len(data))
+
+    assert sha == hashlib.sha256(data).hexdigest()
+    assert not legacy.exists()
+    assert store.has("x.safetensors") and store.find_by_source("7") == sha
+    assert store.import_legacy("x.safetensors") is None
+    assert store.import_legacy("missing.safetensors") is None
+
+
+def test_import_legacy_discards_mismatched_file(tmp_path):
+    store = ModelStore(str(tmp_path))
+    legacy = _write(tmp_path / "y.safetensors", b"corrupt")
+
+    with pytest.raises(ChecksumMismatch):
+        store.import_legacy("y.safetensors", expected_sha256="0" * 64)
+    assert not legacy.exists() and not store.has("y.safetensors")
+
+
+def test_index_reads_one_combined_file(tmp_path, monkeypatch):
+    store = ModelStore(str(tmp_path))
+    for i in range(5):
+        store.add_file(str(_write(tmp_path / f"temp_{i}", b"model %d" % i)), f"m{i}.safetensors")
+    store.alias("alias.safetensors", store.entry("m0.safetensors")["sha256"])
+
+    opened = []
+    real_open = open
+    monkeypatch.setattr("builtins.open", lambda path, *a, **k: opened.append(path) or real_open(path, *a, **k))
+    locations = store.locations()
+
+    assert sorted(locations) == ["alias.safetensors"] + [f"m{i}.safetensors" for i in range(5)]
+    assert locations["alias.safetensors"] == locations["m0.safetensors"]
+    assert opened == [os.path.join(store.index_dir, ".combined")]
+
+
+def test_index_picks_up_entries_missing_from_combined(tmp_path):
+    store = ModelStore(str(tmp_path))
+    sha = store.add_file(str(_write(tmp_path / "temp_1", b"a")), "a.safetensors")
+    # another container's entry whose .combined update was lost
+    other = ModelStore(str(tmp_path))
+    other._write_entry("b.safetensors", sha, 1, "7")
+    os.remove(os.path.join(store.index_dir, ".combined"))
+    store._write_combined({"a.safetensors": store.entry("a.safetensors")})
+
+    assert set(store.index()) == {"a.safetensors", "b.safetensors"}
+    assert set(store._read_combined()) == {"a.safetensors", "b.safetensors"}
+
+    os.remove(os.path.join(store.index_dir, "a.safetensors.json"))
+    assert set(store.index()) == {"b.safetensors"}
@@ -0,0 +1,39 @@
+"""Tests for node_registry against the stub server's /object_info."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from comfy_client import ComfyClient
+from comfy_stub import StubComfyServer
+from node_registry import NodeRegistry, load_registry
+
+
+def test_registry_lookups():
+    with StubComfyServer() as server:
+        client = ComfyClient(port=server.port, use_websocket=False)
+        registry = NodeRegistry(client.object_info())
+        client.close()
+
+    assert "SaveImage" in registry and "ImageResize" not in registry
+    assert registry.missing(["SaveImage", "ImageResize", "Foo"]) == ["Foo", "ImageResize"]
+    assert registry.inputs("CheckpointLoaderSimple") == {"ckpt_name": [["base.safetensors"]]}
+    assert registry.required_inputs("EmptyLatentImage") == ["width", "height", "batch_size"]
+    assert registry.output_count("CheckpointLoaderSimple") == 3
+    assert registry.inputs("Unknown") == {}
+
+
+def test_registry_is_cached_per_image(tmp_path):
+    with StubComfyServer() as server:
+        client = ComfyClient(port=server.port, use_websocket=False)
+        first = load_registry(client, str(tmp_path), key="im-1")
+        second = load_registry(client, str(tmp_path), key="im-1")
+        assert server.object_info_requests == 1
+        assert second.class_types == first.class_types
+
+        load_registry(client, str(tmp_path), key="im-2")  # a new image refetches
+        assert server.object_info_requests == 2
+        client.close()
+
+    assert NodeRegistry.load(str(tmp_path / "im-1.json"), "im-2") is None
+
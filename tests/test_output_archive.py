@@ -0,0 +1,49 @@
+"""Tests for output_archive: ordering of multi-node, multi-batch outputs and zip round trips."""
+import io
+import os
+import sys
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from output_archive import ordered_outputs, pack, unpack
+
+
+def _image(name, folder_type="output"):
+    return {"filename": name, "subfolder": "", "type": folder_type}
+
+
+HISTORY = {
+    "outputs": {
+        "12": {"images": [_image("face_00001_.png")]},
+        "9": {"images": [_image("base_00001_.png"), _image("base_00002_.png")]},
+        "15": {"images": [_image("preview.png", "temp")]},
+        "10": {"images": [_image("upscaled_00001_.png"), _image("upscaled_00002_.png")]},
+    }
+}
+
+
+def test_orders_by_requested_node_then_node_id_and_batch_index():
+    triples = [(node_id, index, image["filename"]) for node_id, index, image in ordered_outputs(HISTORY, "10")]
+    assert triples == [
+        ("10", 0, "upscaled_00001_.png"),
+        ("10", 1, "upscaled_00002_.png"),
+        ("9", 0, "base_00001_.png"),
+        ("9", 1, "base_00002_.png"),
+        ("12", 0, "face_00001_.png"),
+    ]
+    assert [node_id for node_id, _, _ in ordered_outputs(HISTORY)] == ["9", "9", "10", "10", "12"]
+    assert ordered_outputs({"outputs": {}}) == []
+
+
+def test_pack_round_trips_and_groups_by_node():
+    outputs = [
+        {"node_id": "10", "batch_index": 0, "filename": "a_00001_.png", "image": b"\x89PNG-a"},
+        {"node_id": "10", "batch_index": 1, "filename": "a_00002_.png", "image": b"\x89PNG-b"},
+        {"node_id": "12", "batch_index": 0, "filename": "face.png", "image": b"\x89PNG-c"},
+    ]
+    data = pack(outputs)
+
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.namelist() == ["10/000_a_00001_.png", "10/001_a_00002_.png", "12/000_face.png"]
+    assert unpack(data) == outputs
@@ -0,0 +1,56 @@
+"""Tests for output_reaper.OutputReaper on a temp directory."""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from output_reaper import OutputReaper
+
+
+def _make(path, name, size, age):
+    f = path / name
+    f.write_bytes(b"x" * size)
+    mtime = time.time() - age
+    os.utime(f, (mtime, mtime))
+    return f
+
+
+def test_release_deletes_returned_files(tmp_path):
+    f = _make(tmp_path, "abc_00001_.png", 10, 0)
+    reaper = OutputReaper(str(tmp_path))
+    reaper.release(f.name)
+    assert reaper.drain() == 1
+    assert not f.exists()
+
+
+def test_background_thread_processes_releases(tmp_path):
+    f = _make(tmp_path, "abc_00001_.png", 10, 0)
+    reaper = OutputReaper(str(tmp_path), interval=60).start()
+    reaper.release(f.name)
+    for _ in range(100):
+        if not f.exists():
+            break
+        time.sleep(0.01)
+    reaper.stop()
+    assert not f.exists()
+
+
+def test_sweep_evicts_expired_files(tmp_path):
+    old = _make(tmp_path, "old.png", 10, 3600)
+    new = _make(tmp_path, "new.png", 10, 0)
+    assert OutputReaper(str(tmp_path), max_age=600).sweep() == 1
+    assert not old.exists() and new.exists()
+
+
+def test_sweep_evicts_oldest_first_until_under_caps(tmp_path):
+    files = [_make(tmp_path, f"{i}.png", 100, 100 - i) for i in range(5)]
+    (tmp_path / "sub").mkdir()
+    nested = _make(tmp_path / "sub", "nested.png", 100, 0)
+
+    assert OutputReaper(str(tmp_path), max_bytes=350).sweep() == 3
+    assert [f.exists() for f in files] == [False, False, False, True, True]
+    assert nested.exists()
+
+    assert OutputReaper(str(tmp_path), max_files=1).sweep() == 2
+    assert nested.exists()
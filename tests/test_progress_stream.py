@@ -0,0 +1,96 @@
+"""Tests for progress_stream and ComfyClient event listeners, driven by a stub progress emitter."""
+import base64
+import json
+import os
+import struct
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from comfy_client import ComfyClient, ComfyError
+from progress_stream import PromptEvents, image_chunks, progress_events, sse
+
+
+class ProgressEmitter:
+    """Feeds a client the websocket messages ComfyUI sends while running a prompt."""
+
+    def __init__(self, client, prompt_id):
+        self.client = client
+        self.prompt_id = prompt_id
+
+    def json(self, msg_type, **data):
+        self.client._dispatch({"type": msg_type, "data": {"prompt_id": self.prompt_id, **data}})
+
+    def preview(self, image=b"\xff\xd8jpeg"):
+        self.client._dispatch_binary(struct.pack(">II", 1, 1) + image)
+
+    def preview_with_metadata(self, node, image=b"\x89PNG"):
+        metadata = json.dumps({"node_id": node, "prompt_id": self.prompt_id, "image_type": "image/png"}).encode()
+        self.client._dispatch_binary(struct.pack(">II", 4, len(metadata)) + metadata + image)
+
+    def run(self, steps=2, fail=False):
+        self.json("execution_start")
+        self.json("execution_cached", nodes=["1"])
+        self.json("executing", node="2")
+        for step in range(1, steps + 1):
+            self.json("progress", node="2", value=step, max=steps)
+            self.preview()
+        if fail:
+            self.json("execution_error", node_id="3", exception_message="CUDA out of memory")
+            return
+        self.json("executing", node="3")
+        self.preview_with_metadata("3")
+        self.json("executing", node=None)
+
+
+@pytest.fixture
+def client():
+    client = ComfyClient(port=1, use_websocket=False)
+    yield client
+    client.close()
+
+
+def test_progress_and_previews_until_done(client):
+    with PromptEvents(client) as events:
+        emitter = ProgressEmitter(client, "p1")
+        ProgressEmitter(client, "other").json("executing", node="9")  # another prompt's events are ignored
+        threading.Thread(target=emitter.run).start()
+        stream = list(progress_events(events, "p1", total_nodes=4, is_done=lambda: False, heartbeat=5))
+
+    kinds = [event for event, _ in stream]
+    assert kinds == ["progress", "progress", "progress", "preview", "progress", "preview", "progress", "preview"]
+    progress = [data["progress"] for event, data in stream if event == "progress"]
+    assert progress == sorted(progress) and progress[-1] < 1
+    assert stream[2][1] == {"node": "2", "value": 1, "max": 2, "progress": 0.375}
+
+    previews = [data for event, data in stream if event == "preview"]
+    assert previews[0] == {"node": "2", "format": "jpeg", "data": base64.b64encode(b"\xff\xd8jpeg").decode()}
+    assert previews[-1]["node"] == "3" and previews[-1]["format"] == "png"
+    assert client._listeners == []
+
+
+def test_errors_and_missed_completion(client):
+    with PromptEvents(client) as events:
+        ProgressEmitter(client, "p1").run(fail=True)
+        with pytest.raises(ComfyError):
+            list(progress_events(events, "p1", total_nodes=3, is_done=lambda: False))
+
+    # no websocket events at all: heartbeats until the history says the prompt is done
+    checks = iter([False, True])
+    with PromptEvents(client) as events:
+        stream = list(progress_events(events, "p2", 3, is_done=lambda: next(checks), heartbeat=0.01))
+    assert stream == [(None, {})]
+
+
+def test_image_chunks_and_sse_frames():
+    outputs = [{"node_id": "9", "batch_index": 1, "filename": "a.png", "image": b"x" * 10}]
+    chunks = list(image_chunks(outputs, chunk_size=4))
+
+    assert [data["chunk"] for _, data in chunks] == [0, 1, 2]
+    assert [data["last"] for _, data in chunks] == [False, False, True]
+    assert b"".join(base64.b64decode(data["data"]) for _, data in chunks) == b"x" * 10
+    assert sse("done", {"images": 1}) == 'event: done\ndata: {"images":1}\n\n'
+    assert sse(None) == ": keep-alive\n\n"
@@ -9,82 +9,53 @@ import os
 import tempfile
 from pathlib import Path
 import shutil
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model_manifest import MANIFEST_PATH, load_manifest
 
 # Get the volume
 vol = modal.Volume.from_name("comfy-cache", create_if_missing=True)
 
 # Create the app
-app = modal.App("volume-local-test-fixed")
+app = modal.App(
+    "volume-local-test-fixed",
+    image=(
+        modal.Image.debian_slim()
+        .add_local_file(MANIFEST_PATH, "/root/model_manifest.json")
+        .add_local_python_source("model_manifest", "model_store", "volume_inventory")
+    ),
+)
 
 @app.function(volumes={"/model-cache": vol})
 def get_volume_info():
     """Get information about the Modal volume contents"""
-    import os
-    from pathlib import Path
+    from volume_inventory import inventory, print_report
     
     print("=== MODAL VOLUME VERIFICATION ===")
     
-    # Check volume contents
-    volume_files = []
-    if os.path.exists("/model-cache"):
-        volume_files = os.listdir("/model-cache")
+    # Expected models come from the shared manifest (model_manifest.json)
+    expected_models = load_manifest()
     
-    print(f"Files in volume: {len(volume_files)}")
+    # one scandir pass over the volume (cached in /model-cache/.inventory.json)
+    result = inventory("/model-cache", expected_models)
+    print_report(result)
     
-    # Expected models from your configuration
-    expected_models = {
-        "untitled_pony.safetensors": "checkpoint",
-        "4x_foolhardy_Remacri.pth": "upscaler",
-        "dramatic_lightning.safetensors": "lora",
-        "RealSkin_xxXL_v1.safetensors": "lora",
-        "amateur_slider.safetensors": "lora",
-        "LUT_color_grading.safetensors": "lora",
-        "mayafoxx_SDXL-000002-e750.safetensors": "lora",
-        "add_brightness_XL.safetensors": "lora",
-        "person_yolov8m-seg.pt": "segm",
-        "face_yolov8m.pt": "bbox",
-        "sam_vit_b_01ec64.pth": "sam"
+    file_info = {
+        row["name"]: {"size": row["size"] or 0, "type": row["type"], "exists": row["status"] != "missing"}
+        for row in result["models"]
     }
-    
-    found_models = []
-    missing_models = []
-    extra_files = []
-    file_info = {}
-    
-    for filename in volume_files:
-        if filename in expected_models:
-            file_path = f"/model-cache/{filename}"
-            file_size = os.path.getsize(file_path)
-            model_type = expected_models[filename]
-            print(f"✅ {filename} ({model_type}) - {file_size} bytes")
-            found_models.append(filename)
-            file_info[filename] = {
-                "size": file_size,
-                "type": model_type,
-                "exists": True
-            }
-        else:
-            print(f"📁 {filename} (extra file)")
-            extra_files.append(filename)
-    
-    for expected_file in expected_models:
-        if expected_file not in volume_files:
-            print(f"❌ {expected_file} - MISSING")
-            missing_models.append(expected_file)
-            file_info[expected_file] = {
-                "size": 0,
-                "type": expected_models[expected_file],
-                "exists": False
-            }
+    found_models = [row["name"] for row in result["models"] if row["status"] != "missing"]
     
     return {
         "found_models": found_models,
-        "missing_models": missing_models,
-        "extra_files": extra_files,
+        "missing_models": result["missing"],
+        "extra_files": result["extra"],
+        "corrupt_models": result["corrupt"],
         "total_expected": len(expected_models),
         "total_found": len(found_models),
         "file_info": file_info,
-        "volume_files": volume_files
     }
 
 @app.function(volumes={"/model-cache": vol})
@@ -110,20 +81,8 @@ def test_symlinks_in_modal():
         os.makedirs(path, exist_ok=True)
         print(f"📂 Created: {path}")
     
-    # Model type mapping
-    all_models = {
-        "untitled_pony.safetensors": "checkpoint",
-        "4x_foolhardy_Remacri.pth": "upscaler",
-        "dramatic_lightning.safetensors": "lora",
-        "RealSkin_xxXL_v1.safetensors": "lora",
-        "amateur_slider.safetensors": "lora",
-        "LUT_color_grading.safetensors": "lora",
-        "mayafoxx_SDXL-000002-e750.safetensors": "lora",
-        "add_brightness_XL.safetensors": "lora",
-        "person_yolov8m-seg.pt": "segm",
-        "face_yolov8m.pt": "bbox",
-        "sam_vit_b_01ec64.pth": "sam"
-    }
+    # Model type mapping, from the shared manifest
+    all_models = {model["name"]: model["type"] for model in load_manifest()}
     
     # Create symlinks
     created_links = []
@@ -0,0 +1,62 @@
+"""Tests for request_log's compact, level-gated records."""
+import json
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from request_log import RequestLog
+from workflow_normalize import normalize, workflow_hash
+
+WORKFLOW = {"1": {"class_type": "SaveImage", "inputs": {"filename_prefix": "x", "images": ["2", 0]}}}
+
+
+def _records(caplog):
+    return [json.loads(record.getMessage()) for record in caplog.records]
+
+
+def test_info_level_logs_hash_not_body(caplog):
+    log = RequestLog(logging.getLogger("test_requests_info"))
+    with caplog.at_level(logging.INFO, logger="test_requests_info"):
+        assert log.received("r1", WORKFLOW, "abc123") is False
+        log.completed("r1", "ok", {"wait": 1.5}, prompt_id="p1")
+
+    received, completed = _records(caplog)
+    assert received == {"event": "request_received", "request_id": "r1",
+                        "workflow_hash": "abc123", "nodes": 1}
+    assert completed["status"] == "ok" and completed["prompt_id"] == "p1"
+    assert completed["timings"] == {"wait": 1.5}
+
+
+def test_body_dumped_when_sampled_or_debug(caplog):
+    log = RequestLog(logging.getLogger("test_requests_sampled"), sample_rate=0.5, rng=lambda: 0.1)
+    with caplog.at_level(logging.INFO, logger="test_requests_sampled"):
+        assert log.received("r2", WORKFLOW, "h2") is True
+        RequestLog(log.logger).received("r3", WORKFLOW, "h3", debug=True)
+
+    bodies = [r for r in _records(caplog) if r["event"] == "request_body"]
+    assert [b["request_id"] for b in bodies] == ["r2", "r3"]
+    assert bodies[0]["workflow"] == WORKFLOW
+
+
+def test_logged_hash_matches_the_cache_key(caplog):
+    # the caller logs the key it computed for the result cache, not a hash of its own
+    reordered = {"1": {"inputs": {"images": ["2", 0], "filename_prefix": "x"}, "class_type": "SaveImage",
+                       "_meta": {"title": "Save"}}}
+    workflow = normalize(reordered)
+    key = workflow_hash(workflow, normalized=True)
+    log = RequestLog(logging.getLogger("test_requests_key"))
+    with caplog.at_level(logging.INFO, logger="test_requests_key"):
+        log.received("r4", workflow, key)
+
+    assert _records(caplog)[0]["workflow_hash"] == key == workflow_hash(WORKFLOW)
+
+
+def test_disabled_logger_does_no_work(caplog, monkeypatch):
+    monkeypatch.setattr(RequestLog, "_emit", lambda *args: (_ for _ in ()).throw(AssertionError))
+    log = RequestLog(logging.getLogger("test_requests_quiet"))
+    with caplog.at_level(logging.WARNING, logger="test_requests_quiet"):
+        log.received("r5", WORKFLOW, "h5")
+        log.completed("r5", "ok")
+    assert caplog.records == []
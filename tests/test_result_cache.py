@@ -0,0 +1,63 @@
+"""Tests for result_cache: TTL expiry and LRU eviction."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from result_cache import ResultCache
+from workflow_normalize import workflow_hash
+
+WORKFLOW = {
+    "1": {"class_type": "EmptyLatentImage", "inputs": {"width": 64, "height": 64, "batch_size": 1},
+          "_meta": {"title": "Latent"}},
+    "2": {"class_type": "SaveImage", "inputs": {"images": ["1", 0], "filename_prefix": "abc"}},
+}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_hit_miss_and_ttl(tmp_path):
+    clock = Clock()
+    cache = ResultCache(str(tmp_path), ttl=60, clock=clock)
+    key = workflow_hash(WORKFLOW)
+
+    assert cache.get(key) is None
+    cache.put(key, b"png")
+    assert cache.get(key) == b"png"
+
+    clock.now += 61
+    assert cache.get(key) is None
+    assert not os.path.exists(tmp_path / (key + ".bin"))
+    assert cache.stats() == {"entries": 0, "bytes": 0, "hits": 1, "misses": 2}
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=10)
+    cache.put("a", b"aaaa")
+    cache.put("b", b"bbbb")
+    cache.get("a")  # "b" is now the least recently used
+    cache.put("c", b"cccc")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"aaaa" and cache.get("c") == b"cccc"
+    assert sorted(os.listdir(tmp_path)) == ["a.bin", "c.bin"]
+
+    bounded = ResultCache(str(tmp_path / "n"), max_entries=1)
+    bounded.put("x", b"1")
+    bounded.put("y", b"2")
+    assert bounded.stats()["entries"] == 1 and bounded.get("y") == b"2"
+
+
+def test_entries_survive_restarts_and_are_shared(tmp_path):
+    writer = ResultCache(str(tmp_path))
+    reader = ResultCache(str(tmp_path))
+    writer.put("k", b"image")
+
+    assert reader.get("k") == b"image"  # written after reader indexed the directory
+    assert ResultCache(str(tmp_path)).stats()["entries"] == 1
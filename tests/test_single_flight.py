@@ -0,0 +1,87 @@
+"""Tests for single_flight coalescing with a fake executor."""
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from single_flight import SingleFlight
+
+
+class FakeExecutor:
+    """Stands in for a ComfyUI run: emits a prompt id, then blocks until released."""
+
+    def __init__(self, fail=False):
+        self.runs = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.fail = fail
+
+    def __call__(self, emit):
+        self.runs += 1
+        emit(f"prompt-{self.runs}")
+        self.started.set()
+        assert self.release.wait(5)
+        if self.fail:
+            raise RuntimeError("GPU on fire")
+        return b"image"
+
+
+def _wait_for_followers(flight, key, count):
+    deadline = time.monotonic() + 5
+    while flight._flights[key].followers < count:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    flight, executor = SingleFlight(), FakeExecutor()
+    seen = []
+
+    with ThreadPoolExecutor(4) as pool:
+        leader = pool.submit(flight.do, "wf", executor, seen.append)
+        executor.started.wait(5)
+        followers = [pool.submit(flight.do, "wf", executor, seen.append) for _ in range(3)]
+        _wait_for_followers(flight, "wf", 3)
+        executor.release.set()
+        results = [leader.result()] + [f.result() for f in followers]
+
+    assert executor.runs == 1
+    assert results[0] == (b"image", False)
+    assert results[1:] == [(b"image", True)] * 3
+    assert seen == ["prompt-1"] * 4  # followers got the event emitted before they joined
+    assert (flight.executions, flight.coalesced, flight.in_flight()) == (1, 3, 0)
+
+
+def test_errors_reach_every_caller_and_key_is_released():
+    flight, executor = SingleFlight(), FakeExecutor(fail=True)
+
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(flight.do, "wf", executor)
+        executor.started.wait(5)
+        follower = pool.submit(flight.do, "wf", executor)
+        _wait_for_followers(flight, "wf", 1)
+        executor.release.set()
+        for future in (leader, follower):
+            with pytest.raises(RuntimeError, match="GPU on fire"):
+                future.result()
+
+    # a finished key runs again on the next call
+    executor.fail = False
+    assert flight.do("wf", executor) == (b"image", False)
+    assert executor.runs == 2
+
+
+def test_different_keys_run_independently_and_listener_errors_are_contained():
+    flight = SingleFlight()
+
+    def broken_listener(_):
+        raise ValueError("boom")
+
+    assert flight.do("a", lambda emit: emit("x") or 1, broken_listener) == (1, False)
+    assert flight.do("b", lambda emit: 2) == (2, False)
+    assert flight.executions == 2 and flight.coalesced == 0
@@ -0,0 +1,101 @@
+"""Tests for symlink_reconciler against a temp cache and ComfyUI tree."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model_store import ModelStore
+from symlink_reconciler import plan, reconcile, scan_links
+
+
+def _setup(tmp_path):
+    cache = tmp_path / "cache"
+    cache.mkdir()
+    comfy_paths = {"checkpoint": str(tmp_path / "comfy" / "checkpoints"),
+                   "lora": str(tmp_path / "comfy" / "loras")}
+    return ModelStore(str(cache)), comfy_paths
+
+
+def _add(store, name, data):
+    src = os.path.join(store.root, f"temp_{name}")
+    with open(src, "wb") as f:
+        f.write(data)
+    store.add_file(src, name)
+
+
+MODELS = [{"name": "base.safetensors", "type": "checkpoint"}, {"name": "style.safetensors", "type": "lora"}]
+
+
+def test_creates_links_then_is_a_no_op(tmp_path):
+    store, comfy_paths = _setup(tmp_path)
+    _add(store, "base.safetensors", b"ckpt")
+    with open(os.path.join(store.root, "style.safetensors"), "wb") as f:  # legacy flat file
+        f.write(b"lora")
+
+    first = reconcile(MODELS, store, comfy_paths)
+    assert len(first["create"]) == 2 and first["missing"] == []
+    link = os.path.join(comfy_paths["checkpoint"], "base.safetensors")
+    assert os.readlink(link) == store.resolve("base.safetensors")
+    with open(os.path.join(comfy_paths["lora"], "style.safetensors"), "rb") as f:
+        assert f.read() == b"lora"
+
+    second = reconcile(MODELS, store, comfy_paths)
+    assert not second["create"] and not second["retarget"] and not second["remove"]
+    assert len(second["unchanged"]) == 2
+
+
+def test_retargets_and_removes_stale_links(tmp_path):
+    store, comfy_paths = _setup(tmp_path)
+    _add(store, "base.safetensors", b"v1")
+    _add(store, "style.safetensors", b"lora")
+    reconcile(MODELS, store, comfy_paths)
+
+    _add(store, "base.safetensors", b"v2")  # new content under the same name
+    result = reconcile(MODELS[:1], store, comfy_paths)
+
+    assert [link for link, _ in result["retarget"]] == [os.path.join(comfy_paths["checkpoint"], "base.safetensors")]
+    assert result["remove"] == [os.path.join(comfy_paths["lora"], "style.safetensors")]
+    with open(os.path.join(comfy_paths["checkpoint"], "base.safetensors"), "rb") as f:
+        assert f.read() == b"v2"
+    assert not os.path.lexists(os.path.join(comfy_paths["lora"], "style.safetensors"))
+
+
+def test_leaves_foreign_files_and_links_alone(tmp_path):
+    store, comfy_paths = _setup(tmp_path)
+    os.makedirs(comfy_paths["checkpoint"])
+    os.makedirs(comfy_paths["lora"])
+    regular = os.path.join(comfy_paths["checkpoint"], "base.safetensors")
+    with open(regular, "wb") as f:
+        f.write(b"baked into the image")
+    foreign = os.path.join(comfy_paths["lora"], "other.safetensors")
+    os.symlink("/elsewhere/other.safetensors", foreign)
+    _add(store, "base.safetensors", b"ckpt")
+
+    result = reconcile(MODELS, store, comfy_paths)
+
+    assert result["conflicts"] == [regular]
+    assert result["missing"] == ["style.safetensors"]
+    assert not result["remove"]
+    assert not os.path.islink(regular)
+    assert os.readlink(foreign) == "/elsewhere/other.safetensors"
+
+
+def test_dry_run_changes_nothing(tmp_path):
+    store, comfy_paths = _setup(tmp_path)
+    _add(store, "base.safetensors", b"ckpt")
+
+    result = reconcile(MODELS, store, comfy_paths, dry_run=True)
+
+    assert len(result["create"]) == 1
+    assert scan_links(list(comfy_paths.values())) == {}
+
+
+def test_plan_is_a_pure_diff():
+    desired = {"/c/a": "/cache/a", "/c/b": "/cache/b2"}
+    current = {"/c/b": "/cache/b1", "/c/old": "/cache/old", "/c/keep": None}
+
+    actions = plan(desired, current, "/cache")
+
+    assert actions["create"] == [("/c/a", "/cache/a")]
+    assert actions["retarget"] == [("/c/b", "/cache/b2")]
+    assert actions["remove"] == ["/c/old"]
@@ -0,0 +1,53 @@
+"""Tests for timings.Timeline and prompt_timings."""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from comfy_client import ComfyClient
+from comfy_stub import StubComfyServer
+from timings import Timeline, prompt_timings
+
+
+def test_timeline_records_ordered_phases():
+    timeline = Timeline()
+    with timeline.phase("one"):
+        time.sleep(0.01)
+    with timeline.phase("two"):
+        pass
+    data = timeline.as_dict()
+    assert [p["phase"] for p in data["phases"]] == ["one", "two"]
+    assert data["phases"][0]["duration"] >= 0.01
+    assert data["phases"][1]["start"] >= data["phases"][0]["end"]
+    assert data["total"] >= data["phases"][1]["end"]
+
+
+def test_timeline_durations_are_flat():
+    timeline = Timeline()
+    with timeline.phase("submit"):
+        pass
+    timeline.extra["queue_wait"] = 0.5
+    flat = timeline.durations()
+    assert set(flat) == {"submit", "total", "queue_wait"}
+    assert flat["queue_wait"] == 0.5
+
+
+def test_prompt_timings_from_history_messages():
+    entry = {"status": {"messages": [
+        ["execution_start", {"timestamp": 10_500}],
+        ["execution_cached", {"nodes": []}],
+        ["execution_success", {"timestamp": 12_000}],
+    ]}}
+    assert prompt_timings(entry, submitted_at=10.0) == {"queue_wait": 0.5, "execution": 1.5}
+    assert prompt_timings({"status": {"messages": []}}, submitted_at=10.0) == {}
+
+
+def test_prompt_timings_against_stub():
+    with StubComfyServer(delay=0.1) as server:
+        client = ComfyClient(port=server.port, use_websocket=False)
+        submitted_at = time.time()
+        _, entry = client.run({"1": {"class_type": "SaveImage", "inputs": {}}}, timeout=5, poll_interval=0.02)
+        timings = prompt_timings(entry, submitted_at)
+        assert timings["execution"] >= 0.09
+        client.close()
@@ -0,0 +1,99 @@
+"""Tests for volume_inventory on a temp volume layout."""
+import hashlib
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import volume_inventory
+from model_store import ModelStore
+from volume_inventory import INDEX_FILE, diff, inventory
+
+
+def _write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+    return str(path)
+
+
+def _volume(tmp_path):
+    store = ModelStore(str(tmp_path))
+    store.add_file(_write(tmp_path / "temp_1", b"checkpoint"), "base.safetensors", source_id="1")
+    _write(tmp_path / "style.safetensors", b"lora")   # legacy flat file
+    _write(tmp_path / "old.safetensors", b"stale")    # no longer in the manifest
+    _write(tmp_path / "temp_99", b"partial")          # interrupted download
+    return store
+
+
+MODELS = [
+    {"name": "base.safetensors", "type": "checkpoint", "size": None, "sha256": None},
+    {"name": "style.safetensors", "type": "lora", "size": 4, "sha256": None},
+    {"name": "gone.safetensors", "type": "lora", "size": None, "sha256": None},
+]
+
+
+def test_inventory_reports_rows_and_diffs(tmp_path):
+    store = _volume(tmp_path)
+
+    result = inventory(str(tmp_path), MODELS)
+
+    rows = {row["name"]: row for row in result["models"]}
+    assert rows["base.safetensors"]["path"] == store.resolve("base.safetensors")
+    assert rows["base.safetensors"]["size"] == len(b"checkpoint")
+    assert rows["base.safetensors"]["sha256"] == hashlib.sha256(b"checkpoint").hexdigest()
+    assert rows["style.safetensors"]["status"] == "ok"
+    assert result["missing"] == ["gone.safetensors"]
+    assert result["extra"] == ["old.safetensors"]
+    assert result["partial"] == ["temp_99"]
+    assert result["corrupt"] == []
+    assert result["summary"]["present"] == 2
+    json.dumps(diff(result))  # dashboard payload is plain JSON
+
+
+def test_size_and_hash_mismatches_are_corrupt(tmp_path):
+    _volume(tmp_path)
+    models = [dict(MODELS[0], size=3), dict(MODELS[1], size=None, sha256="0" * 64)]
+
+    result = inventory(str(tmp_path), models, hash_files=True)
+
+    assert [item["name"] for item in result["corrupt"]] == ["base.safetensors", "style.safetensors"]
+    assert "size" in result["corrupt"][0]["reason"]
+    assert "sha256" in result["corrupt"][1]["reason"]
+
+
+def test_rewritten_blob_is_caught_only_when_hashing(tmp_path):
+    store = _volume(tmp_path)
+    _write(store.resolve("base.safetensors"), b"bitrot!!!!")  # same size, different bytes
+
+    assert inventory(str(tmp_path), MODELS[:1], use_cache=False)["corrupt"] == []
+    corrupt = inventory(str(tmp_path), MODELS[:1], hash_files=True, use_cache=False)["corrupt"]
+    assert [item["name"] for item in corrupt] == ["base.safetensors"]
+
+
+def test_cached_index_skips_unchanged_work(tmp_path, monkeypatch):
+    _volume(tmp_path)
+    inventory(str(tmp_path), MODELS, hash_files=True)
+    assert os.path.isfile(tmp_path / INDEX_FILE)
+
+    hashed = []
+    monkeypatch.setattr(volume_inventory, "sha256_file", lambda path: hashed.append(path) or "x")
+    inventory(str(tmp_path), MODELS, hash_files=True)
+    assert hashed == []
+
+    _write(tmp_path / "style.safetensors", b"lora v2")
+    os.utime(tmp_path / "style.safetensors", (1, 1))
+    inventory(str(tmp_path), MODELS, hash_files=True)
+    assert hashed == [os.path.join(str(tmp_path), "style.safetensors")]
+
+
+def test_orphan_blobs_and_missing_root(tmp_path):
+    store = _volume(tmp_path)
+    os.remove(os.path.join(store.index_dir, "base.safetensors.json"))
+
+    result = inventory(str(tmp_path), MODELS)
+    assert result["orphan_blobs"] == [hashlib.sha256(b"checkpoint").hexdigest()]
+    assert "base.safetensors" in result["missing"]
+
+    empty = inventory(str(tmp_path / "nope"), MODELS, use_cache=False)
+    assert empty["summary"]["missing"] == 3
@@ -0,0 +1,31 @@
+"""Tests for warmup primers built from the deployed configs."""
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from warmup import build_primer, load_primers
+
+
+def test_primer_is_cheap_but_keeps_every_loader():
+    with open(os.path.join(ROOT, "configs", "2025-07-15_mago_v027_API.json")) as f:
+        workflow = json.load(f)
+    primer = build_primer(workflow)
+
+    assert primer["5"]["inputs"] == {"width": 64, "height": 64, "batch_size": 1}
+    assert primer["3"]["inputs"]["steps"] == 1
+    assert primer["34"]["inputs"]["steps"] == 1
+    assert primer["32"]["class_type"] == "PreviewImage"
+    assert "filename_prefix" not in primer["32"]["inputs"]
+    for node_id in ("4", "11", "14", "28", "37", "38", "41"):
+        assert primer[node_id] == workflow[node_id]
+    # the deployed config itself is untouched
+    assert workflow["32"]["class_type"] == "SaveImage"
+
+
+def test_load_primers_reads_named_configs():
+    primers = load_primers(os.path.join(ROOT, "configs"), ["simple_test_workflow.json"])
+    assert len(primers) == 1
+    assert primers[0]["9"]["class_type"] == "PreviewImage"
@@ -0,0 +1,147 @@
+"""Tests for webhook.WebhookSender against a local receiver server."""
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from webhook import SIGNATURE_HEADER, DeliveryError, UnsafeDestination, WebhookSender, check_destination, sign
+
+
+class Receiver:
+    """Records POSTed callbacks; answers with ``statuses`` in turn, then 200."""
+
+    def __init__(self, statuses=()):
+        self.statuses = list(statuses)
+        self.received = []
+        self.connections = 0
+        self._lock = threading.Lock()
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with receiver._lock:
+                    receiver.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with receiver._lock:
+                    receiver.received.append((self.path, dict(self.headers), body))
+                    status = receiver.statuses.pop(0) if receiver.statuses else 200
+                self.send_response(status)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"ok")
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/webhook/image?source=modal"
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+PAYLOAD = {"request_id": "r1", "status": "completed", "user_id": "u1", "callback_data": {"test": True}}
+
+
+def test_delivers_signed_json_over_one_connection():
+    with Receiver() as receiver:
+        sender = WebhookSender(secret="s3cret", allow_private=True)
+        for _ in range(3):
+            result = sender.deliver(receiver.url, PAYLOAD)
+        sender.close()
+
+    assert result["status"] == 200 and result["attempts"] == 1
+    path, headers, body = receiver.received[0]
+    assert path == "/webhook/image?source=modal"
+    assert json.loads(body) == PAYLOAD
+    assert headers[SIGNATURE_HEADER] == sign(body, "s3cret")
+    assert receiver.connections == 1
+
+
+def test_retries_transient_failures_with_backoff():
+    delays = []
+    with Receiver(statuses=[503, 429]) as receiver:
+        sender = WebhookSender(backoff=0.5, sleep=delays.append, allow_private=True)
+        result = sender.deliver(receiver.url, PAYLOAD)
+        sender.close()
+
+    assert result["attempts"] == 3
+    assert delays == [0.5, 1.0]
+    assert len(receiver.received) == 3
+    assert SIGNATURE_HEADER not in receiver.received[0][1]
+
+
+def test_client_errors_are_not_retried():
+    with Receiver(statuses=[404]) as receiver:
+        sender = WebhookSender(sleep=lambda _: None, allow_private=True)
+        with pytest.raises(DeliveryError) as excinfo:
+            sender.deliver(receiver.url, PAYLOAD)
+        sender.close()
+
+    assert excinfo.value.status == 404 and excinfo.value.attempts == 1
+    assert len(receiver.received) == 1
+
+
+def test_gives_up_after_retries_on_connection_errors():
+    with Receiver() as receiver:
+        url = receiver.url
+    delays = []
+    sender = WebhookSender(retries=2, backoff=1, max_backoff=1.5, timeout=1, sleep=delays.append,
+                           allow_private=True)
+    with pytest.raises(DeliveryError) as excinfo:
+        sender.deliver(url, PAYLOAD)
+    assert excinfo.value.attempts == 3
+    assert delays == [1, 1.5]
+
+
+def test_rejects_unsupported_urls():
+    with pytest.raises(DeliveryError):
+        WebhookSender().deliver("ftp://example.com/hook", PAYLOAD)
+
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1:8188/interrupt",
+    "http://localhost:8188/free",
+    "http://169.254.169.254/latest/meta-data",
+    "http://10.0.0.5/hook",
+    "http://[::1]/hook",
+    "http://[::ffff:192.168.1.1]/hook",
+])
+def test_rejects_private_destinations(url):
+    with pytest.raises(UnsafeDestination):
+        check_destination(url)
+
+
+def test_private_receivers_are_refused_without_retrying():
+    delays = []
+    with Receiver() as receiver:
+        sender = WebhookSender(sleep=delays.append)
+        with pytest.raises(UnsafeDestination):
+            sender.deliver(receiver.url, PAYLOAD)
+    assert receiver.received == [] and delays == []
+
+
+def test_connections_recheck_the_connected_address(monkeypatch):
+    # the name resolved to a public address when checked, then to loopback when connecting
+    import webhook
+    monkeypatch.setattr(webhook, "check_destination", lambda url: None)
+    with Receiver() as receiver:
+        with pytest.raises(UnsafeDestination):
+            WebhookSender(sleep=lambda _: None).deliver(receiver.url, PAYLOAD)
+    assert receiver.received == []
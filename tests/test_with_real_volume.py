@@ -9,12 +9,24 @@ import os
 import tempfile
 from pathlib import Path
 import shutil
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model_manifest import MANIFEST_PATH, load_manifest
 
 # Get the volume
 vol = modal.Volume.from_name("comfy-cache", create_if_missing=True)
 
 # Create the app
-app = modal.App("volume-local-test")
+app = modal.App(
+    "volume-local-test",
+    image=(
+        modal.Image.debian_slim()
+        .add_local_file(MANIFEST_PATH, "/root/model_manifest.json")
+        .add_local_python_source("model_manifest")
+    ),
+)
 
 @app.function(volumes={"/model-cache": vol})
 def download_volume_contents():
@@ -75,20 +87,8 @@ def verify_volume_structure():
     
     print(f"Files in volume: {len(volume_files)}")
     
-    # Expected models from your configuration
-    expected_models = {
-        "untitled_pony.safetensors": "checkpoint",
-        "4x_foolhardy_Remacri.pth": "upscaler",
-        "dramatic_lightning.safetensors": "lora",
-        "RealSkin_xxXL_v1.safetensors": "lora",
-        "amateur_slider.safetensors": "lora",
-        "LUT_color_grading.safetensors": "lora",
-        "mayafoxx_SDXL-000002-e750.safetensors": "lora",
-        "add_brightness_XL.safetensors": "lora",
-        "person_yolov8m-seg.pt": "segm",
-        "face_yolov8m.pt": "bbox",
-        "sam_vit_b_01ec64.pth": "sam"
-    }
+    # Expected models come from the shared manifest (model_manifest.json)
+    expected_models = {model["name"]: model["type"] for model in load_manifest()}
     
     found_models = []
     missing_models = []
@@ -140,20 +140,8 @@ def test_local_symlinks(local_dir):
         full_path = comfy_root / dir_path
         full_path.mkdir(parents=True, exist_ok=True)
     
-    # Model type mapping
-    model_types = {
-        "untitled_pony.safetensors": "checkpoint",
-        "4x_foolhardy_Remacri.pth": "upscaler",
-        "dramatic_lightning.safetensors": "lora",
-        "RealSkin_xxXL_v1.safetensors": "lora",
-        "amateur_slider.safetensors": "lora",
-        "LUT_color_grading.safetensors": "lora",
-        "mayafoxx_SDXL-000002-e750.safetensors": "lora",
-        "add_brightness_XL.safetensors": "lora",
-        "person_yolov8m-seg.pt": "segm",
-        "face_yolov8m.pt": "bbox",
-        "sam_vit_b_01ec64.pth": "sam"
-    }
+    # Model type mapping, from the shared manifest
+    model_types = {model["name"]: model["type"] for model in load_manifest()}
     
     # ComfyUI paths
     comfy_paths = {
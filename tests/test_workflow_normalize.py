@@ -0,0 +1,95 @@
+"""Tests for workflow_normalize: canonical shapes, workflow hashes and subgraph hashes."""
+import copy
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from workflow_normalize import normalize, subgraph_hashes, workflow_hash
+
+WORKFLOW = {
+    "4": {"class_type": "CheckpointLoaderSimple", "inputs": {"ckpt_name": "sdxl.safetensors"}},
+    "5": {"class_type": "EmptyLatentImage", "inputs": {"width": 1024, "height": 1024, "batch_size": 1}},
+    "3": {"class_type": "KSampler", "inputs": {"model": ["4", 0], "latent_image": ["5", 0], "seed": 42, "cfg": 7.5}},
+    "8": {"class_type": "VAEDecode", "inputs": {"samples": ["3", 0], "vae": ["4", 2]}},
+    "9": {"class_type": "SaveImage", "inputs": {"images": ["8", 0], "filename_prefix": "ComfyUI"},
+          "_meta": {"title": "Save Image"}},
+}
+
+
+def test_normalize_fixes_link_shapes_and_strips_meta():
+    messy = copy.deepcopy(WORKFLOW)
+    messy["9"]["inputs"]["images"] = [["8", 0]]
+    messy["8"]["inputs"]["samples"] = [3, "0"]
+    messy["3"]["inputs"]["cfg"] = 7.5
+    messy["3"]["inputs"]["seed"] = 42.0
+
+    result = normalize(messy)
+
+    assert list(result) == ["3", "4", "5", "8", "9"]
+    assert result["9"] == {"class_type": "SaveImage", "inputs": {"filename_prefix": "ComfyUI", "images": ["8", 0]}}
+    assert result["8"]["inputs"]["samples"] == ["3", 0]
+    assert result["3"]["inputs"]["seed"] == 42 and isinstance(result["3"]["inputs"]["seed"], int)
+    assert list(result["3"]["inputs"]) == sorted(result["3"]["inputs"])
+    assert messy["9"]["inputs"]["images"] == [["8", 0]]  # input left untouched
+    assert normalize(result) == result
+
+
+def test_literal_lists_are_not_mistaken_for_links():
+    workflow = {"1": {"class_type": "Custom", "inputs": {"size": [512, 768], "pair": ["text", 0], "ok": [True, 1]}}}
+    assert normalize(workflow)["1"]["inputs"] == {"ok": [True, 1], "pair": ["text", 0], "size": [512, 768]}
+
+
+def test_workflow_hash_ignores_presentation_but_not_content():
+    reordered = {node_id: WORKFLOW[node_id] for node_id in reversed(list(WORKFLOW))}
+    renamed = copy.deepcopy(WORKFLOW)
+    renamed["9"]["inputs"]["filename_prefix"] = "abc123"
+    del renamed["9"]["_meta"]
+    reseeded = copy.deepcopy(WORKFLOW)
+    reseeded["3"]["inputs"]["seed"] = 43
+
+    assert workflow_hash(WORKFLOW) == workflow_hash(reordered) == workflow_hash(renamed)
+    assert workflow_hash(WORKFLOW) != workflow_hash(reseeded)
+    assert workflow_hash(WORKFLOW) == workflow_hash(normalize(WORKFLOW), normalized=True)
+    assert workflow_hash(WORKFLOW, ignore=frozenset()) != workflow_hash(renamed, ignore=frozenset())
+
+
+def test_subgraph_hashes_track_upstream_changes_only():
+    base = subgraph_hashes(WORKFLOW)
+    reseeded = copy.deepcopy(WORKFLOW)
+    reseeded["3"]["inputs"]["seed"] = 43
+    changed = subgraph_hashes(reseeded)
+
+    assert set(base) == set(WORKFLOW)
+    assert base["4"] == changed["4"] and base["5"] == changed["5"]
+    assert base["3"] != changed["3"] and base["8"] != changed["8"] and base["9"] != changed["9"]
+
+    # hashes depend on content, not on how nodes are numbered
+    renumbered = {"40" if k == "4" else k: v for k, v in copy.deepcopy(WORKFLOW).items()}
+    renumbered["3"]["inputs"]["model"] = ["40", 0]
+    renumbered["8"]["inputs"]["vae"] = ["40", 2]
+    assert subgraph_hashes(renumbered)["9"] == base["9"]
+
+
+def test_subgraph_hashes_reject_cycles():
+    cyclic = {"1": {"class_type": "A", "inputs": {"x": ["2", 0]}}, "2": {"class_type": "B", "inputs": {"y": ["1", 0]}}}
+    with pytest.raises(ValueError, match="cycle"):
+        subgraph_hashes(cyclic)
+
+
+def test_invalid_nodes_pass_through_for_validation():
+    assert normalize({"1": "not a node"}) == {"1": "not a node"}
+    assert normalize([1, 2]) == [1, 2]
+    assert len(workflow_hash({"1": "not a node"})) == 64
+
+
+def test_hashes_thousands_of_workflows_per_second():
+    started = time.perf_counter()
+    for seed in range(1000):
+        workflow = copy.deepcopy(WORKFLOW)
+        workflow["3"]["inputs"]["seed"] = seed
+        workflow_hash(workflow)
+    assert time.perf_counter() - started < 2  # ~0.05s on a laptop core; generous for CI
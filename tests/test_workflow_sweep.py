@@ -0,0 +1,61 @@
+"""Tests for workflow_sweep using the deployed API-format configs."""
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from workflow_sweep import apply_variant, batch_variants, expand_sweep, seed_variants
+
+
+def _template():
+    with open(os.path.join(ROOT, "configs", "2025-07-15_mago_v027_API.json")) as f:
+        return json.load(f)
+
+
+def test_distinct_seeds_get_their_own_prompts():
+    template = _template()
+    prompts = expand_sweep(template, seed_variants([111, 222, 333]))
+    assert [indices for _, indices in prompts] == [[0], [1], [2]]
+    assert [w["3"]["inputs"]["seed"] for w, _ in prompts] == [111, 222, 333]
+    assert [w["5"]["inputs"]["batch_size"] for w, _ in prompts] == [1, 1, 1]
+
+
+def test_repeats_of_one_seed_share_one_batched_prompt():
+    template = _template()
+    prompts = expand_sweep(template, batch_variants(7, 3))
+    assert len(prompts) == 1
+    workflow, indices = prompts[0]
+    assert indices == [0, 1, 2]
+    assert workflow["5"]["inputs"]["batch_size"] == 3
+    assert workflow["3"]["inputs"]["seed"] == 7
+    # FaceDetailer keeps its own seed and the template is untouched
+    assert workflow["34"]["inputs"]["seed"] == template["34"]["inputs"]["seed"]
+    assert template["5"]["inputs"]["batch_size"] == 1
+
+
+def test_batches_are_split_by_seed_overrides_and_max_size():
+    variants = batch_variants(1, 5) + batch_variants(1, 1, {"6": {"text": "other prompt"}}) + seed_variants([2])
+    prompts = expand_sweep(_template(), variants, max_batch_size=2)
+    assert [indices for _, indices in prompts] == [[0, 1], [2, 3], [4], [5], [6]]
+    assert [w["5"]["inputs"]["batch_size"] for w, _ in prompts] == [2, 2, 1, 1, 1]
+    assert prompts[3][0]["6"]["inputs"]["text"] == "other prompt"
+    assert prompts[4][0]["3"]["inputs"]["seed"] == 2
+
+
+def test_templates_without_empty_latent_are_not_batched():
+    template = {
+        "1": {"class_type": "LoadImage", "inputs": {"image": "x.png"}},
+        "2": {"class_type": "VAEEncode", "inputs": {"pixels": ["1", 0]}},
+        "3": {"class_type": "KSampler", "inputs": {"seed": 0, "latent_image": ["2", 0]}},
+    }
+    prompts = expand_sweep(template, seed_variants([7, 8]))
+    assert [w["3"]["inputs"]["seed"] for w, _ in prompts] == [7, 8]
+
+
+def test_unknown_override_node_raises():
+    with pytest.raises(KeyError):
+        apply_variant(_template(), {"overrides": {"999": {"text": "x"}}})
@@ -0,0 +1,102 @@
+"""Tests for workflow_validation's pre-flight checks."""
+import copy
+import json
+import os
+import sys
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from comfy_stub import OBJECT_INFO
+from node_registry import NodeRegistry
+from workflow_validation import WorkflowValidationError, check_workflow, model_files, validate_workflow
+
+REGISTRY = NodeRegistry(OBJECT_INFO)
+MODELS = {"checkpoint": {"base.safetensors"}, "lora": set(), "bbox": {"face_yolov8m.pt"}}
+WORKFLOW = {
+    "1": {"class_type": "CheckpointLoaderSimple", "inputs": {"ckpt_name": "base.safetensors"}},
+    "2": {"class_type": "EmptyLatentImage", "inputs": {"width": 64, "height": 64, "batch_size": 1}},
+    "3": {"class_type": "SaveImage", "inputs": {"images": ["2", 0], "filename_prefix": "x"}},
+}
+
+
+def _types(errors):
+    return [(error["node_id"], error["type"]) for error in errors]
+
+
+def test_valid_workflow_passes():
+    assert validate_workflow(WORKFLOW, REGISTRY, MODELS) == []
+    check_workflow(WORKFLOW, REGISTRY, MODELS)
+
+
+def test_unknown_node_and_missing_input():
+    workflow = copy.deepcopy(WORKFLOW)
+    workflow["4"] = {"class_type": "ImageResize", "inputs": {}}
+    del workflow["2"]["inputs"]["height"]
+
+    errors = validate_workflow(workflow, REGISTRY, MODELS)
+
+    assert _types(errors) == [("2", "missing_input"), ("4", "unknown_node")]
+    assert errors[0]["input"] == "height"
+
+
+def test_bad_links():
+    workflow = copy.deepcopy(WORKFLOW)
+    workflow["3"]["inputs"]["images"] = ["9", 0]
+    workflow["5"] = {"class_type": "SaveImage", "inputs": {"images": ["1", 3], "filename_prefix": "y"}}
+
+    errors = validate_workflow(workflow, REGISTRY, MODELS)
+
+    assert _types(errors) == [("3", "bad_link"), ("5", "bad_link")]
+    assert "missing node 9" in errors[0]["message"]
+    assert "has 3 outputs" in errors[1]["message"]
+
+
+def test_missing_models_including_prefixed_detector_names():
+    workflow = copy.deepcopy(WORKFLOW)
+    workflow["1"]["inputs"]["ckpt_name"] = "other.safetensors"
+    workflow["6"] = {"class_type": "LoraLoader", "inputs": {"lora_name": "style.safetensors"}}
+    workflow["7"] = {"class_type": "UltralyticsDetectorProvider", "inputs": {"model_name": "bbox/face_yolov8m.pt"}}
+    workflow["8"] = {"class_type": "UltralyticsDetectorProvider", "inputs": {"model_name": "segm/person.pt"}}
+
+    errors = validate_workflow(workflow, models=MODELS)  # no registry: only links and models
+
+    assert _types(errors) == [("1", "missing_model"), ("6", "missing_model"), ("8", "missing_model")]
+
+
+def test_check_workflow_raises_structured_error():
+    with pytest.raises(WorkflowValidationError) as excinfo:
+        check_workflow({"1": {"inputs": {}}}, REGISTRY, MODELS)
+    payload = excinfo.value.as_dict()
+    assert payload["error"] == "invalid_workflow"
+    assert _types(payload["errors"]) == [("1", "invalid_node")]
+    json.dumps(payload)
+    assert _types(validate_workflow({}, REGISTRY)) == [("", "invalid_workflow")]
+
+
+def test_deployed_config_validates_quickly_against_model_folders(tmp_path):
+    with open(os.path.join(ROOT, "configs", "2025-07-15_mago_v027_API.json")) as f:
+        workflow = json.load(f)
+    comfy_paths = {t: str(tmp_path / t) for t in ("checkpoint", "lora", "upscaler", "segm", "bbox", "sam")}
+    for path in comfy_paths.values():
+        os.makedirs(path)
+    models = model_files(comfy_paths)
+
+    started = time.perf_counter()
+    errors = validate_workflow(workflow, models=models)
+    elapsed = time.perf_counter() - started
+
+    assert errors and {error["type"] for error in errors} == {"missing_model"}
+    assert elapsed < 0.05
+
+    for error in errors:
+        node = workflow[error["node_id"]]
+        value = node["inputs"][error["input"]]
+        folder = {"CheckpointLoaderSimple": "checkpoint", "LoraLoader": "lora", "UpscaleModelLoader": "upscaler",
+                  "SAMLoader": "sam"}.get(node["class_type"])
+        target = os.path.join(comfy_paths[folder], value) if folder else os.path.join(tmp_path, value)
+        open(target, "w").close()
+    assert validate_workflow(workflow, models=model_files(comfy_paths)) == []
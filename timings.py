@@ -0,0 +1,69 @@
+"""Monotonic phase timelines for container boot and individual requests."""
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+
+class Timeline:
+    """Records named phases as offsets (seconds) from a monotonic origin."""
+
+    def __init__(self, origin: Optional[float] = None):
+        self.origin = time.monotonic() if origin is None else origin
+        self.phases: List[Dict] = []
+        self.extra: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            end = time.monotonic()
+            self.phases.append({
+                "phase": name,
+                "start": round(start - self.origin, 4),
+                "end": round(end - self.origin, 4),
+                "duration": round(end - start, 4),
+            })
+
+    def as_dict(self) -> Dict:
+        return {
+            "phases": list(self.phases),
+            "total": round(time.monotonic() - self.origin, 4),
+            **self.extra,
+        }
+
+    def durations(self) -> Dict[str, float]:
+        """Flat ``{phase: seconds, "total": ..., **extra}`` for compact log records."""
+        flat = {p["phase"]: p["duration"] for p in self.phases}
+        flat["total"] = round(time.monotonic() - self.origin, 4)
+        flat.update(self.extra)
+        return flat
+
+    def summary(self) -> str:
+        parts = [f"{p['phase']}={p['duration']:.3f}s" for p in self.phases]
+        parts += [f"{name}={value:.3f}s" for name, value in self.extra.items()]
+        return " ".join(parts)
+
+
+def prompt_timings(history_entry: Dict, submitted_at: float) -> Dict[str, float]:
+    """Split a prompt's wall time into server-side queue wait and execution.
+
+    Uses the ``execution_start`` / ``execution_success`` timestamps (ms since the
+    epoch) ComfyUI records in ``status.messages``; ``submitted_at`` is the
+    ``time.time()`` at which the prompt was POSTed.
+    """
+    stamps = {}
+    for message in history_entry.get("status", {}).get("messages", []):
+        if isinstance(message, list) and len(message) == 2 and isinstance(message[1], dict):
+            timestamp = message[1].get("timestamp")
+            if timestamp is not None:
+                stamps[message[0]] = timestamp / 1000
+    timings = {}
+    started = stamps.get("execution_start")
+    finished = stamps.get("execution_success") or stamps.get("execution_error")
+    if started is not None:
+        timings["queue_wait"] = round(max(0.0, started - submitted_at), 4)
+        if finished is not None:
+            timings["execution"] = round(finished - started, 4)
+    return timings
@@ -0,0 +1,169 @@
+"""Inventory of the ``comfy-cache`` volume against the model manifest.
+
+Each directory is read with a single ``os.scandir`` pass.  Results are cached in
+``<root>/.inventory.json``: the blob directory only changes when a blob is
+added or removed (blobs are immutable and named by their hash), so while its
+mtime is unchanged the cached entries are reused without touching any blob.
+Flat files are re-stat'ed, but their hash is only recomputed when size or mtime
+changed.  ``inventory()`` returns plain JSON-serialisable data (per-model rows
+plus ``missing``/``extra``/``corrupt`` lists) for dashboards.
+"""
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+
+from model_store import ModelStore, sha256_file
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = ".inventory.json"
+
+
+def _load_cache(path: str) -> Dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _save_cache(path: str, cache: Dict):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w") as f:
+            json.dump(cache, f)
+        os.replace(tmp, path)
+    except OSError as e:
+        # a read-only mount still gets an inventory, just not a cached one
+        logger.warning("Could not write inventory cache %s: %s", path, e)
+
+
+def _scan_dir(directory: str, cached: Optional[Dict], hash_files: bool, immutable: bool = False) -> Dict:
+    """``{"mtime", "files": {name: {"size", "mtime", "sha256"}}}`` for the regular files in ``directory``."""
+    try:
+        dir_mtime = os.stat(directory).st_mtime
+    except FileNotFoundError:
+        return {"mtime": None, "files": {}}
+    cached = cached or {}
+    cached_files = cached.get("files", {})
+    if immutable and cached.get("mtime") == dir_mtime:
+        files = cached_files
+    else:
+        files = {}
+        with os.scandir(directory) as it:
+            for item in it:
+                if not item.is_file(follow_symlinks=False) or item.name.startswith(INDEX_FILE):
+                    continue
+                st = item.stat(follow_symlinks=False)
+                previous = cached_files.get(item.name, {})
+                unchanged = previous.get("size") == st.st_size and previous.get("mtime") == st.st_mtime
+                files[item.name] = {"size": st.st_size, "mtime": st.st_mtime,
+                                    "sha256": previous.get("sha256") if unchanged else None}
+    if hash_files:
+        for name, info in files.items():
+            if info["sha256"] is None:
+                info["sha256"] = sha256_file(os.path.join(directory, name))
+    return {"mtime": dir_mtime, "files": files}
+
+
+def inventory(root: str, models: List[Dict], hash_files: bool = False, use_cache: bool = True) -> Dict:
+    """Compare the volume at ``root`` with the manifest ``models``.
+
+    Returns ``{"models": [row], "missing": [name], "extra": [name], "corrupt":
+    [{"name", "reason"}], "partial": [name], "orphan_blobs": [sha256],
+    "summary": {...}}``.  A row is ``{"name", "type", "path", "size", "mtime",
+    "sha256", "in_manifest", "status"}``.  With ``hash_files`` every file is
+    hashed once (then cached) and compared with the manifest and store index.
+    """
+    started = time.monotonic()
+    store = ModelStore(root)
+    cache_path = os.path.join(root, INDEX_FILE)
+    cache = _load_cache(cache_path) if use_cache else {}
+    flat = _scan_dir(root, cache.get("root"), hash_files)
+    blobs = _scan_dir(store.blob_dir, cache.get("blobs"), hash_files, immutable=True)
+    if use_cache:
+        _save_cache(cache_path, {"root": flat, "blobs": blobs, "updated": time.time()})
+
+    index = store.index()
+    manifest_names = {model["name"] for model in models}
+    result = {"models": [], "missing": [], "extra": [], "corrupt": [], "partial": [], "orphan_blobs": []}
+
+    for model in models:
+        name = model["name"]
+        entry = index.get(name)
+        row = {"name": name, "type": model.get("type"), "in_manifest": True}
+        if entry and entry.get("sha256") in blobs["files"]:
+            info = blobs["files"][entry["sha256"]]
+            row.update(path=store.blob_path(entry["sha256"]), size=info["size"], mtime=info["mtime"],
+                       sha256=info["sha256"] or entry["sha256"])
+            # a blob's name is its hash, so only a freshly computed hash can disagree with it
+            expected_sha, actual_sha = model.get("sha256") or entry["sha256"], info["sha256"]
+            expected_size = model.get("size") or entry.get("size")
+        elif name in flat["files"]:
+            info = flat["files"][name]
+            row.update(path=os.path.join(root, name), size=info["size"], mtime=info["mtime"], sha256=info["sha256"])
+            expected_sha, actual_sha = model.get("sha256"), info["sha256"]
+            expected_size = model.get("size")
+        else:
+            row.update(path=None, size=None, mtime=None, sha256=None, status="missing")
+            result["missing"].append(name)
+            result["models"].append(row)
+            continue
+
+        reason = None
+        if row["size"] == 0:
+            reason = "empty file"
+        elif expected_size is not None and row["size"] != expected_size:
+            reason = f"size {row['size']} != expected {expected_size}"
+        elif expected_sha and actual_sha and actual_sha != expected_sha.lower():
+            reason = f"sha256 {actual_sha} != expected {expected_sha}"
+        row["status"] = "corrupt" if reason else "ok"
+        if reason:
+            result["corrupt"].append({"name": name, "reason": reason})
+        result["models"].append(row)
+
+    for name in sorted(flat["files"]):
+        if name.startswith("temp_") or name.endswith(".state"):
+            result["partial"].append(name)
+        elif name not in manifest_names:
+            result["extra"].append(name)
+    result["extra"].extend(sorted(name for name in index if name not in manifest_names and name not in flat["files"]))
+    referenced = {entry.get("sha256") for entry in index.values()}
+    result["orphan_blobs"] = sorted(sha for sha in blobs["files"] if sha not in referenced)
+
+    result["summary"] = {
+        "expected": len(models),
+        "present": len(models) - len(result["missing"]),
+        "missing": len(result["missing"]),
+        "corrupt": len(result["corrupt"]),
+        "extra": len(result["extra"]),
+        "partial": len(result["partial"]),
+        "total_bytes": sum(row["size"] or 0 for row in result["models"]),
+        "seconds": round(time.monotonic() - started, 3),
+    }
+    return result
+
+
+def diff(result: Dict) -> Dict:
+    """Just the parts a dashboard alerts on."""
+    return {key: result[key] for key in ("missing", "extra", "corrupt", "partial", "orphan_blobs", "summary")}
+
+
+def print_report(result: Dict):
+    for row in result["models"]:
+        if row["status"] == "missing":
+            print(f"❌ {row['name']} - NOT FOUND")
+        else:
+            mark = "✅" if row["status"] == "ok" else "⚠️ "
+            print(f"{mark} {row['name']} ({row['size'] / 1024**2:.1f} MB)")
+    for item in result["corrupt"]:
+        print(f"⚠️  CORRUPT {item['name']}: {item['reason']}")
+    for name in result["extra"]:
+        print(f"📁 {name} (extra file)")
+    for name in result["partial"]:
+        print(f"⏳ {name} (partial download)")
+    summary = result["summary"]
+    print(f"\nFound: {summary['present']}/{summary['expected']} models, {summary['total_bytes'] / 1024**3:.2f} GB")
+    print(f"Missing: {summary['missing']}, Corrupt: {summary['corrupt']}, Extra: {summary['extra']}")
@@ -0,0 +1,39 @@
+"""Primer workflows that load models into memory before a container takes inputs.
+
+A primer is a deployed workflow shrunk to the cheapest possible run: a 64x64
+latent, a single sampling step and a ``PreviewImage`` instead of ``SaveImage``.
+It still executes every loader (checkpoint, LoRAs, upscaler, Impact-Pack
+detectors and SAM), so the first real request finds them resident.
+"""
+import copy
+import json
+import os
+from typing import Dict, List
+
+SAMPLER_CLASS_TYPES = {"KSampler", "KSamplerAdvanced", "FaceDetailer"}
+
+
+def build_primer(workflow: Dict, size: int = 64, steps: int = 1) -> Dict:
+    """Return a cheap copy of ``workflow`` that exercises the same model loaders."""
+    primer = copy.deepcopy(workflow)
+    for node in primer.values():
+        class_type = node.get("class_type")
+        inputs = node.setdefault("inputs", {})
+        if class_type == "EmptyLatentImage":
+            inputs.update({"width": size, "height": size, "batch_size": 1})
+        elif class_type in SAMPLER_CLASS_TYPES and "steps" in inputs:
+            inputs["steps"] = min(int(inputs["steps"]), steps)
+        elif class_type == "SaveImage":
+            # PreviewImage writes to the temp folder, so primers never land in the output dir
+            node["class_type"] = "PreviewImage"
+            inputs.pop("filename_prefix", None)
+    return primer
+
+
+def load_primers(config_dir: str, names: List[str]) -> List[Dict]:
+    """Build primers from the named API-format workflow files in ``config_dir``."""
+    primers = []
+    for name in names:
+        with open(os.path.join(config_dir, name)) as f:
+            primers.append(build_primer(json.load(f)))
+    return primers
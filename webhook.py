@@ -0,0 +1,172 @@
+"""Deliver finished generations to a client's callback URL.
+
+Used by the ``webhook`` endpoint: the request is acknowledged with a 202, the
+workflow runs in the background and the outcome is POSTed as JSON to the
+``webhook_url`` the client supplied.  Deliveries reuse keep-alive connections
+(one small pool per callback host) and are retried with exponential backoff on
+connection errors, 429 and 5xx responses; other 4xx answers are final.  With a
+secret configured every body is signed with HMAC-SHA256 so receivers can check
+it came from us.
+
+Callback URLs come from callers, so they must not reach this container's own
+ComfyUI server or anything else on a private network: ``check_destination``
+rejects hosts resolving to loopback, private, link-local or otherwise
+non-public addresses, and the connections themselves re-check the address they
+actually connected to, which also defeats DNS rebinding between the check and
+the POST.
+"""
+import hashlib
+import hmac
+import http.client
+import ipaddress
+import json
+import logging
+import socket
+import threading
+import time
+import urllib.parse
+from typing import Callable, Dict, Optional, Tuple
+
+from comfy_client import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_HEADER = "X-Webhook-Signature"
+USER_AGENT = "comfy-webhook/1.0"
+
+
+class DeliveryError(RuntimeError):
+    """Raised when a callback could not be delivered."""
+
+    def __init__(self, message: str, status: Optional[int] = None, attempts: int = 0):
+        super().__init__(message)
+        self.status = status
+        self.attempts = attempts
+
+
+class UnsafeDestination(DeliveryError):
+    """Raised for callback URLs that point at loopback, private or other non-public addresses."""
+
+
+def _check_address(address: str):
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    mapped = getattr(ip, "ipv4_mapped", None)
+    if mapped is not None:
+        ip = mapped
+    if not ip.is_global or ip.is_multicast:
+        raise UnsafeDestination(f"Webhook destination {ip} is not a public address")
+
+
+def check_destination(url: str):
+    """Raise ``DeliveryError`` unless ``url`` is http(s) and its host only resolves to public addresses.
+
+    Raises ``OSError`` when the host cannot be resolved.
+    """
+    parsed = urllib.parse.urlsplit(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise DeliveryError(f"Unsupported webhook URL: {url}")
+    port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    # resolution failures are OSErrors, which deliver() retries like connection errors
+    for info in socket.getaddrinfo(parsed.hostname, port, type=socket.SOCK_STREAM):
+        _check_address(info[4][0])
+
+
+def _guarded(connection_class):
+    """``connection_class`` that refuses to talk to a non-public peer once connected."""
+
+    class GuardedConnection(connection_class):
+        def connect(self):
+            super().connect()
+            try:
+                _check_address(self.sock.getpeername()[0])
+            except UnsafeDestination:
+                self.close()
+                raise
+
+    return GuardedConnection
+
+
+def sign(body: bytes, secret: str) -> str:
+    """``sha256=<hex>`` HMAC of ``body``, as sent in ``SIGNATURE_HEADER``."""
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def _retryable(status: int) -> bool:
+    return status == 429 or status >= 500
+
+
+class WebhookSender:
+    def __init__(self, secret: Optional[str] = None, retries: int = 5, backoff: float = 1.0,
+                 max_backoff: float = 30, timeout: float = 30, pool_size: int = 4,
+                 sleep: Callable[[float], None] = time.sleep, allow_private: bool = False):
+        self.secret = secret
+        # only for tests and trusted in-cluster receivers: skips the public-address checks
+        self.allow_private = allow_private
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.sleep = sleep
+        self._pools: Dict[Tuple[str, str, int], ConnectionPool] = {}
+        self._lock = threading.Lock()
+
+    def _pool(self, url: urllib.parse.SplitResult) -> ConnectionPool:
+        https = url.scheme == "https"
+        key = (url.scheme, url.hostname, url.port or (443 if https else 80))
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                connection_class = http.client.HTTPSConnection if https else http.client.HTTPConnection
+                if not self.allow_private:
+                    connection_class = _guarded(connection_class)
+                pool = self._pools[key] = ConnectionPool(key[1], key[2], size=self.pool_size, timeout=self.timeout,
+                                                         connection_class=connection_class)
+            return pool
+
+    def post(self, url: str, payload: Dict) -> Tuple[int, bytes]:
+        """POST ``payload`` as JSON once and return ``(status, body)``."""
+        parsed = urllib.parse.urlsplit(url)
+        if parsed.scheme not in ("http", "https") or not parsed.hostname:
+            raise DeliveryError(f"Unsupported webhook URL: {url}")
+        if not self.allow_private:
+            check_destination(url)
+        body = json.dumps(payload, separators=(",", ":")).encode()
+        headers = {"Content-Type": "application/json", "User-Agent": USER_AGENT}
+        if self.secret:
+            headers[SIGNATURE_HEADER] = sign(body, self.secret)
+        path = parsed.path or "/"
+        if parsed.query:
+            path += "?" + parsed.query
+        return self._pool(parsed).request("POST", path, body=body, headers=headers)
+
+    def deliver(self, url: str, payload: Dict) -> Dict:
+        """POST ``payload`` to ``url``, retrying transient failures.
+
+        Returns ``{"status", "attempts", "seconds"}``; raises ``DeliveryError``
+        once retries are exhausted or the receiver rejects the payload.
+        """
+        started = time.monotonic()
+        delay = self.backoff
+        for attempt in range(1, self.retries + 2):
+            try:
+                status, _ = self.post(url, payload)
+                if 200 <= status < 300:
+                    return {"status": status, "attempts": attempt, "seconds": round(time.monotonic() - started, 3)}
+                if not _retryable(status):
+                    raise DeliveryError(f"Webhook {url} rejected delivery with status {status}", status, attempt)
+                last_error = f"status {status}"
+            except (OSError, http.client.HTTPException) as e:
+                status, last_error = None, e
+            if attempt <= self.retries:
+                logger.info("Webhook delivery to %s failed (%s); retry %d/%d in %.1fs",
+                            url, last_error, attempt, self.retries, delay)
+                self.sleep(delay)
+                delay = min(delay * 2, self.max_backoff)
+        raise DeliveryError(f"Webhook {url} failed after {attempt} attempts: {last_error}", status, attempt)
+
+    def close(self):
+        with self._lock:
+            for pool in self._pools.values():
+                pool.close()
+            self._pools.clear()
@@ -0,0 +1,162 @@
+"""Canonical form and content hashes of API-format workflows.
+
+Clients send the same workflow in slightly different shapes: links wrapped in
+an extra list (``[["8", 0]]``), integer node ids (``[8, 0]``), output indexes
+as strings, ``7.0`` where ``7`` is meant, UI-only ``_meta`` titles and keys in
+any order.  ``normalize`` rewrites all of that in one pass over the nodes into
+a fresh dict (the caller's workflow is never mutated), so that equal workflows
+compare and hash equal:
+
+* ``workflow_hash`` is a sha256 of the whole normalized graph, ignoring the
+  per-request ``filename_prefix`` -- the key for result caching and request
+  coalescing.
+* ``subgraph_hashes`` gives every node a hash of itself plus everything
+  upstream of it, so two workflows that share a prefix (same checkpoint, LoRAs
+  and sampler settings, different upscale) share those nodes' hashes.
+"""
+import hashlib
+import json
+from typing import Dict, FrozenSet, Iterable
+
+# inputs rewritten on every request that do not change what gets rendered
+VOLATILE_INPUTS: FrozenSet[str] = frozenset({"filename_prefix"})
+
+_dumps = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False, default=str).encode
+
+
+def _node_sort_key(node_id: str):
+    return (0, int(node_id), "") if node_id.isdigit() else (1, 0, node_id)
+
+
+def _value(value):
+    """Canonical literal: integral floats become ints, dict keys are sorted."""
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else value
+    if isinstance(value, dict):
+        return {str(key): _value(value[key]) for key in sorted(value, key=str)}
+    if isinstance(value, list):
+        return [_value(item) for item in value]
+    return value
+
+
+def _link(value, node_ids) -> list:
+    """``[node_id, output_index]`` in canonical shape, or ``None`` if ``value`` is not a link."""
+    if not (isinstance(value, list) and len(value) == 2):
+        return None
+    source, output = value
+    if isinstance(source, bool) or not isinstance(source, (str, int)) or str(source) not in node_ids:
+        return None
+    if isinstance(output, str) and output.isdigit():
+        output = int(output)
+    elif isinstance(output, float) and output.is_integer():
+        output = int(output)
+    if isinstance(output, bool) or not isinstance(output, int):
+        return None
+    return [str(source), output]
+
+
+def _input(value, node_ids):
+    link = _link(value, node_ids)
+    if link is not None:
+        return link
+    if isinstance(value, list) and value and all(isinstance(item, list) for item in value):
+        # [["8", 0]] and other wrapped links: an input takes a single link, so keep the first
+        for item in value:
+            link = _link(item, node_ids)
+            if link is not None:
+                return link
+    return _value(value)
+
+
+def normalize(workflow: Dict) -> Dict:
+    """Canonical copy of ``workflow``.
+
+    Node ids are strings in numeric order, ``_meta`` is dropped, links are
+    ``[str(node_id), int(output)]`` and literals go through ``_value``.  Nodes
+    that are not objects are passed through untouched for validation to report.
+    """
+    if not isinstance(workflow, dict):
+        return workflow
+    node_ids = {str(node_id) for node_id in workflow}
+    canonical = {}
+    for node_id in sorted(node_ids, key=_node_sort_key):
+        node = workflow[node_id] if node_id in workflow else workflow[int(node_id)]
+        if not isinstance(node, dict):
+            canonical[node_id] = node
+            continue
+        out = {}
+        for key in sorted(node):
+            if key == "_meta":
+                continue
+            if key == "inputs" and isinstance(node[key], dict):
+                inputs = node[key]
+                out[key] = {name: _input(inputs[name], node_ids) for name in sorted(inputs)}
+            else:
+                out[key] = _value(node[key])
+        canonical[node_id] = out
+    return canonical
+
+
+def _hashable_node(node, ignore: Iterable[str]):
+    if not isinstance(node, dict) or not isinstance(node.get("inputs"), dict):
+        return node
+    inputs = node["inputs"]
+    if not any(name in inputs for name in ignore):
+        return node
+    return {**node, "inputs": {name: value for name, value in inputs.items() if name not in ignore}}
+
+
+def workflow_hash(workflow: Dict, ignore: FrozenSet[str] = VOLATILE_INPUTS, normalized: bool = False) -> str:
+    """sha256 of the normalized workflow, without the ``ignore`` inputs.
+
+    Pass ``normalized=True`` when ``workflow`` already came from ``normalize``.
+    """
+    if not normalized:
+        workflow = normalize(workflow)
+    if not isinstance(workflow, dict):
+        return hashlib.sha256(_dumps(workflow).encode()).hexdigest()
+    view = {node_id: _hashable_node(node, ignore) for node_id, node in workflow.items()}
+    return hashlib.sha256(_dumps(view).encode()).hexdigest()
+
+
+def subgraph_hashes(workflow: Dict, ignore: FrozenSet[str] = VOLATILE_INPUTS, normalized: bool = False) -> Dict[str, str]:
+    """Map each node id to a hash of the node and all of its upstream nodes.
+
+    Links are hashed as the upstream node's hash plus the output index, so the
+    result does not depend on node numbering.  Raises ``ValueError`` on cycles.
+    """
+    if not normalized:
+        workflow = normalize(workflow)
+    hashes: Dict[str, str] = {}
+    visiting = set()
+
+    def upstream(node):
+        if not isinstance(node, dict) or not isinstance(node.get("inputs"), dict):
+            return []
+        return [value[0] for value in node["inputs"].values() if _link(value, workflow) is not None]
+
+    for root in workflow:
+        # iterative post-order walk so deep graphs do not hit the recursion limit
+        stack = [(root, False)]
+        while stack:
+            node_id, expanded = stack.pop()
+            if node_id in hashes:
+                continue
+            node = workflow[node_id]
+            if not expanded:
+                if node_id in visiting:
+                    raise ValueError(f"Workflow has a cycle through node {node_id}")
+                visiting.add(node_id)
+                stack.append((node_id, True))
+                stack.extend((source, False) for source in upstream(node) if source not in hashes)
+                continue
+            visiting.discard(node_id)
+            node = _hashable_node(node, ignore)
+            if isinstance(node, dict) and isinstance(node.get("inputs"), dict):
+                inputs = {}
+                for name, value in node["inputs"].items():
+                    link = _link(value, workflow)
+                    inputs[name] = ["@", hashes[link[0]], link[1]] if link is not None else value
+                node = {**node, "inputs": inputs}
+            hashes[node_id] = hashlib.sha256(_dumps(node).encode()).hexdigest()
+    return hashes
@@ -0,0 +1,96 @@
+"""Expand one template workflow into seed / parameter sweep variants.
+
+ComfyUI draws the noise for a whole latent batch from the sampler's single
+seed, so a batched prompt can only honour one seed: image ``i`` is reproducible
+from ``(seed, batch_index=i)``, not from a seed of its own.  Variants are
+therefore only folded into one prompt whose ``EmptyLatentImage`` has
+``batch_size > 1`` when they share both the seed and the overrides (see
+``batch_variants``); every distinct seed or set of overrides (prompt text, LoRA
+strength, ...) gets its own prompt with that seed applied.
+"""
+import copy
+import json
+from typing import Dict, List, Optional, Tuple
+
+# sampler class_type -> name of its seed input
+SAMPLER_SEED_INPUTS = {
+    "KSampler": "seed",
+    "KSamplerAdvanced": "noise_seed",
+}
+
+
+def seed_variants(seeds: List[int]) -> List[Dict]:
+    """Shorthand for a pure seed sweep: one ``{"seed": s}`` variant (and prompt) per seed."""
+    return [{"seed": seed} for seed in seeds]
+
+
+def batch_variants(seed: int, count: int, overrides: Optional[Dict] = None) -> List[Dict]:
+    """``count`` images from one seed, rendered as a single batched prompt."""
+    return [{"seed": seed, "overrides": overrides or {}} for _ in range(count)]
+
+
+def _batched_latents(workflow: Dict) -> Dict[str, List[str]]:
+    """Map each ``EmptyLatentImage`` node that feeds a sampler to those samplers."""
+    latents: Dict[str, List[str]] = {}
+    for node_id, node in workflow.items():
+        if node.get("class_type") not in SAMPLER_SEED_INPUTS:
+            continue
+        link = node.get("inputs", {}).get("latent_image")
+        if isinstance(link, list) and len(link) == 2:
+            source = str(link[0])
+            if workflow.get(source, {}).get("class_type") == "EmptyLatentImage":
+                latents.setdefault(source, []).append(node_id)
+    return latents
+
+
+def apply_variant(workflow: Dict, variant: Dict) -> Dict:
+    """Return a copy of ``workflow`` with a variant's overrides and seed applied.
+
+    ``variant`` may contain ``"overrides"`` (``{node_id: {input_name: value}}``)
+    and ``"seed"``, which is written to every sampler's seed input.
+    """
+    workflow = copy.deepcopy(workflow)
+    for node_id, inputs in (variant.get("overrides") or {}).items():
+        if node_id not in workflow:
+            raise KeyError(f"Override targets unknown node {node_id}")
+        workflow[node_id].setdefault("inputs", {}).update(inputs)
+    if variant.get("seed") is not None:
+        for node in workflow.values():
+            seed_input = SAMPLER_SEED_INPUTS.get(node.get("class_type"))
+            if seed_input:
+                node["inputs"][seed_input] = variant["seed"]
+    return workflow
+
+
+def expand_sweep(template: Dict, variants: List[Dict],
+                 max_batch_size: int = 8) -> List[Tuple[Dict, List[int]]]:
+    """Turn ``variants`` of ``template`` into as few prompts as possible.
+
+    Returns ``(workflow, variant_indices)`` pairs; image ``i`` of each
+    workflow's batch belongs to ``variant_indices[i]`` and was rendered with
+    that workflow's seed at batch index ``i``.  Variants that share the same
+    seed and overrides are batched (up to ``max_batch_size`` per prompt) when
+    the template samples from an ``EmptyLatentImage``; otherwise every variant
+    gets its own prompt.
+    """
+    if max_batch_size < 1:
+        raise ValueError("max_batch_size must be at least 1")
+
+    groups: Dict[str, List[int]] = {}
+    for index, variant in enumerate(variants):
+        key = json.dumps([variant.get("seed"), variant.get("overrides") or {}], sort_keys=True)
+        groups.setdefault(key, []).append(index)
+
+    batchable = bool(_batched_latents(template))
+    prompts = []
+    for indices in groups.values():
+        size = max_batch_size if batchable else 1
+        for start in range(0, len(indices), size):
+            chunk = indices[start:start + size]
+            workflow = apply_variant(template, variants[chunk[0]])
+            if batchable:
+                for latent_id in _batched_latents(workflow):
+                    workflow[latent_id]["inputs"]["batch_size"] = len(chunk)
+            prompts.append((workflow, chunk))
+    return prompts
+
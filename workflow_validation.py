@@ -0,0 +1,123 @@
+"""Pre-flight checks of an API-format workflow before it is queued.
+
+Catches what would otherwise only fail inside ComfyUI after the request has
+taken a GPU slot: unknown ``class_type`` values, links (``[node_id,
+output_index]``) to nodes or outputs that do not exist, missing required inputs
+and model files (checkpoints, LoRAs, upscalers, detectors, SAM) that are not in
+the linked model folders.  Everything is checked against in-memory indexes (the
+node registry and one directory scan per model folder), so a bad request is
+rejected in well under a millisecond per node.
+"""
+import os
+from typing import Dict, List, Optional, Set
+
+from model_manifest import COMFY_PATHS
+from node_registry import NodeRegistry
+
+# (class_type, input) -> model type (a COMFY_PATHS key); None means the value is "<type>/<file>"
+MODEL_INPUTS = {
+    ("CheckpointLoaderSimple", "ckpt_name"): "checkpoint",
+    ("LoraLoader", "lora_name"): "lora",
+    ("LoraLoaderModelOnly", "lora_name"): "lora",
+    ("UpscaleModelLoader", "model_name"): "upscaler",
+    ("SAMLoader", "model_name"): "sam",
+    ("UltralyticsDetectorProvider", "model_name"): None,
+}
+
+
+class WorkflowValidationError(ValueError):
+    """Raised with every problem found in a workflow; ``errors`` is a list of dicts."""
+
+    def __init__(self, errors: List[Dict]):
+        self.errors = errors
+        summary = "; ".join(error["message"] for error in errors[:3])
+        more = f" (+{len(errors) - 3} more)" if len(errors) > 3 else ""
+        super().__init__(f"Invalid workflow: {summary}{more}")
+
+    def as_dict(self) -> Dict:
+        return {"error": "invalid_workflow", "errors": self.errors}
+
+
+def model_files(comfy_paths: Dict[str, str] = COMFY_PATHS) -> Dict[str, Set[str]]:
+    """File names in each model folder, keyed by model type (one scandir per folder)."""
+    files = {}
+    for model_type, directory in comfy_paths.items():
+        try:
+            with os.scandir(directory) as it:
+                files[model_type] = {item.name for item in it}
+        except FileNotFoundError:
+            files[model_type] = set()
+    return files
+
+
+def _is_link(value) -> bool:
+    return (isinstance(value, list) and len(value) == 2
+            and isinstance(value[0], (str, int)) and isinstance(value[1], int))
+
+
+def _error(node_id: str, class_type: Optional[str], kind: str, message: str, input_name: Optional[str] = None) -> Dict:
+    error = {"node_id": node_id, "class_type": class_type, "type": kind, "message": message}
+    if input_name is not None:
+        error["input"] = input_name
+    return error
+
+
+def validate_workflow(workflow: Dict, registry: Optional[NodeRegistry] = None,
+                      models: Optional[Dict[str, Set[str]]] = None) -> List[Dict]:
+    """Return the list of problems in ``workflow`` (empty when it looks runnable).
+
+    Node types, required inputs and output indexes are only checked when a
+    ``registry`` is given, and model files only when ``models`` (from
+    ``model_files()``) is given.
+    """
+    if not isinstance(workflow, dict) or not workflow:
+        return [_error("", None, "invalid_workflow", "Workflow must be a non-empty object of nodes")]
+
+    errors = []
+    for node_id, node in workflow.items():
+        if not isinstance(node, dict) or not isinstance(node.get("inputs", {}), dict) or "class_type" not in node:
+            errors.append(_error(node_id, None, "invalid_node", f"Node {node_id} needs a class_type and an inputs object"))
+            continue
+        class_type = node["class_type"]
+        inputs = node.get("inputs", {})
+
+        if registry is not None:
+            if class_type not in registry:
+                errors.append(_error(node_id, class_type, "unknown_node",
+                                     f"Node {node_id}: unknown node type {class_type}"))
+                continue
+            for name in registry.required_inputs(class_type):
+                if name not in inputs:
+                    errors.append(_error(node_id, class_type, "missing_input",
+                                         f"Node {node_id} ({class_type}) is missing required input {name}", name))
+
+        for name, value in inputs.items():
+            if _is_link(value):
+                source_id = str(value[0])
+                source = workflow.get(source_id)
+                if not isinstance(source, dict):
+                    errors.append(_error(node_id, class_type, "bad_link",
+                                         f"Node {node_id}.{name} links to missing node {source_id}", name))
+                elif registry is not None and source.get("class_type") in registry:
+                    outputs = registry.output_count(source["class_type"])
+                    if not 0 <= value[1] < outputs:
+                        errors.append(_error(node_id, class_type, "bad_link",
+                                             f"Node {node_id}.{name} links to output {value[1]} of node {source_id} "
+                                             f"({source['class_type']}), which has {outputs} outputs", name))
+            elif models is not None and (class_type, name) in MODEL_INPUTS and isinstance(value, str):
+                model_type = MODEL_INPUTS[(class_type, name)]
+                filename = value
+                if model_type is None:
+                    model_type, _, filename = value.partition("/")
+                if filename not in models.get(model_type, ()):
+                    errors.append(_error(node_id, class_type, "missing_model",
+                                         f"Node {node_id}: model file {value} is not installed", name))
+    return errors
+
+
+def check_workflow(workflow: Dict, registry: Optional[NodeRegistry] = None,
+                   models: Optional[Dict[str, Set[str]]] = None):
+    """``validate_workflow``, raising ``WorkflowValidationError`` if anything is wrong."""
+    errors = validate_workflow(workflow, registry, models)
+    if errors:
+        raise WorkflowValidationError(errors)